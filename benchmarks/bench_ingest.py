@@ -0,0 +1,101 @@
+"""Benchmarks `fmp.parquet.universe.store_universe` against the local mock FMP server.
+
+Every universe size runs in its own process so the peak RSS of one run does not leak into
+the next, the mock server runs in another process so it does not compete for the GIL.
+
+    python benchmarks/bench_ingest.py --sizes 100 1000 10000 --latency 0.02 --throttle-rate 0.01
+"""
+import argparse
+import dataclasses
+import json
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+
+
+def run_single(args: argparse.Namespace) -> dict:
+    import polars as pl
+    import fmp
+
+    fmp.global_vars.provide_api_key("benchmark")
+    fmp.global_vars.provide_base_url(args.base_url)
+    fmp.ratelimit.configure_rate_limit(args.calls_per_minute, args.workers)
+    symbols = [f"SYM{i:05d}" for i in range(args.run)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory)
+        start = time.perf_counter()
+        fmp.parquet.universe.store_universe(
+            symbols, path, partitioned=args.partitioned, max_workers=args.workers,
+            decode_processes=args.decode_processes, compact=args.compact)
+        seconds = time.perf_counter() - start
+        universe = fmp.parquet.universe.access_universe(path)
+        rows = sum(
+            getattr(universe, field.name).select(pl.len()).collect().item()
+            for field in dataclasses.fields(universe))
+
+    stats = fmp.ratelimit.rate_limiter().stats()
+    return {
+        "symbols": args.run,
+        "seconds": seconds,
+        "requests": stats.requests,
+        "throttled": stats.throttled,
+        "rows": rows,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock server latency per request in seconds.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with HTTP 429.")
+    parser.add_argument("--years", type=int, default=30, help="Years of statements and prices per symbol.")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--calls-per-minute", type=float, default=None)
+    parser.add_argument("--decode-processes", type=int, default=None, help="Decode responses in this many processes.")
+    parser.add_argument("--partitioned", action="store_true")
+    parser.add_argument("--compact", action="store_true", help="Store compact dtypes.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--run", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        print(json.dumps(run_single(args)))
+        return
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "fmp.mockserver", "--port", str(args.port), "--latency", str(args.latency),
+         "--throttle-rate", str(args.throttle_rate), "--years", str(args.years)],
+        cwd=SRC, stdout=subprocess.PIPE, text=True)
+    try:
+        server.stdout.readline()
+        print(f"{'symbols':>8} {'seconds':>9} {'requests':>9} {'req/s':>8} {'429s':>6} {'rows':>11} {'rows/s':>10} {'peak MB':>8}")
+        for size in args.sizes:
+            command = [sys.executable, __file__, "--run", str(size), "--base-url", f"http://127.0.0.1:{args.port}",
+                       "--workers", str(args.workers)]
+            if args.calls_per_minute is not None:
+                command += ["--calls-per-minute", str(args.calls_per_minute)]
+            if args.decode_processes is not None:
+                command += ["--decode-processes", str(args.decode_processes)]
+            if args.partitioned:
+                command.append("--partitioned")
+            if args.compact:
+                command.append("--compact")
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            r = json.loads(output.strip().splitlines()[-1])
+            print(f"{r['symbols']:>8} {r['seconds']:>9.2f} {r['requests']:>9} {r['requests'] / r['seconds']:>8.1f} "
+                  f"{r['throttled']:>6} {r['rows']:>11} {r['rows'] / r['seconds']:>10.0f} {r['peak_rss_mb']:>8.0f}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmarks the universe-wide metrics of `timastock.metrics` against a loop of their pandas versions.
+
+The pandas frames of every symbol are built before timing, so only the metrics are measured.
+
+    python benchmarks/bench_metrics.py --symbols 10000 --years 30 --days 2500
+"""
+import argparse
+import pathlib
+import sys
+import time
+from datetime import date, timedelta
+
+SRC = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+
+
+def _universe(symbols: int, years: int, days: int) -> dict:
+    import polars as pl
+
+    names = pl.DataFrame({"symbol": [f"SYM{i:05d}" for i in range(symbols)]})
+    value = (pl.int_range(pl.len()) * 7919 % 1009 + 100.0)
+    statements = names.join(pl.DataFrame({"calendarYear": pl.int_range(1990, 1990 + years, eager=True)}), how="cross")
+    statements = statements.with_columns(
+        revenue=value, operatingIncome=value / 10 - 30, netIncome=value / 20 - 10, totalAssets=value * 3,
+        totalCurrentLiabilities=value / 2, totalEquity=value, totalDebt=value / 3)
+    dates = pl.date_range(date(2000, 1, 1), date(2000, 1, 1) + timedelta(days=days - 1), eager=True)
+    prices = names.join(pl.DataFrame({"date": dates}), how="cross").with_columns(adjClose=value / 10)
+    return {
+        "income_statements": statements.select("symbol", "calendarYear", "revenue", "operatingIncome", "netIncome"),
+        "balance_sheets": statements.select("symbol", "calendarYear", "totalAssets", "totalCurrentLiabilities", "totalEquity", "totalDebt"),
+        "prices": prices,
+        "market_caps": prices.select("symbol", "date", (pl.col("adjClose") * 1000).alias("marketCap")),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--years", type=int, default=30)
+    parser.add_argument("--days", type=int, default=2500, help="Days of prices per symbol.")
+    args = parser.parse_args()
+
+    import pandas as pd
+    import timastock as tm
+
+    universe = _universe(args.symbols, args.years, args.days)
+    legacy = {}
+    for name, frame in universe.items():
+        index = "date" if name in ("prices", "market_caps") else "calendarYear"
+        legacy[name] = {}
+        for (symbol,), rows in frame.sort(index, descending=True).partition_by("symbol", as_dict=True).items():
+            rows = rows.to_pandas().set_index(index)
+            if index == "date":
+                rows.index = pd.to_datetime(rows.index)
+            legacy[name][symbol] = rows
+
+    cases = [
+        ("return_on_capital_employed", tm.metrics.return_on_capital_employed, tm.analysis.return_on_capital_employed, ["income_statements", "balance_sheets"]),
+        ("return_on_equity", tm.metrics.return_on_equity, tm.analysis.return_on_equity, ["income_statements", "balance_sheets"]),
+        ("annual_revenue_growth", tm.metrics.annual_revenue_growth, tm.growth.annual_revenue_growth, ["income_statements"]),
+        ("annual_capital_employed_growth", tm.metrics.annual_capital_employed_growth, tm.growth.annual_capital_employed_growth, ["balance_sheets"]),
+        ("pb_ratio", tm.metrics.pb_ratio, tm.valuation.pb_ratio, ["market_caps", "balance_sheets"]),
+        ("annual_pb_ratio_growth", tm.metrics.annual_pb_ratio_growth, tm.valuation.annual_pb_ratio_growth, ["market_caps", "balance_sheets"]),
+        ("volatility", tm.metrics.volatility, tm.risk.volatility, ["prices"]),
+        ("max_drawdown", tm.metrics.max_drawdown, tm.risk.max_drawdown, ["prices"]),
+        ("debt_to_equity", tm.metrics.debt_to_equity, tm.risk.debt_to_equity, ["balance_sheets"]),
+    ]
+    symbols = sorted(legacy["prices"])
+    print(f"{'metric':<32} {'polars s':>9} {'pandas s':>9} {'speedup':>8}")
+    for label, port, original, datasets in cases:
+        start = time.perf_counter()
+        port(*[universe[name].lazy() for name in datasets]).collect()
+        polars_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for symbol in symbols:
+            original(*[legacy[name][symbol] for name in datasets])
+        pandas_seconds = time.perf_counter() - start
+        print(f"{label:<32} {polars_seconds:>9.2f} {pandas_seconds:>9.2f} {pandas_seconds / polars_seconds:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
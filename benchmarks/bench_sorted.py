@@ -0,0 +1,84 @@
+"""Benchmarks the timastock functions that need rows in symbol order on a stored universe.
+
+The datasets of `access_universe` are flagged as sorted by symbol, so the functions only check
+their order. The same files scanned without the flag are sorted first.
+
+    python benchmarks/bench_sorted.py --symbols 2000 --days 5000
+"""
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+SRC = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+
+
+def _dataset(fields: list[str], symbols: list[str], dates: list[date]):
+    import polars as pl
+
+    frame = pl.DataFrame({"symbol": symbols}).join(pl.DataFrame({"date": dates}), how="cross")
+    columns = []
+    for field in fields:
+        if field in ("symbol", "date"):
+            continue
+        if field == "calendarYear":
+            columns.append(pl.col("date").dt.year().alias(field))
+        elif field == "fillingDate":
+            columns.append((pl.col("date") + timedelta(days=60)).alias(field))
+        elif field in ("reportedCurrency", "period", "link"):
+            columns.append(pl.lit("x").alias(field))
+        else:
+            columns.append((pl.int_range(pl.len()) % 97 + 1.0).alias(field))
+    return frame.with_columns(columns).select(fields)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=5000, help="Days of prices per symbol.")
+    parser.add_argument("--years", type=int, default=30, help="Years of statements per symbol.")
+    args = parser.parse_args()
+
+    import polars as pl
+    import fmp
+    import timastock as tm
+
+    fu = fmp.parquet.universe
+    symbols = [f"SYM{i:05d}" for i in range(args.symbols)]
+    days = [date(2000, 1, 1) + timedelta(days=d) for d in range(args.days)]
+    years = [date(1990 + y, 12, 31) for y in range(args.years)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory)
+        for name, fields in fu.VALIDATED_FIELDS.items():
+            if name == "company_profiles":
+                pl.DataFrame({f: symbols for f in fields}).write_parquet(path / f"{name}.parquet")
+                continue
+            frame = _dataset(fields, symbols, days if name == "prices" else years)
+            # Shuffled, so only the sort of `write_sorted` puts the rows in order.
+            frame = frame.sample(fraction=1.0, shuffle=True, seed=0)
+            fmp.parquet.sink.write_sorted(frame.lazy(), path / f"{name}.parquet", fu.SORTED_DATASETS[name])
+
+        flagged = fu.access_universe(path)
+        unflagged = fu.FmpUniverse(**{name: pl.scan_parquet(path / f"{name}.parquet") for name in fu.VALIDATED_FIELDS})
+        cases = {
+            "risk.drawdown": lambda u: tm.risk.drawdown(u.prices),
+            "risk.ebit_volatility": lambda u: tm.risk.ebit_volatility(u.income_statements),
+            "profitability.capital_employed": lambda u: tm.profitability.capital_employed(u.balance_sheets),
+            "sort_universe": lambda u: fu.sort_universe(u).prices,
+        }
+        print(f"{'function':<32} {'flagged s':>10} {'unflagged s':>12} {'speedup':>8}")
+        for label, case in cases.items():
+            seconds = []
+            for universe in (flagged, unflagged):
+                start = time.perf_counter()
+                case(universe).collect()
+                seconds.append(time.perf_counter() - start)
+            print(f"{label:<32} {seconds[0]:>10.2f} {seconds[1]:>12.2f} {seconds[1] / seconds[0]:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
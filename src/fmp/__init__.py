@@ -1,3 +1,4 @@
+from . import cache
 from . import common
 from . import company
 from . import financials
@@ -5,4 +6,6 @@ from . import global_vars
 from . import parquet
 from . import pricing
 from . import query
+from . import ratelimit
+from . import session
 from . import universe
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import pathlib
+import threading
+import time
+import typing as t
+import urllib.parse
+import uuid
+from datetime import timedelta
+
+# Statements and metrics only change with new filings, prices and profiles change daily.
+DEFAULT_TTLS = {
+    "income-statement": timedelta(weeks=4),
+    "balance-sheet-statement": timedelta(weeks=4),
+    "cash-flow-statement": timedelta(weeks=4),
+    "key-metrics": timedelta(weeks=4),
+    "key-executives": timedelta(weeks=4),
+    "profile": timedelta(days=7),
+    "historical-price-full": timedelta(days=1),
+    "historical-market-capitalization": timedelta(days=1),
+    "ratings-historical": timedelta(days=1),
+    "price-target": timedelta(days=1),
+}
+
+
+def endpoint_of(url: str) -> str:
+    segments = [s for s in urllib.parse.urlsplit(url).path.split("/") if s]
+    # Skip the api prefix and version, e.g. /api/v3/ or /stable/.
+    while segments and (segments[0] in ("api", "stable") or segments[0][:1] == "v" and segments[0][1:].isdigit()):
+        segments = segments[1:]
+    return segments[0] if segments else ""
+
+
+def cache_key(url: str) -> str:
+    parts = urllib.parse.urlsplit(url)
+    params = sorted((k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True) if k != "apikey")
+    # The host is part of the key, so responses of a mock server are not served for the real one.
+    canonical = f"{parts.scheme}://{parts.netloc.lower()}{parts.path}?{urllib.parse.urlencode(params)}"
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Stores raw endpoint responses on disk, keyed by host, endpoint and parameters without the API key.
+
+    Entries expire after the TTL of their endpoint. Once the cache outgrows `max_bytes` the
+    least recently read entries are evicted.
+    """
+
+    def __init__(
+        self,
+        directory: pathlib.Path | str,
+        max_bytes: int = 20 * 2**30,
+        ttls: dict[str, timedelta] | None = None,
+        default_ttl: timedelta = timedelta(days=1),
+    ):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self) -> t.Iterator[pathlib.Path]:
+        return (p for p in self.directory.glob("*/*/*") if p.is_file() and not p.name.startswith("."))
+
+    def _path(self, url: str) -> pathlib.Path:
+        key = cache_key(url)
+        return self.directory / (endpoint_of(url) or "_") / key[:2] / key
+
+    def ttl(self, url: str) -> timedelta:
+        return self.ttls.get(endpoint_of(url), self.default_ttl)
+
+    def get(self, url: str) -> bytes | None:
+        path = self._path(url)
+        try:
+            stat = path.stat()
+            now = time.time()
+            if now - stat.st_mtime > self.ttl(url).total_seconds():
+                self._remove(path)
+                self.misses += 1
+                return None
+            body = path.read_bytes()
+            # The access time orders entries for eviction, the modification time keeps the age.
+            os.utime(path, (now, stat.st_mtime))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return body
+
+    def put(self, url: str, body: bytes) -> None:
+        path = self._path(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        temporary.write_bytes(body)
+        with self._lock:
+            try:
+                self._size -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            os.replace(temporary, path)
+            self._size += len(body)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def remove(self, url: str) -> None:
+        self._remove(self._path(url))
+
+    def _remove(self, path: pathlib.Path) -> None:
+        with self._lock:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                self._size -= size
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        # Evict down to 90 % of the budget so eviction does not run on every put.
+        entries = sorted(((p.stat(), p) for p in self._entries()), key=lambda e: e[0].st_atime)
+        for stat, path in entries:
+            if self._size <= 0.9 * self.max_bytes:
+                break
+            try:
+                path.unlink()
+                self._size -= stat.st_size
+            except FileNotFoundError:
+                pass
+
+    def size(self) -> int:
+        return self._size
+
+    def clear(self, endpoint: str | None = None) -> None:
+        with self._lock:
+            for path in list(self._entries()):
+                if endpoint is None or path.parent.parent.name == endpoint:
+                    self._size -= path.stat().st_size
+                    path.unlink()
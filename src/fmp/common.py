@@ -1,5 +1,8 @@
+import json
 import time
 import inspect
+import contextlib
+import multiprocessing
 from urllib.error import HTTPError
 from concurrent import futures
 from functools import wraps, partial
@@ -8,36 +11,147 @@ import typing as t
 import polars as pl
 import tqdm
 
-def multithread_concat(
-    worker_funcs: t.Iterable[t.Callable[[], pl.DataFrame]],
-    caller_name: str | None = None
-) -> pl.DataFrame:
+from . import session
+from .ratelimit import rate_limiter, parse_retry_after
+
+# Seconds to wait after a 429 that no rate limiter handled and that has no Retry-After.
+RATE_LIMIT_BACKOFF = 10.0
+
+class FrameSink(t.Protocol):
+    def write(self, frame: pl.DataFrame) -> None: ...
+    def close(self) -> None: ...
+
+
+class FrameCollector:
+    """Collects worker results and concatenates them in batches of `batch_size` frames.
+
+    Every row is copied at most twice instead of once per finished worker. If a `sink` is
+    given, each batch is handed to it instead of being kept in memory.
+    """
+
+    def __init__(self, batch_size: int = 64, sink: FrameSink | None = None):
+        self.batch_size = batch_size
+        self.sink = sink
+        self._buffer: list[pl.DataFrame] = []
+        self._chunks: list[pl.DataFrame] = []
+
+    def add(self, frame: pl.DataFrame | None) -> None:
+        if frame is None:
+            return
+        self._buffer.append(frame)
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if len(self._buffer) == 0:
+            return
+        try:
+            batch = pl.concat(self._buffer, rechunk=True)
+        except Exception as e:
+            print(f"Error {e} when concatenating batch of {len(self._buffer)} results.")
+            raise e
+        self._buffer = []
+        if self.sink is None:
+            self._chunks.append(batch)
+        else:
+            self.sink.write(batch)
+
+    def finish(self) -> pl.DataFrame | None:
+        self._flush()
+        if self.sink is not None:
+            self.sink.close()
+            return None
+        if len(self._chunks) == 0:
+            return None
+        frame = pl.concat(self._chunks, rechunk=False)
+        self._chunks = []
+        return frame
+
+
+def multithread_collect(
+    worker_funcs: t.Iterable[tuple[t.Hashable, t.Callable[[], pl.DataFrame | None]]],
+    collectors: dict[t.Hashable, FrameCollector],
+    caller_name: str | None = None,
+    max_workers: int = 8,
+) -> None:
+    """Runs all `(key, worker_func)` pairs on one shared pool and adds each result to `collectors[key]`."""
     if caller_name is None:
         caller_name = str(inspect.currentframe().f_back.f_code.co_name)
-    frame = None
-    with futures.ThreadPoolExecutor(8) as executor:
-        workers = [executor.submit(worker_func) for worker_func in worker_funcs]
+    limiter_before = rate_limiter().stats()
+    with futures.ThreadPoolExecutor(max_workers) as executor:
+        workers = {executor.submit(worker_func): key for key, worker_func in worker_funcs}
         for worker in tqdm.tqdm(
-            futures.as_completed(workers), caller_name, len(worker_funcs)
+            futures.as_completed(workers), caller_name, len(workers)
         ):
             try:
                 result = worker.result()
             except Exception as e:
                 print(f"Exception {e} on worker {worker}.")
                 raise e
+            # Drop the finished future so its result can be freed once flushed.
+            key = workers.pop(worker)
+            collectors[key].add(result)
 
-            if frame is None:
-                frame = result
-            else:
-                try:
-                    if result is not None:
-                        frame = pl.concat([frame, result])
-                except Exception as e:
-                    print(f"Error {e} when applying result:")
-                    print(result)
-                    raise e
+    limiter_after = rate_limiter().stats()
+    throttled = limiter_after.throttled - limiter_before.throttled
+    slept = limiter_after.slept_seconds - limiter_before.slept_seconds
+    if throttled > 0 or slept > 1:
+        trace_log(f"{caller_name}: {throttled} requests throttled, workers slept {slept:.1f} s waiting for the rate limit.")
 
-    return frame
+
+def multithread_concat(
+    worker_funcs: t.Iterable[t.Callable[[], pl.DataFrame]],
+    caller_name: str | None = None,
+    sink: FrameSink | None = None,
+    batch_size: int = 64,
+) -> pl.DataFrame | None:
+    if caller_name is None:
+        caller_name = str(inspect.currentframe().f_back.f_code.co_name)
+    collector = FrameCollector(batch_size, sink)
+    multithread_collect(((None, worker_func) for worker_func in worker_funcs), {None: collector}, caller_name)
+    return collector.finish()
+
+
+Decoder = t.Callable[[bytes], pl.DataFrame]
+
+
+def decode_pool(processes: int | None) -> t.ContextManager[futures.Executor | None]:
+    """Process pool to decode responses in, or no pool to decode them on the fetching threads."""
+    if not processes:
+        return contextlib.nullcontext()
+    # Spawned instead of forked, forking copies the locks of polars' and the session's threads.
+    return futures.ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"))
+
+
+def fetch_decoded(request: tuple[str, Decoder], pool: futures.Executor | None = None) -> pl.DataFrame:
+    """Fetches the url of `request` on the calling thread and decodes the response, in `pool` if given.
+
+    While a process decodes, the calling thread only waits and does not hold the GIL, so a few
+    more I/O threads than processes keep both stages busy. Responses that fail to decode are
+    not kept in the response cache.
+    """
+    url, decode = request
+    body = session.get(url)
+    try:
+        if pool is None:
+            return decode(body)
+        return pool.submit(decode, body).result()
+    except Exception:
+        session.forget(url)
+        raise
+
+
+def read_response(body: bytes, schema: dict, is_list: bool = True) -> pl.DataFrame:
+    """Reads an endpoint response with `schema`, raising on error responses.
+
+    FMP answers errors such as an exhausted limit with `{"Error Message": ...}` and status 200,
+    which `pl.read_json` would read as a single row of nulls.
+    """
+    if is_list and not body.lstrip().startswith(b"["):
+        raise ValueError(f"Expected a list of entries, got {body[:200]!r}.")
+    if not is_list and b'"Error Message"' in body and "Error Message" in json.loads(body):
+        raise ValueError(f"Error response {body[:200]!r}.")
+    return pl.read_json(body, schema=schema)
 
 
 def ignore_rate_limit(func: t.Callable) -> t.Callable:
@@ -48,10 +162,12 @@ def ignore_rate_limit(func: t.Callable) -> t.Callable:
                 result = func(*args, **kwargs)
                 return result
             except HTTPError as err:
-                if err.code == 429:
-                    time.sleep(10)
-                else:
+                if err.code != 429:
                     raise err
+                # A limiter-backed session already paused all requests, see fmp.ratelimit.
+                if not getattr(err, "limited", False):
+                    retry_after = parse_retry_after(err.headers.get("Retry-After") if err.headers else None)
+                    time.sleep(RATE_LIMIT_BACKOFF if retry_after is None else retry_after)
             except Exception as err:
                 raise err
 
@@ -72,8 +188,31 @@ def convert_exceptions_to_none(func: t.Callable[ParameterType, ReturnType]) -> t
 
 def multi_dataframe(func):
     @wraps(func)
-    def __wrapped_function(symbols: list[str], *args, **kwargs):
-        return multithread_concat([partial(func, symbol, *args, **kwargs) for symbol in symbols], caller_name=func.__name__)
+    def __wrapped_function(symbols: list[str], *args, sink: FrameSink | None = None, **kwargs):
+        return multithread_concat([partial(func, symbol, *args, **kwargs) for symbol in symbols], caller_name=func.__name__, sink=sink)
+    return __wrapped_function
+
+def multi_batched_dataframe(func, batch_size: int):
+    """Like `multi_dataframe` for functions that fetch a list of up to `batch_size` symbols per call.
+
+    Batches whose response fails to decode are fetched again one symbol per call, so a single
+    malformed record only loses its own symbol.
+    """
+    @convert_exceptions_to_none
+    def __fetch_batch(batch: list[str], *args, **kwargs) -> pl.DataFrame | None:
+        try:
+            return func(batch, *args, **kwargs)
+        except pl.exceptions.PolarsError as e:
+            if len(batch) == 1:
+                raise e
+            trace_log(f"Exception {e} encountered when decoding the batch {batch}, fetching its symbols one by one.")
+            frames = [frame for frame in (__fetch_batch([symbol], *args, **kwargs) for symbol in batch) if frame is not None]
+            return pl.concat(frames) if len(frames) > 0 else None
+
+    @wraps(func)
+    def __wrapped_function(symbols: list[str], *args, sink: FrameSink | None = None, **kwargs):
+        batches = [symbols[i:i + batch_size] for i in range(0, len(symbols), batch_size)]
+        return multithread_concat([partial(__fetch_batch, batch, *args, **kwargs) for batch in batches], caller_name=func.__name__, sink=sink)
     return __wrapped_function
 
 def trace_log(str):
@@ -3,4 +3,13 @@ def provide_api_key(provided_key: str) -> None:
     _api_key = provided_key
 
 def api_key() -> str:
-    return _api_key
\ No newline at end of file
+    return _api_key
+
+_base_url = "https://financialmodelingprep.com"
+
+def provide_base_url(provided_url: str) -> None:
+    global _base_url
+    _base_url = provided_url.rstrip("/")
+
+def base_url() -> str:
+    return _base_url
\ No newline at end of file
@@ -0,0 +1,208 @@
+import argparse
+import http.server
+import json
+import pathlib
+import random
+import threading
+import time
+import urllib.parse
+import zlib
+from datetime import date, timedelta
+
+import polars as pl
+
+from .cache import ResponseCache, endpoint_of
+from .parquet import company, financials, predictions, pricing
+
+STATEMENT_SCHEMAS = {
+    "income-statement": financials.INCOME_STATEMENT_SCHEMA,
+    "balance-sheet-statement": financials.BALANCE_SHEET_SCHEMA,
+    "cash-flow-statement": financials.CASHFLOW_STATEMENT_SCHEMA,
+    "key-metrics": financials.KEY_METRICS_SCHEMA | {"inventoryTurnover": pl.Float64},
+}
+
+
+def _synthetic_value(field: str, dtype: pl.DataType, symbol: str, day: date, rng: random.Random):
+    if field == "symbol":
+        return symbol
+    if field in ("date", "ipoDate"):
+        return day.isoformat()
+    if field == "fillingDate":
+        return (day + timedelta(days=60)).isoformat()
+    if field == "publishedDate":
+        return f"{day.isoformat()}T12:00:00.000Z"
+    if field == "calendarYear":
+        return str(day.year)
+    if field in ("reportedCurrency", "currency"):
+        return "USD"
+    if field == "period":
+        return "FY"
+    if field == "fullTimeEmployees":
+        return str(rng.randrange(10, 100000))
+    if dtype == pl.Float64:
+        return rng.uniform(1, 1e9)
+    if dtype in (pl.Int64, pl.Int8):
+        return rng.randrange(1, 5)
+    if dtype == pl.Boolean:
+        return False
+    return f"{field}-{symbol}"
+
+
+def _synthetic_records(schema: dict, symbol: str, days: list[date]) -> list[dict]:
+    rng = random.Random(zlib.crc32(symbol.encode()))
+    return [{f: _synthetic_value(f, d, symbol, day, rng) for f, d in schema.items()} for day in days]
+
+
+class MockFmpServer:
+    """Local stand-in for the FMP API that serves synthetic or recorded responses.
+
+    `latency` delays every response, `throttle_rate` is the share of requests answered with
+    HTTP 429 and a `Retry-After` of `retry_after` seconds. `years` sets the payload size of
+    statements and prices. If `recordings` points to a `fmp.cache.ResponseCache` directory,
+    recorded responses are served in place of synthetic ones where available. They are looked up
+    as responses of `recorded_base`, the base url they were recorded from.
+    """
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.1,
+        years: int = 30,
+        recordings: pathlib.Path | None = None,
+        recorded_base: str = "https://financialmodelingprep.com",
+    ):
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.years = years
+        self.recordings = None if recordings is None else ResponseCache(recordings, ttls={}, default_ttl=timedelta.max)
+        self.recorded_base = recorded_base.rstrip("/")
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._bars: dict[tuple[str, str], str] = {}
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "MockFmpServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockFmpServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def respond(self, url: str) -> tuple[int, bytes]:
+        with self._lock:
+            self.requests += 1
+            throttled = self._rng.random() < self.throttle_rate
+            if throttled:
+                self.throttled += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if throttled:
+            return 429, b'{"Error Message": "Limit Reach."}'
+        if self.recordings is not None:
+            # Requests only carry the path, the cache keys of the recordings include the host.
+            body = self.recordings.get(self.recorded_base + url)
+            if body is not None:
+                return 200, body
+
+        parts = urllib.parse.urlsplit(url)
+        params = dict(urllib.parse.parse_qsl(parts.query))
+        endpoint = endpoint_of(url)
+        symbols = params["symbol"].split(",") if "symbol" in params else parts.path.rstrip("/").split("/")[-1].split(",")
+        today = date.today()
+
+        if endpoint in STATEMENT_SCHEMAS:
+            limit = min(int(params.get("limit", 30)), self.years)
+            days = [date(today.year - i - 1, 12, 31) for i in range(limit)]
+            return 200, json.dumps(_synthetic_records(STATEMENT_SCHEMAS[endpoint], symbols[0], days)).encode()
+        if endpoint == "profile":
+            return 200, json.dumps([r for s in symbols for r in _synthetic_records(company.COMPANY_PROFILE_SCHEMA, s, [today])]).encode()
+        if endpoint == "historical-price-full":
+            bars = self._price_bars(params.get("from", "None"), params.get("to", "None"))
+            if len(symbols) == 1:
+                return 200, f'{{"symbol": "{symbols[0]}", "historical": {bars}}}'.encode()
+            stock_list = ", ".join(f'{{"symbol": "{s}", "historical": {bars}}}' for s in symbols)
+            return 200, f'{{"historicalStockList": [{stock_list}]}}'.encode()
+        if endpoint == "historical-market-capitalization":
+            days = [today - timedelta(days=i) for i in range(365)]
+            return 200, json.dumps(_synthetic_records(pricing.MARKET_CAP_SCHEMA, symbols[0], days)).encode()
+        if endpoint == "ratings-historical":
+            days = [today - timedelta(days=i) for i in range(min(int(params.get("limit", 100)), 100))]
+            return 200, json.dumps(_synthetic_records(predictions.RATING_SCHEMA, symbols[0], days)).encode()
+        if endpoint == "key-executives":
+            return 200, json.dumps(_synthetic_records(company.EXECUTIVES_SCHEMA, symbols[0], [today] * 3)).encode()
+        if endpoint == "price-target":
+            return 200, json.dumps(_synthetic_records(predictions.PRICE_TARGET_SCHEMA, symbols[0], [today])).encode()
+        return 404, b'{"Error Message": "Unknown endpoint."}'
+
+    def _price_bars(self, start: str, end: str) -> str:
+        # The bars only depend on the requested range, so they are rendered once and shared by all symbols.
+        key = (start, end)
+        if key not in self._bars:
+            last = date.fromisoformat(end) if end != "None" else date.today()
+            first = date.fromisoformat(start) if start != "None" else last - timedelta(days=365 * self.years)
+            days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+            days = [d for d in days if d.weekday() < 5]
+            records = _synthetic_records(pricing.HISORICAL_PRICES_SCHEMA, "", list(reversed(days)))
+            self._bars[key] = json.dumps(records)
+        return self._bars[key]
+
+
+def _handler(server: MockFmpServer) -> type[http.server.BaseHTTPRequestHandler]:
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            status, body = server.respond(self.path)
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", str(server.retry_after))
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a local mock of the FMP API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--years", type=int, default=30)
+    parser.add_argument("--recordings", type=pathlib.Path, default=None)
+    parser.add_argument("--recorded-base", default="https://financialmodelingprep.com")
+    args = parser.parse_args()
+    server = MockFmpServer(args.port, args.latency, args.throttle_rate, args.retry_after, args.years, args.recordings, args.recorded_base)
+    print(f"Serving mock FMP API on {server.url}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 from . import company
+from . import compact
 from . import financials
+from . import hotcache
+from . import manifest
+from . import pointintime
 from . import predictions
 from . import pricing
+from . import sink
 from . import universe
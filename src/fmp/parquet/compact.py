@@ -0,0 +1,114 @@
+import json
+import os
+import pathlib
+
+import polars as pl
+
+from fmp.common import FrameSink
+from timastock.misc import AnyPolarsFrame
+
+DICTIONARY_FILE = "_dictionary.json"
+# Low-cardinality string columns with the dictionary they share. Columns sharing a dictionary
+# get the same Enum, so they can be compared and joined with each other.
+ENUM_COLUMNS = {
+    "symbol": "symbol",
+    "reportedCurrency": "currency",
+    "currency": "currency",
+    "period": "period",
+    "exchangeShortName": "exchangeShortName",
+    "industry": "industry",
+    "sector": "sector",
+    "country": "country",
+    "rating": "rating",
+}
+COMPACT_COLUMNS = {
+    "calendarYear": pl.Int16,
+}
+# Float columns whose values fit the 7 significant digits of a Float32: prices of a share and
+# ratios. Currency amounts such as revenue or market caps reach 1e12 and stay Float64.
+FLOAT32_COLUMNS = {
+    # prices
+    "open", "high", "low", "close", "adjClose", "change", "changePercent", "vwap", "changeOverTime",
+    # key metrics per share
+    "revenuePerShare", "netIncomePerShare", "operatingCashFlowPerShare", "freeCashFlowPerShare", "cashPerShare",
+    "bookValuePerShare", "tangibleBookValuePerShare", "shareholdersEquityPerShare", "interestDebtPerShare",
+    "capexPerShare", "grahamNumber", "grahamNetNet",
+    # key metric ratios
+    "peRatio", "priceToSalesRatio", "pocfratio", "pfcfRatio", "pbRatio", "ptbRatio", "evToSales",
+    "enterpriseValueOverEBITDA", "evToOperatingCashFlow", "evToFreeCashFlow", "earningsYield", "freeCashFlowYield",
+    "debtToEquity", "debtToAssets", "netDebtToEBITDA", "currentRatio", "interestCoverage", "incomeQuality",
+    "dividendYield", "payoutRatio", "salesGeneralAndAdministrativeToRevenue", "researchAndDdevelopementToRevenue",
+    "intangiblesToTotalAssets", "capexToOperatingCashFlow", "capexToRevenue", "capexToDepreciation",
+    "stockBasedCompensationToRevenue", "roic", "returnOnTangibleAssets", "roe", "daysSalesOutstanding",
+    "daysPayablesOutstanding", "daysOfInventoryOnHand", "receivablesTurnover", "payablesTurnover",
+}
+
+
+def compact_dtypes(frame: AnyPolarsFrame) -> AnyPolarsFrame:
+    """Casts the Float64 columns of `FLOAT32_COLUMNS` to Float32 and calendar years to Int16."""
+    schema = frame.collect_schema()
+    casts = {c: pl.Float32 for c, d in schema.items() if d == pl.Float64 and c in FLOAT32_COLUMNS}
+    casts |= {c: d for c, d in COMPACT_COLUMNS.items() if c in schema}
+    return frame.cast(casts)
+
+
+class Dictionary:
+    """The values of every Enum column of a store, persisted in `path`.
+
+    Values are only ever appended, so the codes of stored values never change.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self._values: dict[str, list[str]] = {}
+        if self.path.exists():
+            self._values = json.loads(self.path.read_text())
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def update(self, frame: pl.DataFrame, save: bool = True) -> None:
+        changed = False
+        for column, name in ENUM_COLUMNS.items():
+            if column not in frame.columns:
+                continue
+            known = self._values.setdefault(name, [])
+            new = set(frame.get_column(column).drop_nulls().unique().to_list()) - set(known)
+            if len(new) > 0:
+                known.extend(sorted(new))
+                changed = True
+        if save and (changed or not self.exists()):
+            self.save()
+
+    def save(self) -> None:
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_text(json.dumps(self._values))
+        os.replace(temporary, self.path)
+
+    def clear(self) -> None:
+        self._values = {}
+        self.path.unlink(missing_ok=True)
+
+    def enum(self, column: str) -> pl.Enum:
+        return pl.Enum(self._values.get(ENUM_COLUMNS[column], []))
+
+    def compact(self, frame: AnyPolarsFrame) -> AnyPolarsFrame:
+        """Applies `compact_dtypes` and casts the Enum columns of `frame` to their Enum."""
+        schema = frame.collect_schema()
+        return compact_dtypes(frame).cast({c: self.enum(c) for c in ENUM_COLUMNS if c in schema})
+
+
+class CompactSink:
+    """Wraps a sink to write compact dtypes and to add new values to `dictionary` first."""
+
+    def __init__(self, sink: FrameSink, dictionary: Dictionary):
+        self.sink = sink
+        self.dictionary = dictionary
+
+    def write(self, frame: pl.DataFrame) -> None:
+        # The dictionary is saved before the rows, so it always covers all stored values.
+        self.dictionary.update(frame)
+        self.sink.write(compact_dtypes(frame))
+
+    def close(self) -> None:
+        self.sink.close()
@@ -1,48 +1,91 @@
-import urllib.request
+import typing as t
+from functools import partial
 
 import polars as pl
-from fmp.global_vars import api_key
-from fmp.common import ignore_rate_limit, convert_exceptions_to_none, multi_dataframe
+from fmp.global_vars import api_key, base_url
+from fmp.common import ignore_rate_limit, convert_exceptions_to_none, fetch_decoded, read_response, multi_dataframe, multi_batched_dataframe
 
 COMPANY_PROFILE_VALIDATED_FIELDS = ["symbol", "companyName", "currency", "isin", "exchangeShortName", "industry", "sector", "country", "isEtf"]
 
-@ignore_rate_limit
+COMPANY_PROFILE_SCHEMA = {
+    "symbol": pl.String,
+    # actually interesting
+    "price": pl.Float64,
+    "beta": pl.Float64,
+    "volAvg": pl.Float64,
+    "mktCap": pl.Float64,
+    "lastDiv": pl.Float64,
+    "changes": pl.Float64,
+    "companyName": pl.String,
+    "currency": pl.String,
+    "isin": pl.String,
+    "exchange": pl.String,
+    "exchangeShortName": pl.String,
+    "industry": pl.String,
+    "website": pl.String,
+    "description": pl.String,
+    "ceo": pl.String,
+    "sector": pl.String,
+    "country": pl.String,
+    "fullTimeEmployees": pl.String,
+    "address": pl.String,
+    "city": pl.String,
+    "state": pl.String,
+    "zip": pl.String,
+    "ipoDate": pl.String,
+    "isEtf": pl.Boolean,
+    "isActivelyTrading": pl.Boolean,
+    "isAdr": pl.Boolean,
+    "isFund": pl.Boolean,
+}
+
+# Profiles of several symbols can be requested at once as a comma separated list.
+COMPANY_PROFILE_BATCH_SIZE = 50
+
 def company_profile(symbol: str) -> pl.DataFrame | None:
-    url = (
-        f"https://financialmodelingprep.com/api/v3/profile/{symbol}?apikey={api_key()}"
-    )
-    with urllib.request.urlopen(url) as response:
-        df = pl.read_json(response)
-    return df.select(
-        pl.col("symbol").cast(pl.String),
-        # actually interesting
-        pl.col("price").cast(pl.Float64),
-        pl.col("beta").cast(pl.Float64),
-        pl.col("volAvg").cast(pl.Float64),
-        pl.col("mktCap").cast(pl.Float64),
-        pl.col("lastDiv").cast(pl.Float64),
-        pl.col("changes").cast(pl.Float64),
-        pl.col("companyName").cast(pl.String),
-        pl.col("currency").cast(pl.String),
-        pl.col("isin").cast(pl.String),
-        pl.col("exchange").cast(pl.String),
-        pl.col("exchangeShortName").cast(pl.String),
-        pl.col("industry").cast(pl.String),
-        pl.col("website").cast(pl.String),
-        pl.col("description").cast(pl.String),
-        pl.col("ceo").cast(pl.String),
-        pl.col("sector").cast(pl.String),
-        pl.col("country").cast(pl.String),
-        pl.col("fullTimeEmployees").cast(pl.Int64),
-        pl.col("address").cast(pl.String),
-        pl.col("city").cast(pl.String),
-        pl.col("state").cast(pl.String),
-        pl.col("zip").cast(pl.String),
+    return batch_company_profiles([symbol])
+
+def company_profile_request(symbol: str) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    return batch_company_profiles_request([symbol])
+
+def batch_company_profiles_request(symbols: list[str]) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    return f"{base_url()}/api/v3/profile/{','.join(symbols)}?apikey={api_key()}", decode_company_profiles
+
+def decode_company_profiles(body: bytes) -> pl.DataFrame:
+    df = read_response(body, COMPANY_PROFILE_SCHEMA)
+    return df.with_columns(
+        # Profiles without employees have an empty string.
+        pl.col("fullTimeEmployees").cast(pl.Int64, strict=False),
         pl.col("ipoDate").str.to_date("%Y-%m-%d", strict=False),
-        pl.col("isEtf").cast(pl.Boolean),
-        pl.col("isActivelyTrading").cast(pl.Boolean),
-        pl.col("isAdr").cast(pl.Boolean),
-        pl.col("isFund").cast(pl.Boolean),
     )
 
-multi_company_profiles = multi_dataframe(convert_exceptions_to_none(company_profile))
+@ignore_rate_limit
+def batch_company_profiles(symbols: list[str]) -> pl.DataFrame | None:
+    return fetch_decoded(batch_company_profiles_request(symbols))
+
+multi_company_profiles = multi_batched_dataframe(batch_company_profiles, COMPANY_PROFILE_BATCH_SIZE)
+
+
+EXECUTIVES_SCHEMA = {
+    "title": pl.String,
+    "name": pl.String,
+    "pay": pl.Float64,
+    "currencyPay": pl.String,
+    "gender": pl.String,
+    "yearBorn": pl.Int64,
+    "titleSince": pl.Int64,
+}
+
+def executives_request(symbol: str) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    # The executives do not name their company, so the decoder adds the symbol.
+    return f"{base_url()}/api/v3/key-executives/{symbol}?apikey={api_key()}", partial(decode_executives, symbol)
+
+def decode_executives(symbol: str, body: bytes) -> pl.DataFrame:
+    df = read_response(body, EXECUTIVES_SCHEMA)
+    return df.select(pl.lit(symbol).alias("symbol"), pl.all())
+
+@ignore_rate_limit
+def executives(symbol: str) -> pl.DataFrame:
+    return fetch_decoded(executives_request(symbol))
+
+multi_executives = multi_dataframe(convert_exceptions_to_none(executives))
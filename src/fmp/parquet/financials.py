@@ -1,59 +1,66 @@
-import urllib.request
-import json
+import typing as t
 
 import polars as pl
-from fmp.global_vars import api_key
-from fmp.common import ignore_rate_limit, convert_exceptions_to_none, multi_dataframe
+from fmp.global_vars import api_key, base_url
+from fmp.common import ignore_rate_limit, convert_exceptions_to_none, fetch_decoded, read_response, multi_dataframe
 
 INCOME_STATEMENT_CURRENCY_FIELDS = ["revenue", "costOfRevenue", "grossProfit", "costAndExpenses", "operatingIncome", "ebitda", "netIncome"]
-INCOME_STATEMENT_VALIDATED_FIELDS = ["symbol", "date", "calendarYear", "reportedCurrency", "period", "link"] + INCOME_STATEMENT_CURRENCY_FIELDS
+INCOME_STATEMENT_VALIDATED_FIELDS = ["symbol", "date", "fillingDate", "calendarYear", "reportedCurrency", "period", "link"] + INCOME_STATEMENT_CURRENCY_FIELDS
 
-@ignore_rate_limit
-def income_statement(
-    symbol: str, period: str = "annual", limit: int = 30
-) -> pl.DataFrame:
-    url = f"https://financialmodelingprep.com/api/v3/income-statement/{symbol}?period={period}&limit={limit}&apikey={api_key()}"
-    with urllib.request.urlopen(url) as response:
-        df = pl.read_json(response)
-    return df.select(
-        pl.col("symbol"),
+INCOME_STATEMENT_SCHEMA = {
+    "symbol": pl.String,
+    "date": pl.String,
+    "fillingDate": pl.String,
+    "calendarYear": pl.String,
+    "reportedCurrency": pl.String,
+    "period": pl.String,
+    "link": pl.String,
+    # actually interesting
+    "revenue": pl.Float64,
+    "costOfRevenue": pl.Float64,
+    "grossProfit": pl.Float64,
+    "grossProfitRatio": pl.Float64,
+    "researchAndDevelopmentExpenses": pl.Float64,
+    "generalAndAdministrativeExpenses": pl.Float64,
+    "sellingAndMarketingExpenses": pl.Float64,
+    "sellingGeneralAndAdministrativeExpenses": pl.Float64,
+    "otherExpenses": pl.Float64,
+    "operatingExpenses": pl.Float64,
+    "costAndExpenses": pl.Float64,
+    "interestIncome": pl.Float64,
+    "interestExpense": pl.Float64,
+    "depreciationAndAmortization": pl.Float64,
+    "ebitda": pl.Float64,
+    "ebitdaratio": pl.Float64,
+    "operatingIncome": pl.Float64,
+    "operatingIncomeRatio": pl.Float64,
+    "totalOtherIncomeExpensesNet": pl.Float64,
+    "incomeBeforeTax": pl.Float64,
+    "incomeBeforeTaxRatio": pl.Float64,
+    "incomeTaxExpense": pl.Float64,
+    "netIncome": pl.Float64,
+    "netIncomeRatio": pl.Float64,
+    "eps": pl.Float64,
+    "epsdiluted": pl.Float64,
+    "weightedAverageShsOut": pl.Float64,
+    "weightedAverageShsOutDil": pl.Float64,
+}
+
+def income_statement_request(symbol: str, period: str = "annual", limit: int = 30) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    return f"{base_url()}/api/v3/income-statement/{symbol}?period={period}&limit={limit}&apikey={api_key()}", decode_income_statement
+
+def decode_income_statement(body: bytes) -> pl.DataFrame:
+    df = read_response(body, INCOME_STATEMENT_SCHEMA)
+    return df.with_columns(
         pl.col("date").str.to_date(),
         pl.col("fillingDate").str.to_date(),
         pl.col("calendarYear").cast(pl.Int32),
-        pl.col("reportedCurrency"),
-        pl.col("period"),
-        pl.col("link"),
-        # actually interesting
-        pl.col("revenue").cast(pl.Float64),
-        pl.col("costOfRevenue").cast(pl.Float64),
-        pl.col("grossProfit").cast(pl.Float64),
-        pl.col("grossProfitRatio").cast(pl.Float64),
-        pl.col("researchAndDevelopmentExpenses").cast(pl.Float64),
-        pl.col("generalAndAdministrativeExpenses").cast(pl.Float64),
-        pl.col("sellingAndMarketingExpenses").cast(pl.Float64),
-        pl.col("sellingGeneralAndAdministrativeExpenses").cast(pl.Float64),
-        pl.col("otherExpenses").cast(pl.Float64),
-        pl.col("operatingExpenses").cast(pl.Float64),
-        pl.col("costAndExpenses").cast(pl.Float64),
-        pl.col("interestIncome").cast(pl.Float64),
-        pl.col("interestExpense").cast(pl.Float64),
-        pl.col("depreciationAndAmortization").cast(pl.Float64),
-        pl.col("ebitda").cast(pl.Float64),
-        pl.col("ebitdaratio").cast(pl.Float64),
-        pl.col("operatingIncome").cast(pl.Float64),
-        pl.col("operatingIncomeRatio").cast(pl.Float64),
-        pl.col("totalOtherIncomeExpensesNet").cast(pl.Float64),
-        pl.col("incomeBeforeTax").cast(pl.Float64),
-        pl.col("incomeBeforeTaxRatio").cast(pl.Float64),
-        pl.col("incomeTaxExpense").cast(pl.Float64),
-        pl.col("netIncome").cast(pl.Float64),
-        pl.col("netIncomeRatio").cast(pl.Float64),
-        pl.col("eps").cast(pl.Float64),
-        pl.col("epsdiluted").cast(pl.Float64),
-        pl.col("weightedAverageShsOut").cast(pl.Float64),
-        pl.col("weightedAverageShsOutDil").cast(pl.Float64),
     )
 
+@ignore_rate_limit
+def income_statement(symbol: str, period: str = "annual", limit: int = 30) -> pl.DataFrame:
+    return fetch_decoded(income_statement_request(symbol, period, limit))
+
 multi_income_statements = multi_dataframe(convert_exceptions_to_none(income_statement))
 
 BALANCE_SHEET_CURRENCY_FIELDS = [
@@ -70,69 +77,79 @@ BALANCE_SHEET_CURRENCY_FIELDS = [
     "totalEquity",
     "totalInvestments",
     "totalDebt"]
-BALANCE_SHEET_VALIDATED_FIELDS = ["symbol", "date", "calendarYear", "reportedCurrency", "period", "link"] + BALANCE_SHEET_CURRENCY_FIELDS
+BALANCE_SHEET_VALIDATED_FIELDS = ["symbol", "date", "fillingDate", "calendarYear", "reportedCurrency", "period", "link"] + BALANCE_SHEET_CURRENCY_FIELDS
 
 
-@ignore_rate_limit
-def balance_sheet(symbol: str, period: str = "annual", limit: int = 30) -> pl.DataFrame:
-    url = f"https://financialmodelingprep.com/api/v3/balance-sheet-statement/{symbol}?period={period}&limit={limit}&apikey={api_key()}"
-    with urllib.request.urlopen(url) as response:
-        df = pl.read_json(response)
-    return df.select(
-        pl.col("symbol"),
+BALANCE_SHEET_SCHEMA = {
+    "symbol": pl.String,
+    "date": pl.String,
+    "fillingDate": pl.String,
+    "calendarYear": pl.String,
+    "reportedCurrency": pl.String,
+    "period": pl.String,
+    "link": pl.String,
+    # actually interesting
+    "cashAndCashEquivalents": pl.Float64,
+    "shortTermInvestments": pl.Float64,
+    "cashAndShortTermInvestments": pl.Float64,
+    "netReceivables": pl.Float64,
+    "inventory": pl.Float64,
+    "otherCurrentAssets": pl.Float64,
+    "totalCurrentAssets": pl.Float64,
+    "propertyPlantEquipmentNet": pl.Float64,
+    "goodwill": pl.Float64,
+    "intangibleAssets": pl.Float64,
+    "goodwillAndIntangibleAssets": pl.Float64,
+    "longTermInvestments": pl.Float64,
+    "taxAssets": pl.Float64,
+    "otherNonCurrentAssets": pl.Float64,
+    "totalNonCurrentAssets": pl.Float64,
+    "otherAssets": pl.Float64,
+    "totalAssets": pl.Float64,
+    "accountPayables": pl.Float64,
+    "shortTermDebt": pl.Float64,
+    "taxPayables": pl.Float64,
+    "deferredRevenue": pl.Float64,
+    "otherCurrentLiabilities": pl.Float64,
+    "totalCurrentLiabilities": pl.Float64,
+    "longTermDebt": pl.Float64,
+    "deferredRevenueNonCurrent": pl.Float64,
+    "deferredTaxLiabilitiesNonCurrent": pl.Float64,
+    "otherNonCurrentLiabilities": pl.Float64,
+    "totalNonCurrentLiabilities": pl.Float64,
+    "otherLiabilities": pl.Float64,
+    "capitalLeaseObligations": pl.Float64,
+    "totalLiabilities": pl.Float64,
+    "preferredStock": pl.Float64,
+    "commonStock": pl.Float64,
+    "retainedEarnings": pl.Float64,
+    "accumulatedOtherComprehensiveIncomeLoss": pl.Float64,
+    "othertotalStockholdersEquity": pl.Float64,
+    "totalStockholdersEquity": pl.Float64,
+    "totalEquity": pl.Float64,
+    "totalLiabilitiesAndStockholdersEquity": pl.Float64,
+    "minorityInterest": pl.Float64,
+    "totalLiabilitiesAndTotalEquity": pl.Float64,
+    "totalInvestments": pl.Float64,
+    "totalDebt": pl.Float64,
+    "netDebt": pl.Float64,
+}
+
+def balance_sheet_request(symbol: str, period: str = "annual", limit: int = 30) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    return f"{base_url()}/api/v3/balance-sheet-statement/{symbol}?period={period}&limit={limit}&apikey={api_key()}", decode_balance_sheet
+
+def decode_balance_sheet(body: bytes) -> pl.DataFrame:
+    df = read_response(body, BALANCE_SHEET_SCHEMA)
+    return df.with_columns(
         pl.col("date").str.to_date(),
         pl.col("fillingDate").str.to_date(),
         pl.col("calendarYear").cast(pl.Int32),
-        pl.col("reportedCurrency"),
-        pl.col("period"),
-        pl.col("link"),
-        # actually interesting
-        pl.col("cashAndCashEquivalents").cast(pl.Float64),
-        pl.col("shortTermInvestments").cast(pl.Float64),
-        pl.col("cashAndShortTermInvestments").cast(pl.Float64),
-        pl.col("netReceivables").cast(pl.Float64),
-        pl.col("inventory").cast(pl.Float64),
-        pl.col("otherCurrentAssets").cast(pl.Float64),
-        pl.col("totalCurrentAssets").cast(pl.Float64),
-        pl.col("propertyPlantEquipmentNet").cast(pl.Float64),
-        pl.col("goodwill").cast(pl.Float64),
-        pl.col("intangibleAssets").cast(pl.Float64),
-        pl.col("goodwillAndIntangibleAssets").cast(pl.Float64),
-        pl.col("longTermInvestments").cast(pl.Float64),
-        pl.col("taxAssets").cast(pl.Float64),
-        pl.col("otherNonCurrentAssets").cast(pl.Float64),
-        pl.col("totalNonCurrentAssets").cast(pl.Float64),
-        pl.col("otherAssets").cast(pl.Float64),
-        pl.col("totalAssets").cast(pl.Float64),
-        pl.col("accountPayables").cast(pl.Float64),
-        pl.col("shortTermDebt").cast(pl.Float64),
-        pl.col("taxPayables").cast(pl.Float64),
-        pl.col("deferredRevenue").cast(pl.Float64),
-        pl.col("otherCurrentLiabilities").cast(pl.Float64),
-        pl.col("totalCurrentLiabilities").cast(pl.Float64),
-        pl.col("longTermDebt").cast(pl.Float64),
-        pl.col("deferredRevenueNonCurrent").cast(pl.Float64),
-        pl.col("deferredTaxLiabilitiesNonCurrent").cast(pl.Float64),
-        pl.col("otherNonCurrentLiabilities").cast(pl.Float64),
-        pl.col("totalNonCurrentLiabilities").cast(pl.Float64),
-        pl.col("otherLiabilities").cast(pl.Float64),
-        pl.col("capitalLeaseObligations").cast(pl.Float64),
-        pl.col("totalLiabilities").cast(pl.Float64),
-        pl.col("preferredStock").cast(pl.Float64),
-        pl.col("commonStock").cast(pl.Float64),
-        pl.col("retainedEarnings").cast(pl.Float64),
-        pl.col("accumulatedOtherComprehensiveIncomeLoss").cast(pl.Float64),
-        pl.col("othertotalStockholdersEquity").cast(pl.Float64),
-        pl.col("totalStockholdersEquity").cast(pl.Float64),
-        pl.col("totalEquity").cast(pl.Float64),
-        pl.col("totalLiabilitiesAndStockholdersEquity").cast(pl.Float64),
-        pl.col("minorityInterest").cast(pl.Float64),
-        pl.col("totalLiabilitiesAndTotalEquity").cast(pl.Float64),
-        pl.col("totalInvestments").cast(pl.Float64),
-        pl.col("totalDebt").cast(pl.Float64),
-        pl.col("netDebt").cast(pl.Float64),
     )
 
+@ignore_rate_limit
+def balance_sheet(symbol: str, period: str = "annual", limit: int = 30) -> pl.DataFrame:
+    return fetch_decoded(balance_sheet_request(symbol, period, limit))
+
 multi_balance_sheets = multi_dataframe(convert_exceptions_to_none(balance_sheet))
 
 CASHFLOW_STATEMENT_CURRENCY_FIELDS = [
@@ -146,57 +163,65 @@ CASHFLOW_STATEMENT_CURRENCY_FIELDS = [
     "capitalExpenditure",
     "freeCashFlow"
 ]
-CASHFLOW_STATEMENT_VALIDATED_FIELDS = ["symbol", "date", "calendarYear", "reportedCurrency", "period", "link"] + CASHFLOW_STATEMENT_CURRENCY_FIELDS
+CASHFLOW_STATEMENT_VALIDATED_FIELDS = ["symbol", "date", "fillingDate", "calendarYear", "reportedCurrency", "period", "link"] + CASHFLOW_STATEMENT_CURRENCY_FIELDS
 
 
-@ignore_rate_limit
-def cashflow_statement(
-    symbol: str, period: str = "annual", limit: int = 30
-) -> pl.DataFrame:
-    url = f"https://financialmodelingprep.com/api/v3/cash-flow-statement/{symbol}?period={period}&limit={limit}&apikey={api_key()}"
-    with urllib.request.urlopen(url) as response:
-        df = pl.read_json(response)
-    return df.select(
-        pl.col("symbol"),
+CASHFLOW_STATEMENT_SCHEMA = {
+    "symbol": pl.String,
+    "date": pl.String,
+    "fillingDate": pl.String,
+    "calendarYear": pl.String,
+    "reportedCurrency": pl.String,
+    "period": pl.String,
+    "link": pl.String,
+    # actually interesting
+    "netIncome": pl.Float64,
+    "depreciationAndAmortization": pl.Float64,
+    "deferredIncomeTax": pl.Float64,
+    "stockBasedCompensation": pl.Float64,
+    "changeInWorkingCapital": pl.Float64,
+    "accountsReceivables": pl.Float64,
+    "inventory": pl.Float64,
+    "accountsPayables": pl.Float64,
+    "otherWorkingCapital": pl.Float64,
+    "otherNonCashItems": pl.Float64,
+    "netCashProvidedByOperatingActivities": pl.Float64,
+    "investmentsInPropertyPlantAndEquipment": pl.Float64,
+    "acquisitionsNet": pl.Float64,
+    "purchasesOfInvestments": pl.Float64,
+    "salesMaturitiesOfInvestments": pl.Float64,
+    "otherInvestingActivites": pl.Float64,
+    "netCashUsedForInvestingActivites": pl.Float64,
+    "debtRepayment": pl.Float64,
+    "commonStockIssued": pl.Float64,
+    "commonStockRepurchased": pl.Float64,
+    "dividendsPaid": pl.Float64,
+    "otherFinancingActivites": pl.Float64,
+    "netCashUsedProvidedByFinancingActivities": pl.Float64,
+    "effectOfForexChangesOnCash": pl.Float64,
+    "netChangeInCash": pl.Float64,
+    "cashAtEndOfPeriod": pl.Float64,
+    "cashAtBeginningOfPeriod": pl.Float64,
+    "operatingCashFlow": pl.Float64,
+    "capitalExpenditure": pl.Float64,
+    "freeCashFlow": pl.Float64,
+}
+
+def cashflow_statement_request(symbol: str, period: str = "annual", limit: int = 30) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    return f"{base_url()}/api/v3/cash-flow-statement/{symbol}?period={period}&limit={limit}&apikey={api_key()}", decode_cashflow_statement
+
+def decode_cashflow_statement(body: bytes) -> pl.DataFrame:
+    df = read_response(body, CASHFLOW_STATEMENT_SCHEMA)
+    return df.with_columns(
         pl.col("date").str.to_date(),
         pl.col("fillingDate").str.to_date(),
         pl.col("calendarYear").cast(pl.Int32),
-        pl.col("reportedCurrency"),
-        pl.col("period"),
-        pl.col("link"),
-        # actually interesting
-        pl.col("netIncome").cast(pl.Float64),
-        pl.col("depreciationAndAmortization").cast(pl.Float64),
-        pl.col("deferredIncomeTax").cast(pl.Float64),
-        pl.col("stockBasedCompensation").cast(pl.Float64),
-        pl.col("changeInWorkingCapital").cast(pl.Float64),
-        pl.col("accountsReceivables").cast(pl.Float64),
-        pl.col("inventory").cast(pl.Float64),
-        pl.col("accountsPayables").cast(pl.Float64),
-        pl.col("otherWorkingCapital").cast(pl.Float64),
-        pl.col("otherNonCashItems").cast(pl.Float64),
-        pl.col("netCashProvidedByOperatingActivities").cast(pl.Float64),
-        pl.col("investmentsInPropertyPlantAndEquipment").cast(pl.Float64),
-        pl.col("acquisitionsNet").cast(pl.Float64),
-        pl.col("purchasesOfInvestments").cast(pl.Float64),
-        pl.col("salesMaturitiesOfInvestments").cast(pl.Float64),
-        pl.col("otherInvestingActivites").cast(pl.Float64),
-        pl.col("netCashUsedForInvestingActivites").cast(pl.Float64),
-        pl.col("debtRepayment").cast(pl.Float64),
-        pl.col("commonStockIssued").cast(pl.Float64),
-        pl.col("commonStockRepurchased").cast(pl.Float64),
-        pl.col("dividendsPaid").cast(pl.Float64),
-        pl.col("otherFinancingActivites").cast(pl.Float64),
-        pl.col("netCashUsedProvidedByFinancingActivities").cast(pl.Float64),
-        pl.col("effectOfForexChangesOnCash").cast(pl.Float64),
-        pl.col("netChangeInCash").cast(pl.Float64),
-        pl.col("cashAtEndOfPeriod").cast(pl.Float64),
-        pl.col("cashAtBeginningOfPeriod").cast(pl.Float64),
-        pl.col("operatingCashFlow").cast(pl.Float64),
-        pl.col("capitalExpenditure").cast(pl.Float64),
-        pl.col("freeCashFlow").cast(pl.Float64),
     )
 
+@ignore_rate_limit
+def cashflow_statement(symbol: str, period: str = "annual", limit: int = 30) -> pl.DataFrame:
+    return fetch_decoded(cashflow_statement_request(symbol, period, limit))
+
 multi_cashflow_statements = multi_dataframe(convert_exceptions_to_none(cashflow_statement))
 
 KEY_METRICS_CURRENCY_FIELDS = [
@@ -220,77 +245,83 @@ KEY_METRICS_VALIDATED_FIELDS = [
 ] + KEY_METRICS_CURRENCY_FIELDS
 
 
-@ignore_rate_limit
-def key_metrics(symbol: str, period: str = "annual", limit: int = 30) -> pl.DataFrame:
-    url = f"https://financialmodelingprep.com/api/v3/key-metrics/{symbol}?period={period}&limit={limit}&apikey={api_key()}"
-    with urllib.request.urlopen(url) as response:
-        raw = json.load(response)
-        for entry in raw:
-            # inventory turnover is ill-defined if inventory is 0
-            del entry["inventoryTurnover"]
-        df = pl.DataFrame(raw)
-    return df.select(
-        pl.col("symbol"),
+KEY_METRICS_SCHEMA = {
+    "symbol": pl.String,
+    "date": pl.String,
+    "calendarYear": pl.String,
+    "period": pl.String,
+    # actually interesting
+    "revenuePerShare": pl.Float64,
+    "netIncomePerShare": pl.Float64,
+    "operatingCashFlowPerShare": pl.Float64,
+    "freeCashFlowPerShare": pl.Float64,
+    "cashPerShare": pl.Float64,
+    "bookValuePerShare": pl.Float64,
+    "tangibleBookValuePerShare": pl.Float64,
+    "shareholdersEquityPerShare": pl.Float64,
+    "interestDebtPerShare": pl.Float64,
+    "marketCap": pl.Float64,
+    "enterpriseValue": pl.Float64,
+    "peRatio": pl.Float64,
+    "priceToSalesRatio": pl.Float64,
+    "pocfratio": pl.Float64,
+    "pfcfRatio": pl.Float64,
+    "pbRatio": pl.Float64,
+    "ptbRatio": pl.Float64,
+    "evToSales": pl.Float64,
+    "enterpriseValueOverEBITDA": pl.Float64,
+    "evToOperatingCashFlow": pl.Float64,
+    "evToFreeCashFlow": pl.Float64,
+    "earningsYield": pl.Float64,
+    "freeCashFlowYield": pl.Float64,
+    "debtToEquity": pl.Float64,
+    "debtToAssets": pl.Float64,
+    "netDebtToEBITDA": pl.Float64,
+    "currentRatio": pl.Float64,
+    "interestCoverage": pl.Float64,
+    "incomeQuality": pl.Float64,
+    "dividendYield": pl.Float64,
+    "payoutRatio": pl.Float64,
+    "salesGeneralAndAdministrativeToRevenue": pl.Float64,
+    "researchAndDdevelopementToRevenue": pl.Float64,
+    "intangiblesToTotalAssets": pl.Float64,
+    "capexToOperatingCashFlow": pl.Float64,
+    "capexToRevenue": pl.Float64,
+    "capexToDepreciation": pl.Float64,
+    "stockBasedCompensationToRevenue": pl.Float64,
+    "grahamNumber": pl.Float64,
+    "roic": pl.Float64,
+    "returnOnTangibleAssets": pl.Float64,
+    "grahamNetNet": pl.Float64,
+    "workingCapital": pl.Float64,
+    "tangibleAssetValue": pl.Float64,
+    "netCurrentAssetValue": pl.Float64,
+    "investedCapital": pl.Float64,
+    "averageReceivables": pl.Float64,
+    "averagePayables": pl.Float64,
+    "averageInventory": pl.Float64,
+    "daysSalesOutstanding": pl.Float64,
+    "daysPayablesOutstanding": pl.Float64,
+    "daysOfInventoryOnHand": pl.Float64,
+    "receivablesTurnover": pl.Float64,
+    "payablesTurnover": pl.Float64,
+    "roe": pl.Float64,
+    "capexPerShare": pl.Float64,
+}
+
+def key_metrics_request(symbol: str, period: str = "annual", limit: int = 30) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    return f"{base_url()}/api/v3/key-metrics/{symbol}?period={period}&limit={limit}&apikey={api_key()}", decode_key_metrics
+
+def decode_key_metrics(body: bytes) -> pl.DataFrame:
+    # inventoryTurnover is left out of the schema, it is ill-defined if inventory is 0.
+    df = read_response(body, KEY_METRICS_SCHEMA)
+    return df.with_columns(
         pl.col("date").str.to_date(),
         pl.col("calendarYear").cast(pl.Int32),
-        pl.col("period"),
-        # actually interesting
-        pl.col("revenuePerShare").cast(pl.Float64),
-        pl.col("netIncomePerShare").cast(pl.Float64),
-        pl.col("operatingCashFlowPerShare").cast(pl.Float64),
-        pl.col("freeCashFlowPerShare").cast(pl.Float64),
-        pl.col("cashPerShare").cast(pl.Float64),
-        pl.col("bookValuePerShare").cast(pl.Float64),
-        pl.col("tangibleBookValuePerShare").cast(pl.Float64),
-        pl.col("shareholdersEquityPerShare").cast(pl.Float64),
-        pl.col("interestDebtPerShare").cast(pl.Float64),
-        pl.col("marketCap").cast(pl.Float64),
-        pl.col("enterpriseValue").cast(pl.Float64),
-        pl.col("peRatio").cast(pl.Float64),
-        pl.col("priceToSalesRatio").cast(pl.Float64),
-        pl.col("pocfratio").cast(pl.Float64),
-        pl.col("pfcfRatio").cast(pl.Float64),
-        pl.col("pbRatio").cast(pl.Float64),
-        pl.col("ptbRatio").cast(pl.Float64),
-        pl.col("evToSales").cast(pl.Float64),
-        pl.col("enterpriseValueOverEBITDA").cast(pl.Float64),
-        pl.col("evToOperatingCashFlow").cast(pl.Float64),
-        pl.col("evToFreeCashFlow").cast(pl.Float64),
-        pl.col("earningsYield").cast(pl.Float64),
-        pl.col("freeCashFlowYield").cast(pl.Float64),
-        pl.col("debtToEquity").cast(pl.Float64),
-        pl.col("debtToAssets").cast(pl.Float64),
-        pl.col("netDebtToEBITDA").cast(pl.Float64),
-        pl.col("currentRatio").cast(pl.Float64),
-        pl.col("interestCoverage").cast(pl.Float64),
-        pl.col("incomeQuality").cast(pl.Float64),
-        pl.col("dividendYield").cast(pl.Float64),
-        pl.col("payoutRatio").cast(pl.Float64),
-        pl.col("salesGeneralAndAdministrativeToRevenue").cast(pl.Float64),
-        pl.col("researchAndDdevelopementToRevenue").cast(pl.Float64),
-        pl.col("intangiblesToTotalAssets").cast(pl.Float64),
-        pl.col("capexToOperatingCashFlow").cast(pl.Float64),
-        pl.col("capexToRevenue").cast(pl.Float64),
-        pl.col("capexToDepreciation").cast(pl.Float64),
-        pl.col("stockBasedCompensationToRevenue").cast(pl.Float64),
-        pl.col("grahamNumber").cast(pl.Float64),
-        pl.col("roic").cast(pl.Float64),
-        pl.col("returnOnTangibleAssets").cast(pl.Float64),
-        pl.col("grahamNetNet").cast(pl.Float64),
-        pl.col("workingCapital").cast(pl.Float64),
-        pl.col("tangibleAssetValue").cast(pl.Float64),
-        pl.col("netCurrentAssetValue").cast(pl.Float64),
-        pl.col("investedCapital").cast(pl.Float64),
-        pl.col("averageReceivables").cast(pl.Float64),
-        pl.col("averagePayables").cast(pl.Float64),
-        pl.col("averageInventory").cast(pl.Float64),
-        pl.col("daysSalesOutstanding").cast(pl.Float64),
-        pl.col("daysPayablesOutstanding").cast(pl.Float64),
-        pl.col("daysOfInventoryOnHand").cast(pl.Float64),
-        pl.col("receivablesTurnover").cast(pl.Float64),
-        pl.col("payablesTurnover").cast(pl.Float64),
-        pl.col("roe").cast(pl.Float64),
-        pl.col("capexPerShare").cast(pl.Float64),
     )
 
+@ignore_rate_limit
+def key_metrics(symbol: str, period: str = "annual", limit: int = 30) -> pl.DataFrame:
+    return fetch_decoded(key_metrics_request(symbol, period, limit))
+
 multi_key_metrics = multi_dataframe(convert_exceptions_to_none(key_metrics))
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import uuid
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.ipc
+
+from . import universe as fu
+
+HOT_CACHE_DIRECTORY = "_hot"
+FINGERPRINT_FILE = "fingerprint.json"
+
+
+def _is_cache(part: str, directory: pathlib.Path) -> bool:
+    # The cache directory and the directories it is built and retired in, see `_materialize`.
+    return any(part == name or part.startswith(name + ".") for name in (HOT_CACHE_DIRECTORY, directory.name))
+
+
+def _fingerprint(path: pathlib.Path, rates: pl.DataFrame | None, base: str, compact: bool | None, directory: pathlib.Path) -> dict:
+    # Size and modification time of every stored file stand in for their content.
+    sources = sorted(
+        f for f in path.rglob("*")
+        if f.is_file() and f.suffix in (".parquet", ".json")
+        and not any(_is_cache(p, directory) or p.endswith(".parts") for p in f.relative_to(path).parts))
+    return {
+        "sources": [[str(f.relative_to(path)), f.stat().st_size, f.stat().st_mtime_ns] for f in sources],
+        "rates": None if rates is None else hashlib.sha256(rates.write_ipc(None).getvalue()).hexdigest(),
+        "base": base.lower(),
+        "compact": compact,
+        "polars": pl.__version__,
+    }
+
+
+def access_hot_universe(
+    path: pathlib.Path,
+    rates: pl.DataFrame | None = None,
+    compact: bool | None = None,
+    directory: pathlib.Path | None = None,
+    base: str = "eur",
+) -> fu.FmpUniverse:
+    """Like `access_universe`, optionally adjusted by `rates` to `base`, but read from uncompressed Arrow IPC files.
+
+    The files are written to `directory`, by default `_hot` in `path`, on the first call and again
+    whenever the stored parquet files or `rates` change. They are memory-mapped, so decoding is
+    skipped and several processes reading the same universe share the page cache. A rebuild never
+    touches the files other processes have mapped. Where those files cannot be moved, as on Windows,
+    the rebuilt files are read from next to `directory` until a later call can swap them in.
+    """
+    if isinstance(rates, pl.LazyFrame):
+        rates = rates.collect()
+    directory = path / HOT_CACHE_DIRECTORY if directory is None else pathlib.Path(directory)
+    fingerprint = _fingerprint(path, rates, base, compact, directory)
+    if _stored_fingerprint(directory) != fingerprint:
+        directory = _refresh(path, rates, base, compact, directory, fingerprint)
+    return fu.FmpUniverse(**{name: _map(directory / f"{name}.arrow").lazy() for name in fu.VALIDATED_FIELDS})
+
+
+def _stored_fingerprint(directory: pathlib.Path) -> dict | None:
+    fingerprint_file = directory / FINGERPRINT_FILE
+    return json.loads(fingerprint_file.read_text()) if fingerprint_file.exists() else None
+
+
+def _refresh(path: pathlib.Path, rates: pl.DataFrame | None, base: str, compact: bool | None, directory: pathlib.Path, fingerprint: dict) -> pathlib.Path:
+    # A build that could not be swapped in before is swapped in now, or read from where it is.
+    for ready in sorted(directory.parent.glob(f"{directory.name}.*.ready")):
+        if _stored_fingerprint(ready) == fingerprint:
+            return _swap(ready, directory)
+        shutil.rmtree(ready, ignore_errors=True)
+    return _materialize(path, rates, base, compact, directory, fingerprint)
+
+
+def _map(file: pathlib.Path) -> pl.DataFrame:
+    # Polars copies IPC files it reads itself, arrow wraps the mapped pages instead. The map stays
+    # open as long as any of the columns refer to it.
+    table = pa.ipc.open_file(pa.memory_map(str(file))).read_all()
+    return pl.from_arrow(table, rechunk=False)
+
+
+def _materialize(path: pathlib.Path, rates: pl.DataFrame | None, base: str, compact: bool | None, directory: pathlib.Path, fingerprint: dict) -> pathlib.Path:
+    # Several processes may rebuild at once, so each builds next to `directory` and swaps its build in.
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    build = directory.with_name(f"{directory.name}.{uuid.uuid4().hex}.build")
+    build.mkdir()
+    try:
+        universe = fu.access_universe(path, compact)
+        if rates is not None:
+            universe = fu.adjust_universe_by_rates(universe, rates, base)
+        for name in fu.VALIDATED_FIELDS:
+            getattr(universe, name).sink_ipc(build / f"{name}.arrow", compression="uncompressed")
+        (build / FINGERPRINT_FILE).write_text(json.dumps(fingerprint))
+        return _swap(build, directory)
+    finally:
+        shutil.rmtree(build, ignore_errors=True)
+
+
+def _swap(build: pathlib.Path, directory: pathlib.Path) -> pathlib.Path:
+    # Renaming keeps the files of the retired cache intact for the processes that mapped them.
+    # Returns the directory to read the cache from.
+    retired = directory.with_name(f"{directory.name}.{uuid.uuid4().hex}.retired")
+    try:
+        os.replace(directory, retired)
+    except FileNotFoundError:
+        pass
+    except PermissionError:
+        # Windows refuses while the files are mapped. The build is kept and read where it is.
+        ready = build.with_suffix(".ready")
+        if ready != build:
+            os.replace(build, ready)
+        return ready
+    try:
+        os.replace(build, directory)
+    except OSError:
+        # Another process swapped its build in first, or this process still maps the kept build.
+        if build.suffix == ".ready" and not directory.exists():
+            return build
+    shutil.rmtree(retired, ignore_errors=True)
+    return directory
+
+
+def clear_hot_universe(path: pathlib.Path, directory: pathlib.Path | None = None) -> None:
+    directory = path / HOT_CACHE_DIRECTORY if directory is None else pathlib.Path(directory)
+    for cache in [directory, *directory.parent.glob(f"{directory.name}.*")]:
+        shutil.rmtree(cache, ignore_errors=True)
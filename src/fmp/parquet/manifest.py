@@ -0,0 +1,62 @@
+import json
+import pathlib
+import threading
+import time
+import typing as t
+
+import polars as pl
+
+from fmp.common import FrameSink
+
+MANIFEST_SCHEMA = {"symbol": pl.String, "dataset": pl.String, "status": pl.String, "error": pl.String, "time": pl.Float64}
+
+
+class Manifest:
+    """Append-only log of the (symbol, dataset) pairs an ingestion job finished or failed.
+
+    The last entry of a pair wins, so a failed pair that is retried successfully counts as done.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def record(self, dataset: str, symbols: t.Iterable[str], status: str, error: str | None = None) -> None:
+        now = time.time()
+        lines = "".join(
+            json.dumps({"symbol": s, "dataset": dataset, "status": status, "error": error, "time": now}) + "\n"
+            for s in symbols)
+        with self._lock, open(self.path, "a") as file:
+            file.write(lines)
+
+    def read(self) -> pl.DataFrame:
+        if not self.exists():
+            return pl.DataFrame(schema=MANIFEST_SCHEMA)
+        entries = pl.read_ndjson(self.path, schema=MANIFEST_SCHEMA)
+        return entries.unique(["symbol", "dataset"], keep="last", maintain_order=True)
+
+    def pairs(self, status: str) -> set[tuple[str, str]]:
+        entries = self.read().filter(pl.col("status") == status)
+        return set(zip(entries.get_column("symbol").to_list(), entries.get_column("dataset").to_list()))
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class ManifestSink:
+    """Marks the symbols of every batch as done once `sink` has persisted it."""
+
+    def __init__(self, sink: FrameSink, manifest: Manifest, dataset: str):
+        self.sink = sink
+        self.manifest = manifest
+        self.dataset = dataset
+
+    def write(self, frame: pl.DataFrame) -> None:
+        self.sink.write(frame)
+        self.manifest.record(self.dataset, frame.get_column("symbol").unique().to_list(), "done")
+
+    def close(self) -> None:
+        self.sink.close()
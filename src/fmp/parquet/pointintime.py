@@ -0,0 +1,79 @@
+from dataclasses import dataclass, fields
+from datetime import date, timedelta
+
+import polars as pl
+
+from timastock.misc import AnyPolarsFrame, sort_by_symbol
+from . import universe as fu
+
+# Column holding the day a statement became public. Key metrics have none and take the one of
+# the income statement of the same period.
+KNOWN_DATE = "fillingDate"
+
+
+def _by_known_date(frame: pl.LazyFrame, reporting_lag: timedelta | None) -> pl.LazyFrame:
+    # Statements are never public at the end of their period, so without a filling date they are
+    # either dropped or taken as known `reporting_lag` after it.
+    if reporting_lag is not None:
+        frame = frame.with_columns(pl.col(KNOWN_DATE).fill_null(pl.col("date") + reporting_lag))
+    return frame.drop_nulls(KNOWN_DATE).sort("symbol", KNOWN_DATE, "date")
+
+
+@dataclass
+class StatementIndex:
+    """The statements of a universe sorted by (symbol, fillingDate), for point-in-time lookups."""
+    income_statements: pl.DataFrame
+    balance_sheets: pl.DataFrame
+    cashflow_statements: pl.DataFrame
+    key_metrics: pl.DataFrame
+
+    @staticmethod
+    def from_universe(universe: fu.FmpUniverse, reporting_lag: timedelta | None = None) -> "StatementIndex":
+        """Indexes the statements of `universe`.
+
+        Statements without a filling date are left out, unless `reporting_lag` is given, e.g. 90 days,
+        in which case they count as filed that long after the end of their period.
+        """
+        filed = universe.income_statements.select("symbol", "date", KNOWN_DATE).unique(["symbol", "date"], keep="last")
+        key_metrics = universe.key_metrics
+        if KNOWN_DATE not in key_metrics.collect_schema().names():
+            key_metrics = key_metrics.join(filed, on=["symbol", "date"], how="left")
+        frames = [
+            _by_known_date(universe.income_statements, reporting_lag),
+            _by_known_date(universe.balance_sheets, reporting_lag),
+            _by_known_date(universe.cashflow_statements, reporting_lag),
+            _by_known_date(key_metrics, reporting_lag),
+        ]
+        return StatementIndex(*pl.collect_all(frames))
+
+    def latest(self, name: str, date: date) -> pl.DataFrame:
+        """The latest statement of every symbol in dataset `name` that was public on `date`."""
+        statements = getattr(self, name)
+        symbols = statements.select(pl.col("symbol").unique(maintain_order=True), pl.lit(date).alias("asOf"))
+        # A backward as-of join is a binary search in the rows of each symbol.
+        latest = symbols.join_asof(
+            statements, left_on="asOf", right_on=KNOWN_DATE, by="symbol", check_sortedness=False, coalesce=False)
+        return latest.drop_nulls("date").select(statements.columns)
+
+    def attach(self, prices: AnyPolarsFrame, name: str = "income_statements", suffix: str = "_statement") -> AnyPolarsFrame:
+        """Joins to every row of `prices` the statement of dataset `name` that was public on its date.
+
+        Statement columns also in `prices`, like `date`, get `suffix`. The rows are sorted by symbol and date.
+        """
+        statements = getattr(self, name)
+        if isinstance(prices, pl.LazyFrame):
+            statements = statements.lazy()
+        prices = sort_by_symbol(prices, "date")
+        return prices.join_asof(
+            statements, left_on="date", right_on=KNOWN_DATE, by="symbol", check_sortedness=False, suffix=suffix, coalesce=False)
+
+
+def as_of(universe: fu.FmpUniverse, date: date, index: StatementIndex | None = None, reporting_lag: timedelta | None = None) -> fu.FmpUniverse:
+    """The universe as it was known on `date`, with the latest public statement of every symbol.
+
+    Pass the `StatementIndex` of `universe` to answer many dates without building it again,
+    `reporting_lag` is only used to build it, see `StatementIndex.from_universe`.
+    """
+    index = StatementIndex.from_universe(universe, reporting_lag) if index is None else index
+    statements = {f.name: index.latest(f.name, date).lazy() for f in fields(StatementIndex)}
+    return fu.FmpUniverse(**statements, prices=fu._until(universe.prices, date), company_profiles=universe.company_profiles)
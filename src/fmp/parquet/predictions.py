@@ -1,50 +1,64 @@
-import urllib.request
-import json
+import typing as t
 
 import polars as pl
-from fmp.global_vars import api_key
-from fmp.common import ignore_rate_limit, convert_exceptions_to_none, multi_dataframe
+from fmp.global_vars import api_key, base_url
+from fmp.common import ignore_rate_limit, convert_exceptions_to_none, fetch_decoded, read_response, multi_dataframe
 
-@ignore_rate_limit
-def rating(symbol: str, limit: int | None = 10000) -> pl.DataFrame:
-    url = f"https://financialmodelingprep.com/stable/ratings-historical?symbol={symbol}&limit={limit}&apikey={api_key()}"
-    with urllib.request.urlopen(url) as response:
-        df = pl.read_json(response)
-    return df.select(
-        pl.col("symbol").cast(pl.String),
+RATING_SCHEMA = {
+    "symbol": pl.String,
+    "date": pl.String,
+    # actually interesting
+    "rating": pl.String,
+    "overallScore": pl.Int8,
+    "discountedCashFlowScore": pl.Int8,
+    "returnOnEquityScore": pl.Int8,
+    "returnOnAssetsScore": pl.Int8,
+    "debtToEquityScore": pl.Int8,
+    "priceToEarningsScore": pl.Int8,
+    "priceToBookScore": pl.Int8,
+}
+
+def rating_request(symbol: str, limit: int | None = 10000) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    return f"{base_url()}/stable/ratings-historical?symbol={symbol}&limit={limit}&apikey={api_key()}", decode_rating
+
+def decode_rating(body: bytes) -> pl.DataFrame:
+    df = read_response(body, RATING_SCHEMA)
+    return df.with_columns(
         pl.col("date").str.to_date(),
-        # actually interesting
-        pl.col("rating").cast(pl.String),
-        pl.col("overallScore").cast(pl.Int8),
-        pl.col("discountedCashFlowScore").cast(pl.Int8),
-        pl.col("returnOnEquityScore").cast(pl.Int8),
-        pl.col("returnOnAssetsScore").cast(pl.Int8),
-        pl.col("debtToEquityScore").cast(pl.Int8),
-        pl.col("priceToEarningsScore").cast(pl.Int8),
-        pl.col("priceToBookScore").cast(pl.Int8)
     )
 
+@ignore_rate_limit
+def rating(symbol: str, limit: int | None = 10000) -> pl.DataFrame:
+    return fetch_decoded(rating_request(symbol, limit))
+
 multi_ratings = multi_dataframe(convert_exceptions_to_none(rating))
 
-@ignore_rate_limit
-def price_target(symbol: str) -> pl.DataFrame:
-    url = f"https://financialmodelingprep.com/api/v4/price-target/?symbol={symbol}&apikey={api_key()}"
-    print(url)
-    with urllib.request.urlopen(url) as response:
-        df = pl.read_json(response)
-    return df.select(
-        pl.col("symbol").cast(pl.String),
+PRICE_TARGET_SCHEMA = {
+    "symbol": pl.String,
+    "publishedDate": pl.String,
+    # actually interesting
+    "newsURL": pl.String,
+    "newsTitle": pl.String,
+    "analystName": pl.String,
+    "priceTarget": pl.Float64,
+    "adjPriceTarget": pl.Float64,
+    "priceWhenPosted": pl.Float64,
+    "newsPublisher": pl.String,
+    "newsBaseURL": pl.String,
+    "analystCompany": pl.String,
+}
+
+def price_target_request(symbol: str) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    return f"{base_url()}/api/v4/price-target/?symbol={symbol}&apikey={api_key()}", decode_price_target
+
+def decode_price_target(body: bytes) -> pl.DataFrame:
+    df = read_response(body, PRICE_TARGET_SCHEMA)
+    return df.with_columns(
         pl.col("publishedDate").str.to_datetime("%+"),
-        # actually interesting
-        pl.col("newsURL").cast(pl.String),
-        pl.col("newsTitle").cast(pl.String),
-        pl.col("analystName").cast(pl.String),
-        pl.col("priceTarget").cast(pl.Float64),
-        pl.col("adjPriceTarget").cast(pl.Float64),
-        pl.col("priceWhenPosted").cast(pl.Float64),
-        pl.col("newsPublisher").cast(pl.String),
-        pl.col("newsBaseURL").cast(pl.String),
-        pl.col("analystCompany").cast(pl.String),
     )
 
+@ignore_rate_limit
+def price_target(symbol: str) -> pl.DataFrame:
+    return fetch_decoded(price_target_request(symbol))
+
 multi_price_targets = multi_dataframe(convert_exceptions_to_none(price_target))
@@ -1,51 +1,87 @@
-import json
-import urllib.request
+import typing as t
+
 import polars as pl
-from fmp.global_vars import api_key
-from fmp.common import ignore_rate_limit, multi_dataframe, convert_exceptions_to_none
+from fmp.global_vars import api_key, base_url
+from fmp.common import ignore_rate_limit, fetch_decoded, read_response, multi_dataframe, multi_batched_dataframe, convert_exceptions_to_none
 from datetime import datetime
 
 HISORICAL_PRICES_CURRENCY_FIELDS = ["open", "high", "low", "close", "adjClose"]
 HISORICAL_PRICES_VALIDATED_FIELDS = ["symbol", "date", "volume"] + HISORICAL_PRICES_CURRENCY_FIELDS
 
+# Schema of a single bar, the symbol is only given once per response.
+HISORICAL_PRICES_SCHEMA = {
+    "date": pl.String,
+    # actually interesting
+    "open": pl.Float64,
+    "high": pl.Float64,
+    "low": pl.Float64,
+    "close": pl.Float64,
+    "adjClose": pl.Float64,
+    "volume": pl.Int64,
+    "unadjustedVolume": pl.Int64,
+    "change": pl.Float64,
+    "changePercent": pl.Float64,
+    "vwap": pl.Float64,
+    "changeOverTime": pl.Float64,
+}
+
+def historical_prices_request(symbol, start: str = None, end: str = datetime.today().strftime("%Y-%m-%d")) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    return f"{base_url()}/api/v3/historical-price-full/{symbol}?from={start}&to={end}&apikey={api_key()}", decode_historical_prices
+
+def decode_historical_prices(body: bytes) -> pl.DataFrame:
+    df = read_response(body, {"symbol": pl.String, "historical": pl.List(pl.Struct(HISORICAL_PRICES_SCHEMA))}, is_list=False)
+    return _unnest_bars(df)
+
 @ignore_rate_limit
 def historical_prices(symbol, start: str = None, end: str = datetime.today().strftime("%Y-%m-%d")) -> pl.DataFrame:
-    url = f"https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?from={start}&to={end}&apikey={api_key()}"
-    with urllib.request.urlopen(url) as response:
-        raw = json.load(response)
-        # Add symbol from top level to every entry.
-        for entry in raw["historical"]:
-            entry["symbol"] = raw["symbol"]
-        df = pl.DataFrame(raw["historical"])
-    return df.select(
-        pl.col("symbol"),
+    return fetch_decoded(historical_prices_request(symbol, start, end))
+
+def _unnest_bars(df: pl.DataFrame) -> pl.DataFrame:
+    # Exploding the bars broadcasts the symbol to every one of them.
+    df = df.explode("historical").drop_nulls("historical").unnest("historical")
+    return df.with_columns(
         pl.col("date").str.to_date(),
-        # actually interesting
-        pl.col("open").cast(pl.Float64),
-        pl.col("high").cast(pl.Float64),
-        pl.col("low").cast(pl.Float64),
-        pl.col("close").cast(pl.Float64),
-        pl.col("adjClose").cast(pl.Float64),
-        pl.col("volume").cast(pl.Int64),
-        pl.col("unadjustedVolume").cast(pl.Int64),
-        pl.col("change").cast(pl.Float64),
-        pl.col("changePercent").cast(pl.Float64),
-        pl.col("vwap").cast(pl.Float64),
-        pl.col("changeOverTime").cast(pl.Float64),
     )
 
-multi_historical_prices = multi_dataframe(convert_exceptions_to_none(historical_prices))
+# FMP serves at most 5 symbols per request.
+HISORICAL_PRICES_BATCH_SIZE = 5
+
+def batch_historical_prices_request(symbols: list[str], start: str = None, end: str = datetime.today().strftime("%Y-%m-%d")) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    # A single symbol is answered without the surrounding stock list.
+    if len(symbols) == 1:
+        return historical_prices_request(symbols[0], start, end)
+    return f"{base_url()}/api/v3/historical-price-full/{','.join(symbols)}?from={start}&to={end}&apikey={api_key()}", decode_historical_stock_list
 
+def decode_historical_stock_list(body: bytes) -> pl.DataFrame:
+    schema = {"symbol": pl.String, "historical": pl.List(pl.Struct(HISORICAL_PRICES_SCHEMA))}
+    df = read_response(body, {"historicalStockList": pl.List(pl.Struct(schema))}, is_list=False)
+    df = df.explode("historicalStockList").drop_nulls("historicalStockList").unnest("historicalStockList")
+    return _unnest_bars(df)
 
 @ignore_rate_limit
-def market_cap(symbol, start: str = None, end: str = datetime.today().strftime("%Y-%m-%d")) -> pl.DataFrame:
-    url = f"https://financialmodelingprep.com/api/v3/historical-market-capitalization/{symbol}?from={start}&to={end}&apikey={api_key()}"
-    with urllib.request.urlopen(url) as response:
-        df = pl.read_json(response)
-    return df.select(
-        pl.col("symbol"),
+def batch_historical_prices(symbols: list[str], start: str = None, end: str = datetime.today().strftime("%Y-%m-%d")) -> pl.DataFrame:
+    return fetch_decoded(batch_historical_prices_request(symbols, start, end))
+
+multi_historical_prices = multi_batched_dataframe(batch_historical_prices, HISORICAL_PRICES_BATCH_SIZE)
+
+
+MARKET_CAP_SCHEMA = {
+    "symbol": pl.String,
+    "date": pl.String,
+    "marketCap": pl.Float64,
+}
+
+def market_cap_request(symbol, start: str = None, end: str = datetime.today().strftime("%Y-%m-%d")) -> tuple[str, t.Callable[[bytes], pl.DataFrame]]:
+    return f"{base_url()}/api/v3/historical-market-capitalization/{symbol}?from={start}&to={end}&apikey={api_key()}", decode_market_cap
+
+def decode_market_cap(body: bytes) -> pl.DataFrame:
+    df = read_response(body, MARKET_CAP_SCHEMA)
+    return df.with_columns(
         pl.col("date").str.to_date(),
-        pl.col("marketCap").cast(pl.Float64)
     )
 
+@ignore_rate_limit
+def market_cap(symbol, start: str = None, end: str = datetime.today().strftime("%Y-%m-%d")) -> pl.DataFrame:
+    return fetch_decoded(market_cap_request(symbol, start, end))
+
 multi_market_caps = multi_dataframe(convert_exceptions_to_none(market_cap))
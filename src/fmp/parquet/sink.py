@@ -0,0 +1,184 @@
+import os
+import pathlib
+import shutil
+import typing as t
+import uuid
+
+import polars as pl
+import pyarrow.parquet as pq
+
+# Row groups are filled with whole symbols until they hold at least this many rows.
+ROW_GROUP_ROWS = 100_000
+# Sorted rows are streamed to the file in batches of about this many rows.
+SORTED_BATCH_ROWS = 1_000_000
+# Beyond this many row ranges, a filter on the row group statistics is cheaper than the index.
+MAX_INDEXED_RANGES = 64
+
+
+def index_path(path: pathlib.Path) -> pathlib.Path:
+    return path.with_name(path.stem + ".index.parquet")
+
+
+def stored_order(path: pathlib.Path) -> list[str]:
+    """The columns the rows of the parquet file `path` are sorted by, as written by `write_sorted`."""
+    if not path.is_file():
+        return []
+    metadata = pq.ParquetFile(path).metadata
+    if metadata.num_row_groups == 0 or metadata.row_group(0).sorting_columns is None:
+        return []
+    names = metadata.schema.to_arrow_schema().names
+    return [names[c.column_index] for c in metadata.row_group(0).sorting_columns if not c.descending]
+
+
+def write_sorted(frame: pl.LazyFrame, path: pathlib.Path, sort_by: list[str]) -> None:
+    """Writes `frame` sorted by `sort_by` to `path`, with an index of the first sort column next to it.
+
+    All rows of a value of the first sort column, e.g. a symbol, are in one row group. The index maps
+    each value to its row group and the offset and length of its rows in the file. Rows without a
+    value come last. The rows are sorted in a single streaming pass.
+    """
+    key = sort_by[0]
+    counts = frame.group_by(key).len().sort(key, nulls_last=True).collect()
+    batches = frame.sort(sort_by, nulls_last=True).collect_batches(chunk_size=SORTED_BATCH_ROWS, engine="streaming")
+    temporary = path.with_name(path.name + ".tmp")
+    index = {key: [], "rowGroup": [], "offset": [], "length": []}
+    writer = None
+    offset = 0
+    groups = list(_chunks(counts, ROW_GROUP_ROWS))
+    for row_group, (group, rows) in enumerate(zip(groups, _take(batches, [g.get_column("len").sum() for g in groups]))):
+        if writer is None:
+            schema = rows.to_arrow().schema
+            # The order is recorded in the parquet metadata, see `stored_order`.
+            sorting = [pq.SortingColumn(schema.get_field_index(c)) for c in sort_by]
+            writer = pq.ParquetWriter(temporary, schema, compression="zstd", sorting_columns=sorting)
+        lengths = group.get_column("len")
+        index[key].extend(group.get_column(key))
+        index["rowGroup"].extend([row_group] * len(group))
+        index["offset"].extend(offset + lengths.cum_sum() - lengths)
+        index["length"].extend(lengths)
+        writer.write_table(rows.to_arrow(), row_group_size=len(rows))
+        offset += len(rows)
+    if writer is None:
+        frame.collect().write_parquet(temporary)
+    else:
+        writer.close()
+    index = pl.DataFrame(index, schema={key: counts.schema[key], "rowGroup": pl.Int32, "offset": pl.Int64, "length": pl.Int64})
+    os.replace(temporary, path)
+    temporary = index_path(path).with_name(index_path(path).name + ".tmp")
+    index.write_parquet(temporary)
+    os.replace(temporary, index_path(path))
+
+
+def _take(batches: t.Iterable[pl.DataFrame], sizes: list[int]) -> t.Iterator[pl.DataFrame]:
+    # Frames of exactly `sizes` rows out of the consecutive rows of `batches`.
+    batches = iter(batches)
+    pending = pl.DataFrame()
+    for size in sizes:
+        parts = [pending]
+        while sum(len(p) for p in parts) < size:
+            parts.append(next(batches))
+        rows = pl.concat([p for p in parts if p.width > 0])
+        pending = rows.slice(size)
+        yield rows.head(size)
+
+
+def _chunks(counts: pl.DataFrame, rows: int) -> t.Iterator[pl.DataFrame]:
+    # Consecutive runs of `counts` with at least `rows` rows, except for the last one.
+    start, total = 0, 0
+    for i, length in enumerate(counts.get_column("len")):
+        total += length
+        if total >= rows:
+            yield counts.slice(start, i + 1 - start)
+            start, total = i + 1, 0
+    if start < len(counts):
+        yield counts.slice(start)
+
+
+def scan_indexed(path: pathlib.Path, values: list) -> pl.LazyFrame | None:
+    """Scans the rows of `values` of the first sort column of a file written by `write_sorted`.
+
+    Only the row ranges of `values` are read. Returns None if there is no index for `path`, if it
+    does not match the file, e.g. after an interrupted write, or if the rows are too scattered.
+    """
+    if not index_path(path).exists():
+        return None
+    index = pl.read_parquet(index_path(path))
+    if index.get_column("length").sum() != pq.read_metadata(path).num_rows:
+        return None
+    key = index.columns[0]
+    # Adjacent values are read as one range.
+    ranges = (
+        index.filter(pl.col(key).is_in(values)).sort("offset")
+        .with_columns(run=(pl.col("offset") != (pl.col("offset") + pl.col("length")).shift()).cum_sum())
+        .group_by("run", maintain_order=True).agg(pl.col("offset").first(), pl.col("length").sum())
+    )
+    scan = pl.scan_parquet(path)
+    if len(ranges) == 0:
+        return scan.clear()
+    if len(ranges) > MAX_INDEXED_RANGES:
+        return None
+    return pl.concat([scan.slice(offset, length) for offset, length in ranges.select("offset", "length").iter_rows()])
+
+
+class ParquetSink:
+    """Streams batches into part files next to `path` and compacts them into `path` on close.
+
+    Parts left behind by an interrupted run are picked up by the next close. With `append`, the
+    rows already stored in `path` are kept as well. With `sort_by`, the compacted file is written
+    by `write_sorted`.
+    """
+
+    def __init__(self, path: pathlib.Path, append: bool = False, sort_by: list[str] | None = None):
+        self.path = pathlib.Path(path)
+        self.parts = self.path.with_name(self.path.name + ".parts")
+        self.append = append
+        self.sort_by = sort_by
+
+    def write(self, frame: pl.DataFrame) -> None:
+        self.parts.mkdir(parents=True, exist_ok=True)
+        frame.write_parquet(self.parts / f"part-{uuid.uuid4().hex}.parquet")
+
+    def close(self) -> None:
+        parts = sorted(self.parts.glob("*.parquet"))
+        if len(parts) == 0:
+            return
+        if self.append and self.path.exists():
+            parts = [self.path] + parts
+        if self.sort_by is not None:
+            write_sorted(pl.scan_parquet(parts), self.path, self.sort_by)
+        else:
+            temporary = self.path.with_name(self.path.name + ".tmp")
+            pl.scan_parquet(parts).sink_parquet(temporary)
+            os.replace(temporary, self.path)
+        shutil.rmtree(self.parts)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+        index_path(self.path).unlink(missing_ok=True)
+        shutil.rmtree(self.parts, ignore_errors=True)
+
+
+class PartitionedParquetSink:
+    """Appends batches to a hive-partitioned dataset under `directory`.
+
+    `partition_by` maps each partition column to the expression computing it. Every write adds
+    new part files, existing files are never touched.
+    """
+
+    def __init__(self, directory: pathlib.Path, partition_by: dict[str, pl.Expr]):
+        self.directory = pathlib.Path(directory)
+        self.partition_by = partition_by
+
+    def write(self, frame: pl.DataFrame) -> None:
+        frame = frame.with_columns(**self.partition_by)
+        partitions = frame.partition_by(list(self.partition_by), as_dict=True, include_key=False)
+        for values, partition in partitions.items():
+            directory = self.directory.joinpath(*(f"{c}={v}" for c, v in zip(self.partition_by, values)))
+            directory.mkdir(parents=True, exist_ok=True)
+            partition.write_parquet(directory / f"part-{uuid.uuid4().hex}.parquet")
+
+    def close(self) -> None:
+        pass
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,32 +1,369 @@
 from . import financials, pricing, company
+from .compact import DICTIONARY_FILE, ENUM_COLUMNS, CompactSink, Dictionary, compact_dtypes
+from .manifest import Manifest, ManifestSink
+from .sink import ParquetSink, PartitionedParquetSink, scan_indexed, stored_order, write_sorted
+import itertools
+import os
 import pathlib
-from dataclasses import dataclass
+import zlib
+from concurrent import futures
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from functools import partial
 import polars as pl
 import typing as t
 import timastock as tm
+from fmp.common import FrameCollector, decode_pool, fetch_decoded, ignore_rate_limit, multithread_collect, multithread_concat, convert_exceptions_to_none, trace_log
 
-def store_universe(symbols: list, path: pathlib.Path) -> None:
+MANIFEST_FILE = "_manifest.jsonl"
+SYMBOL_BUCKETS = 16
+
+def symbol_bucket(symbol: str) -> int:
+    # crc32 is stable across processes and library versions, unlike polars' hash.
+    return zlib.crc32(symbol.encode()) % SYMBOL_BUCKETS
+
+def _symbol_buckets(symbols: pl.Series) -> pl.Series:
+    unique = symbols.unique()
+    return symbols.replace_strict(unique, [symbol_bucket(s) for s in unique], return_dtype=pl.Int32)
+
+PARTITION_COLUMNS = {
+    "year": pl.col("date").dt.year(),
+    "bucket": pl.col("symbol").map_batches(_symbol_buckets, return_dtype=pl.Int32),
+}
+# Partition columns of each dataset in the partitioned layout. Company profiles stay a single file.
+PARTITIONED_DATASETS = {
+    "income_statements": ["year"],
+    "balance_sheets": ["year"],
+    "cashflow_statements": ["year"],
+    "key_metrics": ["year"],
+    "prices": ["year", "bucket"],
+}
+# Datasets stored as single files are sorted like this, with an index of the rows of each symbol.
+SORTED_DATASETS = {
+    "income_statements": ["symbol", "date"],
+    "balance_sheets": ["symbol", "date"],
+    "cashflow_statements": ["symbol", "date"],
+    "key_metrics": ["symbol", "date"],
+    "prices": ["symbol", "date"],
+}
+
+
+def _sink(path: pathlib.Path, name: str, partitioned: bool, append: bool = False) -> ParquetSink | PartitionedParquetSink:
+    if partitioned and name in PARTITIONED_DATASETS:
+        return PartitionedParquetSink(path / name, {c: PARTITION_COLUMNS[c] for c in PARTITIONED_DATASETS[name]})
+    return ParquetSink(path / f"{name}.parquet", append=append, sort_by=SORTED_DATASETS.get(name))
+
+def _is_partitioned(path: pathlib.Path, name: str) -> bool:
+    return (path / name).is_dir()
+
+def _scan(path: pathlib.Path, name: str) -> pl.LazyFrame:
+    if _is_partitioned(path, name):
+        return pl.scan_parquet(
+            path / name, hive_partitioning=True,
+            hive_schema={c: pl.Int32 for c in PARTITIONED_DATASETS[name]})
+    return pl.scan_parquet(path / f"{name}.parquet")
+
+
+# Fetchers of every dataset stored per symbol.
+DATASET_FETCHERS = {
+    "income_statements": financials.income_statement,
+    "balance_sheets": financials.balance_sheet,
+    "cashflow_statements": financials.cashflow_statement,
+    "key_metrics": financials.key_metrics,
+    "prices": pricing.historical_prices,
+    "company_profiles": company.company_profile,
+}
+# Datasets whose endpoint serves several symbols per request, with their batch fetcher and size.
+DATASET_BATCH_FETCHERS = {
+    "prices": (pricing.batch_historical_prices, pricing.HISORICAL_PRICES_BATCH_SIZE),
+    "company_profiles": (company.batch_company_profiles, company.COMPANY_PROFILE_BATCH_SIZE),
+}
+# Url and decoder of every dataset, used instead of the fetchers when decoding in other processes.
+DATASET_REQUESTS = {
+    "income_statements": financials.income_statement_request,
+    "balance_sheets": financials.balance_sheet_request,
+    "cashflow_statements": financials.cashflow_statement_request,
+    "key_metrics": financials.key_metrics_request,
+    "prices": pricing.historical_prices_request,
+    "company_profiles": company.company_profile_request,
+}
+DATASET_BATCH_REQUESTS = {
+    "prices": pricing.batch_historical_prices_request,
+    "company_profiles": company.batch_company_profiles_request,
+}
+
+
+def store_universe(
+    symbols: list,
+    path: pathlib.Path,
+    partitioned: bool = False,
+    max_workers: int = 8,
+    resume: bool = False,
+    decode_processes: int | None = None,
+    compact: bool = False,
+) -> None:
+    """Fetches all datasets of `symbols` into `path`.
+
+    Progress is logged to a manifest in `path`. If one exists and `resume` is set, only pairs of
+    symbol and dataset that were not attempted yet are fetched, see `retry_failed` for the rest.
+    Otherwise the datasets stored in `path` are replaced. A resumed store must have the layout
+    requested by `partitioned`.
+    With `decode_processes`, the `max_workers` threads only download and the responses are decoded
+    in a pool of that many processes, e.g. `os.cpu_count()`.
+    With `compact`, the datasets are stored with the dtypes of `fmp.parquet.compact` and read back
+    with Enums by `access_universe`. A resumed store keeps the dtypes it was started with.
+    """
     if not path.exists():
         path.mkdir(parents=True)
 
-    income_statements = financials.multi_income_statements(symbols)
-    income_statements.write_parquet(path / "income_statements.parquet")
-    del income_statements
-    balance_sheets = financials.multi_balance_sheets(symbols)
-    balance_sheets.write_parquet(path / "balance_sheets.parquet")
-    del balance_sheets
-    cashflow_statements = financials.multi_cashflow_statements(symbols)
-    cashflow_statements.write_parquet(path / "cashflow_statements.parquet")
-    del cashflow_statements
-    key_metrics = financials.multi_key_metrics(symbols)
-    key_metrics.write_parquet(path / "key_metrics.parquet")
-    del key_metrics
-    prices = pricing.multi_historical_prices(symbols)
-    prices.write_parquet(path / "prices.parquet")
-    del prices
-    company_profiles = company.multi_company_profiles(symbols)
-    company_profiles.write_parquet(path / "company_profiles.parquet")
-    del company_profiles
+    manifest = Manifest(path / MANIFEST_FILE)
+    dictionary = Dictionary(path / DICTIONARY_FILE)
+    if resume and manifest.exists():
+        _check_layout(path, partitioned)
+        attempted = manifest.pairs("done") | manifest.pairs("failed")
+        pairs = [(s, name) for s in symbols for name in DATASET_FETCHERS if (s, name) not in attempted]
+        _ingest(path, pairs, partitioned, max_workers, decode_processes, _stored_dictionary(path), append=True)
+    else:
+        manifest.clear()
+        dictionary.clear()
+        # Both layouts are cleared, a dataset left in the other one would be read instead.
+        for name in DATASET_FETCHERS:
+            _sink(path, name, partitioned=True).clear()
+            _sink(path, name, partitioned=False).clear()
+        pairs = [(s, name) for s in symbols for name in DATASET_FETCHERS]
+        _ingest(path, pairs, partitioned, max_workers, decode_processes, dictionary if compact else None)
+
+
+def _check_layout(path: pathlib.Path, partitioned: bool) -> None:
+    for name in PARTITIONED_DATASETS:
+        stored = _is_partitioned(path, name)
+        if stored != partitioned and (stored or (path / f"{name}.parquet").exists()):
+            layout = "partitioned" if stored else "single file"
+            raise ValueError(f"Cannot resume the {layout} {name} of {path} with partitioned={partitioned}.")
+
+
+def retry_failed(path: pathlib.Path, max_workers: int = 8, decode_processes: int | None = None) -> None:
+    """Fetches the pairs of symbol and dataset that failed in earlier runs of `store_universe` again."""
+    pairs = sorted(Manifest(path / MANIFEST_FILE).pairs("failed"))
+    if len(pairs) > 0:
+        _ingest(path, pairs, _is_partitioned(path, "prices"), max_workers, decode_processes, _stored_dictionary(path), append=True)
+
+
+def ingestion_manifest(path: pathlib.Path) -> pl.DataFrame:
+    return Manifest(path / MANIFEST_FILE).read()
+
+
+def _stored_dictionary(path: pathlib.Path) -> Dictionary | None:
+    # Only stores written with compact dtypes have a dictionary.
+    dictionary = Dictionary(path / DICTIONARY_FILE)
+    return dictionary if dictionary.exists() else None
+
+
+def _fetch_first(fetch: t.Callable[[str], pl.DataFrame], symbols: list[str]) -> pl.DataFrame:
+    return fetch(symbols[0])
+
+
+def dataset_fetcher(name: str, fetchers: dict[str, t.Callable[[str], pl.DataFrame]] | None = None) -> tuple[t.Callable[[list[str]], pl.DataFrame], int]:
+    """Fetcher of dataset `name` over a list of symbols, with the number of symbols it takes per call.
+
+    Single symbol fetchers are looked up in `fetchers`, `DATASET_FETCHERS` by default.
+    """
+    if name in DATASET_BATCH_FETCHERS:
+        return DATASET_BATCH_FETCHERS[name]
+    return partial(_fetch_first, (DATASET_FETCHERS if fetchers is None else fetchers)[name]), 1
+
+
+def interleave_workers(workers_of: dict[str, list]) -> list:
+    """Takes turns between the workers of every dataset.
+
+    All requests share one queue, so a slow endpoint or symbol never stalls the others.
+    """
+    return [w for ws in itertools.zip_longest(*workers_of.values()) for w in ws if w is not None]
+
+
+@ignore_rate_limit
+def _fetch_in_pool(request: t.Callable[[list[str]], tuple], pool: futures.Executor, symbols: list[str]) -> pl.DataFrame:
+    return fetch_decoded(request(symbols), pool)
+
+
+def _fetch_recorded(fetch: t.Callable[[list[str]], pl.DataFrame], manifest: Manifest, symbols: list[str], name: str) -> pl.DataFrame | None:
+    try:
+        frame = fetch(symbols)
+    except Exception as e:
+        if len(symbols) > 1 and isinstance(e, pl.exceptions.PolarsError):
+            # A single malformed record fails its whole batch, so the symbols are fetched one by one.
+            trace_log(f"Exception {e} encountered when decoding {name} of {symbols}, fetching them one by one.")
+            frames = [_fetch_recorded(fetch, manifest, [symbol], name) for symbol in symbols]
+            frames = [frame for frame in frames if frame is not None]
+            return pl.concat(frames) if len(frames) > 0 else None
+        trace_log(f"Exception {e} encountered when fetching {name} of {symbols}.")
+        manifest.record(name, symbols, "failed", str(e))
+        return None
+    # Symbols without any rows are done right away, the others once their rows are persisted.
+    returned = set() if frame is None else set(frame.get_column("symbol").unique().to_list())
+    manifest.record(name, [s for s in symbols if s not in returned], "done")
+    if frame is None or len(frame) == 0:
+        return None
+    return frame
+
+
+def _ingest(
+    path: pathlib.Path,
+    pairs: list[tuple[str, str]],
+    partitioned: bool,
+    max_workers: int,
+    decode_processes: int | None = None,
+    dictionary: Dictionary | None = None,
+    append: bool = False,
+) -> None:
+    manifest = Manifest(path / MANIFEST_FILE)
+    with decode_pool(decode_processes) as pool:
+        workers_of = {}
+        for name in DATASET_FETCHERS:
+            symbols = [s for s, n in pairs if n == name]
+            fetch, batch_size = dataset_fetcher(name)
+            if pool is not None:
+                request = DATASET_BATCH_REQUESTS.get(name, partial(_fetch_first, DATASET_REQUESTS[name]))
+                fetch = partial(_fetch_in_pool, request, pool)
+            workers_of[name] = [
+                (name, partial(_fetch_recorded, fetch, manifest, symbols[i:i + batch_size], name))
+                for i in range(0, len(symbols), batch_size)]
+        workers = interleave_workers(workers_of)
+        # Pairs only count as done once their batch is persisted, so a restart never loses buffered rows.
+        sinks = {name: _sink(path, name, partitioned, append) for name in DATASET_FETCHERS}
+        if dictionary is not None:
+            sinks = {name: CompactSink(sink, dictionary) for name, sink in sinks.items()}
+        collectors = {name: FrameCollector(sink=ManifestSink(sink, manifest, name)) for name, sink in sinks.items()}
+        multithread_collect(workers, collectors, caller_name="store_universe", max_workers=max_workers)
+    for collector in collectors.values():
+        collector.finish()
+
+
+def update_universe(path: pathlib.Path, symbols: list | None = None) -> None:
+    """Fetches only data newer than what is stored under `path` and merges it into the stored datasets.
+
+    Symbols in `symbols` that are not stored yet are fetched in full. Partitioned datasets are
+    appended to, single files are rewritten.
+    """
+    stored_symbols = _scan(path, "company_profiles").select("symbol").collect().get_column("symbol").to_list()
+    symbols = list(dict.fromkeys(stored_symbols + (symbols or [])))
+
+    _update_prices(path, symbols)
+    _update_statements(path, "income_statements", financials.income_statement, symbols)
+    _update_statements(path, "balance_sheets", financials.balance_sheet, symbols)
+    _update_statements(path, "cashflow_statements", financials.cashflow_statement, symbols)
+    _update_statements(path, "key_metrics", financials.key_metrics, symbols)
+    # Profiles are a single row per symbol, refreshing them is as cheap as updating them.
+    _merge_into(path, "company_profiles", company.multi_company_profiles(symbols), key=["symbol"])
+
+
+def _latest_dates(path: pathlib.Path, name: str) -> dict[str, date]:
+    latest = _scan(path, name).group_by("symbol").agg(pl.col("date").max()).collect()
+    return dict(zip(latest.get_column("symbol").to_list(), latest.get_column("date").to_list()))
+
+
+def _update_prices(path: pathlib.Path, symbols: list) -> None:
+    today = date.today()
+    latest = _latest_dates(path, "prices")
+    fetch = convert_exceptions_to_none(pricing.historical_prices)
+    # Start at the last stored bar to notice splits and dividends that changed the adjusted history.
+    workers = [
+        partial(fetch, symbol, start=latest[symbol].isoformat() if symbol in latest else None, end=today.isoformat())
+        for symbol in symbols if latest.get(symbol, date.min) < today]
+    new = multithread_concat(workers, caller_name="update_prices")
+    if new is None:
+        return
+
+    stored = _scan(path, "prices").filter(pl.col("symbol").is_in(new.get_column("symbol").unique().to_list()))
+    overlap = new.join(stored.select("symbol", "date", "adjClose").collect(), on=["symbol", "date"], suffix="Stored")
+    readjusted = overlap.filter(
+        ((pl.col("adjClose") - pl.col("adjCloseStored")).abs() > 1e-6 * pl.col("adjCloseStored").abs())
+    ).get_column("symbol").unique().to_list()
+    if len(readjusted) > 0:
+        full = multithread_concat(
+            [partial(fetch, symbol, end=today.isoformat()) for symbol in readjusted], caller_name="update_readjusted_prices")
+        new = new.filter(~pl.col("symbol").is_in(readjusted))
+        if full is not None:
+            new = pl.concat([new, full])
+    _merge_into(path, "prices", new, key=["symbol", "date"], replace_symbols=readjusted)
+
+
+def _fetch_newer(fetch: t.Callable[..., pl.DataFrame], symbol: str, after: date | None, **kwargs) -> pl.DataFrame:
+    frame = fetch(symbol, **kwargs)
+    if after is None:
+        return frame
+    return frame.filter(pl.col("date") > after)
+
+
+def _update_statements(path: pathlib.Path, name: str, fetch: t.Callable[..., pl.DataFrame], symbols: list) -> None:
+    today = date.today()
+    latest = _latest_dates(path, name)
+    workers = []
+    for symbol in symbols:
+        if symbol not in latest:
+            workers.append(partial(convert_exceptions_to_none(fetch), symbol))
+        elif today - latest[symbol] > timedelta(days=365):
+            # Annual statements are returned newest first, so only ask for the missing years.
+            limit = today.year - latest[symbol].year + 1
+            workers.append(partial(convert_exceptions_to_none(_fetch_newer), fetch, symbol, latest[symbol], limit=limit))
+    _merge_into(path, name, multithread_concat(workers, caller_name=f"update_{name}"), key=["symbol", "date"])
+
+
+def _merge_into(path: pathlib.Path, name: str, new: pl.DataFrame | None, key: list[str], replace_symbols: list[str] | None = None) -> None:
+    if new is None or len(new) == 0:
+        return
+    dictionary = _stored_dictionary(path)
+    if dictionary is not None:
+        dictionary.update(new)
+        new = compact_dtypes(new)
+    if _is_partitioned(path, name):
+        _append_partitioned(path, name, new, key, replace_symbols)
+        return
+    file = path / f"{name}.parquet"
+    stored = pl.scan_parquet(file)
+    if replace_symbols:
+        stored = stored.filter(~pl.col("symbol").is_in(replace_symbols))
+    merged = pl.concat([stored, new.lazy()]).unique(key, keep="last", maintain_order=True)
+    if name in SORTED_DATASETS:
+        write_sorted(merged, file, SORTED_DATASETS[name])
+        return
+    temporary = file.with_name(file.name + ".tmp")
+    merged.sink_parquet(temporary)
+    os.replace(temporary, file)
+
+
+def _append_partitioned(path: pathlib.Path, name: str, new: pl.DataFrame, key: list[str], replace_symbols: list[str] | None) -> None:
+    partition_by = PARTITIONED_DATASETS[name]
+    if replace_symbols:
+        _remove_symbols(path / name, replace_symbols, partition_by)
+    # Only rows that are not stored yet are appended, the partition filters keep this lookup small.
+    years = new.get_column("date").dt.year().unique().to_list()
+    stored = _scan(path, name).filter(
+        pl.col("year").is_in(years), pl.col("symbol").is_in(new.get_column("symbol").unique().to_list())
+    ).select(key).collect()
+    new = new.unique(key, keep="last", maintain_order=True).join(stored, on=key, how="anti")
+    if len(new) > 0:
+        _sink(path, name, partitioned=True).write(new)
+
+
+def _remove_symbols(directory: pathlib.Path, symbols: list[str], partition_by: list[str]) -> None:
+    pattern = "**/*.parquet"
+    if "bucket" in partition_by:
+        buckets = {symbol_bucket(s) for s in symbols}
+        files = [f for f in directory.glob(pattern) if any(f"bucket={b}" in f.parts for b in buckets)]
+    else:
+        files = list(directory.glob(pattern))
+    for file in files:
+        frame = pl.read_parquet(file, hive_partitioning=False)
+        kept = frame.filter(~pl.col("symbol").is_in(symbols))
+        if len(kept) == len(frame):
+            continue
+        if len(kept) > 0:
+            temporary = file.with_name(file.name + ".tmp")
+            kept.write_parquet(temporary)
+            os.replace(temporary, file)
+        else:
+            file.unlink()
 
 
 @dataclass
@@ -38,45 +375,188 @@ class FmpUniverse:
     prices: pl.LazyFrame
     company_profiles: pl.LazyFrame
 
+    # Set by `access_universe` for `for_symbols`.
+    _path: pathlib.Path | None = field(default=None, repr=False, compare=False)
+    _compact: bool | None = field(default=None, repr=False, compare=False)
 
-def access_universe(path: pathlib.Path) -> FmpUniverse:
-    universe = FmpUniverse(
-        income_statements=pl.scan_parquet(path / "income_statements.parquet").select(financials.INCOME_STATEMENT_VALIDATED_FIELDS),
-        balance_sheets=pl.scan_parquet(path / "balance_sheets.parquet").select(financials.BALANCE_SHEET_VALIDATED_FIELDS),
-        cashflow_statements=pl.scan_parquet(path / "cashflow_statements.parquet").select(financials.CASHFLOW_STATEMENT_VALIDATED_FIELDS),
-        key_metrics=pl.scan_parquet(path / "key_metrics.parquet").select(financials.KEY_METRICS_VALIDATED_FIELDS),
-        prices=pl.scan_parquet(path / "prices.parquet").select(pricing.HISORICAL_PRICES_VALIDATED_FIELDS),
-        company_profiles=pl.scan_parquet(path / "company_profiles.parquet").select(company.COMPANY_PROFILE_VALIDATED_FIELDS)
-    )
+    def for_symbols(self, symbols: list[str]) -> "FmpUniverse":
+        """The datasets of only `symbols`, read through the index of the stored files if there is one."""
+        if self._path is None:
+            return filter_symbols(self, symbols)
+        return _access(self._path, self._compact, partial(_read_symbols, symbols=symbols))
+
+
+VALIDATED_FIELDS = {
+    "income_statements": financials.INCOME_STATEMENT_VALIDATED_FIELDS,
+    "balance_sheets": financials.BALANCE_SHEET_VALIDATED_FIELDS,
+    "cashflow_statements": financials.CASHFLOW_STATEMENT_VALIDATED_FIELDS,
+    "key_metrics": financials.KEY_METRICS_VALIDATED_FIELDS,
+    "prices": pricing.HISORICAL_PRICES_VALIDATED_FIELDS,
+    "company_profiles": company.COMPANY_PROFILE_VALIDATED_FIELDS,
+}
+
+
+def _read_symbols(path: pathlib.Path, name: str, symbols: list[str]) -> pl.LazyFrame:
+    if not _is_partitioned(path, name):
+        rows = scan_indexed(path / f"{name}.parquet", symbols)
+        if rows is not None:
+            return rows
+    return _of_symbols(_scan(path, name), symbols)
+
+
+def _compact_dictionary(path: pathlib.Path) -> Dictionary:
+    dictionary = Dictionary(path / DICTIONARY_FILE)
+    if not dictionary.exists():
+        # Stores written without compact dtypes get a dictionary of their current values, kept in memory only.
+        for name in DATASET_FETCHERS:
+            dictionary.update(_scan(path, name).select(pl.selectors.by_name(*ENUM_COLUMNS, require_all=False)).unique().collect(), save=False)
+    return dictionary
 
-    return universe
+
+def access_universe(path: pathlib.Path, compact: bool | None = None) -> FmpUniverse:
+    """Scans the validated fields of every dataset stored in `path`.
+
+    With `compact`, low-cardinality strings are read as Enums, prices and ratios as Float32 and calendar years as
+    Int16, see `fmp.parquet.compact`. It defaults to whether the store was written with compact dtypes.
+    """
+    return _access(path, compact, _scan)
+
+
+def _access(path: pathlib.Path, compact: bool | None, read: t.Callable[[pathlib.Path, str], pl.LazyFrame]) -> FmpUniverse:
+    if compact is None:
+        compact = _stored_dictionary(path) is not None
+    frames = {}
+    for name, fields in VALIDATED_FIELDS.items():
+        if _is_partitioned(path, name):
+            # Partition columns are kept, so filters on them prune whole directories.
+            fields = fields + PARTITIONED_DATASETS[name]
+        frames[name] = read(path, name).select(fields)
+        # Enums compare by their codes, which are not in the stored order of the strings.
+        if not compact and stored_order(path / f"{name}.parquet")[:1] == ["symbol"]:
+            frames[name] = frames[name].set_sorted("symbol")
+    if compact:
+        dictionary = _compact_dictionary(path)
+        frames = {name: dictionary.compact(frame) for name, frame in frames.items()}
+
+    return FmpUniverse(**frames, _path=path, _compact=compact)
+
+def _has_column(frame: pl.LazyFrame, column: str) -> bool:
+    return column in frame.collect_schema().names()
+
+def _until(frame: pl.LazyFrame, date: date) -> pl.LazyFrame:
+    if _has_column(frame, "year"):
+        frame = frame.filter(pl.col("year") <= date.year)
+    return frame.filter(pl.col('date') <= date)
+
+def _after(frame: pl.LazyFrame, date: date) -> pl.LazyFrame:
+    if _has_column(frame, "year"):
+        frame = frame.filter(pl.col("year") >= date.year)
+    return frame.filter(pl.col('date') > date)
 
 def split_universe(universe: FmpUniverse, date: pl.Date) -> tuple[FmpUniverse, FmpUniverse]:
     past = FmpUniverse(
-        income_statements=universe.income_statements.filter(pl.col('date') <= date),
-        balance_sheets=universe.balance_sheets.filter(pl.col('date') <= date),
-        cashflow_statements=universe.cashflow_statements.filter(pl.col('date') <= date),
-        key_metrics=universe.key_metrics.filter(pl.col('date') <= date),
-        prices=universe.prices.filter(pl.col('date') <= date),
+        income_statements=_until(universe.income_statements, date),
+        balance_sheets=_until(universe.balance_sheets, date),
+        cashflow_statements=_until(universe.cashflow_statements, date),
+        key_metrics=_until(universe.key_metrics, date),
+        prices=_until(universe.prices, date),
         company_profiles=universe.company_profiles
     )
     future = FmpUniverse(
-        income_statements=universe.income_statements.filter(pl.col('date') > date),
-        balance_sheets=universe.balance_sheets.filter(pl.col('date') > date),
-        cashflow_statements=universe.cashflow_statements.filter(pl.col('date') > date),
-        key_metrics=universe.key_metrics.filter(pl.col('date') > date),
-        prices=universe.prices.filter(pl.col('date') > date),
+        income_statements=_after(universe.income_statements, date),
+        balance_sheets=_after(universe.balance_sheets, date),
+        cashflow_statements=_after(universe.cashflow_statements, date),
+        key_metrics=_after(universe.key_metrics, date),
+        prices=_after(universe.prices, date),
         company_profiles=universe.company_profiles
     )
     return past, future
 
+# Datasets with a date column, split by `split_universe` and `walk_forward`.
+DATED_DATASETS = ["income_statements", "balance_sheets", "cashflow_statements", "key_metrics", "prices"]
+
+def _rows_through(frame: pl.DataFrame, dates: list[date]) -> tuple[pl.Series, pl.Series, list[pl.Series]]:
+    """The first and end row of every symbol run of `frame`, sorted by symbol and date, and for
+    each of `dates` the end of the rows of every run on or before it, found in a single search."""
+    run = frame.get_column("symbol").rle_id().cast(pl.Int64)
+    lengths = run.value_counts(sort=False).sort(run.name).get_column("count").cast(pl.Int64)
+    ends = lengths.cum_sum()
+    # Run and date packed in one key, it ascends over the whole frame like symbol and date.
+    keys = run * 2**32 + frame.get_column("date").cast(pl.Int64)
+    queries = (
+        pl.DataFrame({"date": pl.Series(dates, dtype=pl.Date).cast(pl.Int64)})
+        .join(pl.DataFrame({"run": pl.int_range(0, len(lengths), eager=True, dtype=pl.Int64)}), how="cross")
+        .select(pl.col("run") * 2**32 + pl.col("date"))
+        .to_series()
+    )
+    positions = keys.search_sorted(queries, side="right")
+    return ends - lengths, ends, [positions.slice(i * len(lengths), len(lengths)) for i in range(len(dates))]
+
+def _gather(frame: pl.DataFrame, starts: pl.Series, ends: pl.Series) -> pl.LazyFrame:
+    # Rows are gathered in order, the symbols stay sorted. Splits that are never collected gather nothing.
+    return pl.defer(lambda: frame.gather(pl.int_ranges(starts, ends, eager=True).explode()), schema=frame.schema).set_sorted("symbol")
+
+def walk_forward(
+    universe: FmpUniverse,
+    cuts: t.Iterable[date],
+    lookback: timedelta | None = None,
+    horizon: timedelta | None = None,
+) -> t.Iterator[tuple[date, FmpUniverse, FmpUniverse]]:
+    """Yields each date of `cuts` in order with the past and future of `universe`, like `split_universe`.
+
+    The past is limited to `lookback` before and the future to `horizon` after each cut. The rows
+    within reach of any cut are collected once, in the order of symbol and date that
+    `timastock.misc.sort_by_symbol` expects. The bounds of every symbol at every cut are searched
+    at once and each split gathers its rows, without filtering the datasets again.
+    """
+    cuts = sorted(cuts)
+    if len(cuts) == 0:
+        return
+    frames = {}
+    for name in DATED_DATASETS:
+        frame = getattr(universe, name).filter(pl.col("date").is_not_null())
+        if lookback is not None:
+            frame = _after(frame, cuts[0] - lookback)
+        if horizon is not None:
+            frame = _until(frame, cuts[-1] + horizon)
+        frames[name] = frame
+    # Flagged datasets are only checked, the others are sorted once for all splits.
+    frames = {name: tm.misc.sort_by_symbol(frame, "date").rechunk() for name, frame in zip(frames, pl.collect_all(frames.values()))}
+
+    dates = cuts + ([cut - lookback for cut in cuts] if lookback is not None else []) + ([cut + horizon for cut in cuts] if horizon is not None else [])
+    bounds = {name: _rows_through(frame, dates) for name, frame in frames.items()}
+    for i, cut in enumerate(cuts):
+        past, future = {}, {}
+        for name, frame in frames.items():
+            first, end, through = bounds[name]
+            past[name] = _gather(frame, first if lookback is None else through[len(cuts) + i], through[i])
+            future[name] = _gather(frame, through[i], end if horizon is None else through[-len(cuts) + i])
+        yield cut, FmpUniverse(**past, company_profiles=universe.company_profiles), FmpUniverse(**future, company_profiles=universe.company_profiles)
+
+def _of_symbols(frame: pl.LazyFrame, symbols: list[str]) -> pl.LazyFrame:
+    if _has_column(frame, "bucket"):
+        frame = frame.filter(pl.col("bucket").is_in([symbol_bucket(s) for s in symbols]))
+    return frame.filter(pl.col("symbol").is_in(symbols))
+
+def filter_symbols(universe: FmpUniverse, symbols: list[str]) -> FmpUniverse:
+    universe = FmpUniverse(
+        income_statements=_of_symbols(universe.income_statements, symbols),
+        balance_sheets=_of_symbols(universe.balance_sheets, symbols),
+        cashflow_statements=_of_symbols(universe.cashflow_statements, symbols),
+        key_metrics=_of_symbols(universe.key_metrics, symbols),
+        prices=_of_symbols(universe.prices, symbols),
+        company_profiles=_of_symbols(universe.company_profiles, symbols)
+    )
+    return universe
+
 def sort_universe(universe: FmpUniverse) -> FmpUniverse:
+    """Sorts the dated datasets by symbol and date, which stored universes already are."""
     universe = FmpUniverse(
-        income_statements=universe.income_statements.sort("date"),
-        balance_sheets=universe.balance_sheets.sort("date"),
-        cashflow_statements=universe.cashflow_statements.sort("date"),
-        key_metrics=universe.key_metrics.sort("date"),
-        prices=universe.prices.sort("date"),
+        income_statements=tm.misc.sort_by_symbol(universe.income_statements, "date"),
+        balance_sheets=tm.misc.sort_by_symbol(universe.balance_sheets, "date"),
+        cashflow_statements=tm.misc.sort_by_symbol(universe.cashflow_statements, "date"),
+        key_metrics=tm.misc.sort_by_symbol(universe.key_metrics, "date"),
+        prices=tm.misc.sort_by_symbol(universe.prices, "date"),
         company_profiles=universe.company_profiles
     )
     return universe
@@ -92,25 +572,26 @@ def concat_universes(universes: t.Iterable[FmpUniverse]) -> FmpUniverse:
     )
     return universe
 
-def adjust_universe_by_rates(universe: FmpUniverse, rates: pl.DataFrame, ) -> FmpUniverse:
+def adjust_universe_by_rates(universe: FmpUniverse, rates: pl.DataFrame | tm.forex.RateTable, base: str = "eur") -> FmpUniverse:
     currencies = universe.company_profiles.select("symbol", "currency")
+    rates = rates.rebase(base) if isinstance(rates, tm.forex.RateTable) else tm.forex.RateTable.from_rates(rates, base)
 
     universe = FmpUniverse(
         income_statements=tm.forex.adjust_by_rates(
             universe.income_statements, rates, curr="reportedCurrency",
-            columns=financials.INCOME_STATEMENT_CURRENCY_FIELDS),
+            columns=financials.INCOME_STATEMENT_CURRENCY_FIELDS, base=base),
         balance_sheets=tm.forex.adjust_by_rates(
             universe.balance_sheets, rates, curr="reportedCurrency",
-            columns=financials.BALANCE_SHEET_CURRENCY_FIELDS),
+            columns=financials.BALANCE_SHEET_CURRENCY_FIELDS, base=base),
         cashflow_statements=tm.forex.adjust_by_rates(
             universe.cashflow_statements, rates, curr="reportedCurrency",
-            columns=financials.CASHFLOW_STATEMENT_VALIDATED_FIELDS),
+            columns=financials.CASHFLOW_STATEMENT_CURRENCY_FIELDS, base=base),
         key_metrics=tm.forex.adjust_by_rates(
             universe.key_metrics.join(currencies, on="symbol", how="left"), rates, curr="currency",
-            columns=financials.KEY_METRICS_CURRENCY_FIELDS),
+            columns=financials.KEY_METRICS_CURRENCY_FIELDS, base=base),
         prices=tm.forex.adjust_by_rates(
             universe.prices.join(currencies, on="symbol", how="left"), rates, curr="currency",
-            columns=pricing.HISORICAL_PRICES_CURRENCY_FIELDS).select(pl.exclude("currency")),
+            columns=pricing.HISORICAL_PRICES_CURRENCY_FIELDS, base=base).select(pl.exclude("currency")),
         company_profiles=universe.company_profiles
     )
 
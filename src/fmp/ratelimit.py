@@ -0,0 +1,100 @@
+import email.utils
+import threading
+import time
+from collections import namedtuple
+
+RateLimiterStats = namedtuple("RateLimiterStats", ["requests", "throttled", "slept_seconds", "concurrency"])
+
+
+class RateLimiter:
+    """Process-wide token bucket with an AIMD concurrency window.
+
+    Every request takes a token and a concurrency slot. A throttled request (HTTP 429) halves
+    the window and pauses all requests until its `Retry-After` has passed, every successful one
+    widens the window by one slot per window's worth of requests.
+    """
+
+    def __init__(self, calls_per_minute: float | None = None, max_concurrency: int = 8, default_backoff: float = 10.0):
+        self.default_backoff = default_backoff
+        self._condition = threading.Condition()
+        self._active = 0
+        self._paused_until = 0.0
+        self._requests = 0
+        self._throttled = 0
+        self._slept_seconds = 0.0
+        self.configure(calls_per_minute, max_concurrency)
+
+    def configure(self, calls_per_minute: float | None, max_concurrency: int = 8) -> None:
+        with self._condition:
+            self.calls_per_minute = calls_per_minute
+            self.max_concurrency = max_concurrency
+            self._concurrency = float(max_concurrency)
+            # Allow bursts of up to one second worth of calls.
+            self._capacity = max(1.0, calls_per_minute / 60) if calls_per_minute else 1.0
+            self._tokens = self._capacity
+            self._updated = time.monotonic()
+            self._condition.notify_all()
+
+    def _refill(self, now: float) -> None:
+        if self.calls_per_minute:
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self.calls_per_minute / 60)
+        self._updated = now
+
+    def acquire(self) -> None:
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                timeout = None
+                if now < self._paused_until:
+                    timeout = self._paused_until - now
+                elif self._active < int(self._concurrency):
+                    if not self.calls_per_minute:
+                        break
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    timeout = (1 - self._tokens) * 60 / self.calls_per_minute
+                self._condition.wait(timeout)
+            self._active += 1
+            self._requests += 1
+            self._slept_seconds += time.monotonic() - start
+
+    def release(self, throttled: bool = False, retry_after: float | None = None) -> None:
+        with self._condition:
+            self._active -= 1
+            if throttled:
+                self._throttled += 1
+                self._concurrency = max(1.0, self._concurrency / 2)
+                backoff = self.default_backoff if retry_after is None else retry_after
+                self._paused_until = max(self._paused_until, time.monotonic() + backoff)
+            else:
+                self._concurrency = min(float(self.max_concurrency), self._concurrency + 1 / self._concurrency)
+            self._condition.notify_all()
+
+    def stats(self) -> RateLimiterStats:
+        with self._condition:
+            return RateLimiterStats(self._requests, self._throttled, self._slept_seconds, int(self._concurrency))
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_rate_limiter = RateLimiter()
+
+def rate_limiter() -> RateLimiter:
+    return _rate_limiter
+
+def configure_rate_limit(calls_per_minute: float | None, max_concurrency: int = 8) -> None:
+    _rate_limiter.configure(calls_per_minute, max_concurrency)
@@ -0,0 +1,166 @@
+import asyncio
+import gzip
+import http.client
+import io
+import queue
+import threading
+import urllib.parse
+from urllib.error import HTTPError
+
+from . import ratelimit
+from .cache import ResponseCache
+
+_RETRYABLE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class HttpSession:
+    """Keep-alive HTTP client that pools connections per host and is safe to share between threads.
+
+    Failed requests raise `urllib.error.HTTPError` just like `urllib.request.urlopen`. If a
+    `limiter` is given, every request waits for it and reports throttling back to it. If a
+    `cache` is given, cached responses are served without touching the network.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 16,
+        timeout: float = 60.0,
+        max_redirects: int = 5,
+        limiter: ratelimit.RateLimiter | None = None,
+        cache: ResponseCache | None = None,
+    ):
+        self.pool_size = pool_size
+        self.limiter = limiter
+        self.cache = cache
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self._pools: dict[tuple[str, str, int], queue.LifoQueue] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, key: tuple[str, str, int]) -> queue.LifoQueue:
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue(self.pool_size)
+            return self._pools[key]
+
+    def _connect(self, key: tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _release(self, key: tuple[str, str, int], connection: http.client.HTTPConnection) -> None:
+        try:
+            self._pool(key).put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def get(self, url: str) -> bytes:
+        if self.cache is not None:
+            body = self.cache.get(url)
+            if body is not None:
+                return body
+        body = self._fetch(url)
+        if self.cache is not None:
+            self.cache.put(url, body)
+        return body
+
+    def forget(self, url: str) -> None:
+        """Drops the cached response of `url`, e.g. because it could not be decoded."""
+        if self.cache is not None:
+            self.cache.remove(url)
+
+    def _fetch(self, url: str) -> bytes:
+        for _ in range(self.max_redirects + 1):
+            parts = urllib.parse.urlsplit(url)
+            key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+            target = parts.path or "/"
+            if parts.query:
+                target += "?" + parts.query
+
+            response, body = self._limited_request(key, target)
+            if response.status in (301, 302, 303, 307, 308) and "Location" in response.headers:
+                url = urllib.parse.urljoin(url, response.headers["Location"])
+                continue
+            if response.status >= 400:
+                error = HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+                # Tells `fmp.common.ignore_rate_limit` that the limiter already paused for a 429.
+                error.limited = self.limiter is not None
+                raise error
+            return body
+        raise HTTPError(url, response.status, "Too many redirects", response.headers, io.BytesIO(body))
+
+    def _limited_request(self, key: tuple[str, str, int], target: str) -> tuple[http.client.HTTPResponse, bytes]:
+        if self.limiter is None:
+            return self._request(key, target)
+        self.limiter.acquire()
+        try:
+            response, body = self._request(key, target)
+        except Exception:
+            self.limiter.release()
+            raise
+        self.limiter.release(
+            throttled=response.status == 429,
+            retry_after=ratelimit.parse_retry_after(response.headers.get("Retry-After")))
+        return response, body
+
+    def _request(self, key: tuple[str, str, int], target: str) -> tuple[http.client.HTTPResponse, bytes]:
+        while True:
+            try:
+                connection = self._pool(key).get_nowait()
+                reused = True
+            except queue.Empty:
+                connection = self._connect(key)
+                reused = False
+            try:
+                connection.request("GET", target, headers={"Accept-Encoding": "gzip"})
+                response = connection.getresponse()
+                body = response.read()
+            except _RETRYABLE_CONNECTION_ERRORS:
+                connection.close()
+                # The server dropped an idle keep-alive connection, try the next one.
+                if reused:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(key, connection)
+            if response.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            return response, body
+
+    def close(self) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            while not pool.empty():
+                pool.get_nowait().close()
+
+
+_session = HttpSession(limiter=ratelimit.rate_limiter())
+
+def session() -> HttpSession:
+    return _session
+
+def set_cache(cache: ResponseCache | None) -> None:
+    _session.cache = cache
+
+def get(url: str) -> bytes:
+    return _session.get(url)
+
+def forget(url: str) -> None:
+    _session.forget(url)
+
+async def get_async(url: str) -> bytes:
+    return await asyncio.to_thread(_session.get, url)
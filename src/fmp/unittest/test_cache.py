@@ -0,0 +1,56 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+import fmp
+
+URL = "https://financialmodelingprep.com/api/v3/income-statement/BLUB?period=annual&limit=30&apikey={}"
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_key_ignores_api_key(self):
+        cache = fmp.cache.ResponseCache(self.directory.name)
+        cache.put(URL.format("secret"), b"[]")
+
+        self.assertEqual(cache.get(URL.format("other")), b"[]")
+        self.assertIsNone(cache.get(URL.replace("annual", "quarter").format("secret")))
+        self.assertIsNone(cache.get(URL.replace("https://financialmodelingprep.com", "http://127.0.0.1:8000").format("secret")))
+        self.assertEqual(fmp.cache.endpoint_of(URL), "income-statement")
+
+    def test_undecodable_response_is_dropped(self):
+        session = fmp.session.HttpSession(cache=fmp.cache.ResponseCache(self.directory.name))
+        url = URL.format("secret")
+        with mock.patch.object(fmp.session, "_session", session), \
+                mock.patch.object(session, "_fetch", return_value=b'{"Error Message": "x"}'):
+            with self.assertRaises(ValueError):
+                fmp.common.fetch_decoded((url, fmp.parquet.financials.decode_income_statement))
+        self.assertIsNone(session.cache.get(url))
+
+    def test_ttl(self):
+        cache = fmp.cache.ResponseCache(self.directory.name, ttls={"income-statement": timedelta(hours=1)})
+        cache.put(URL.format("secret"), b"[]")
+        path = next(cache._entries())
+        os.utime(path, (time.time(), time.time() - 7200))
+
+        self.assertIsNone(cache.get(URL.format("secret")))
+        self.assertEqual(cache.size(), 0)
+
+    def test_lru_eviction(self):
+        cache = fmp.cache.ResponseCache(self.directory.name, max_bytes=250)
+        for i in range(3):
+            cache.put(URL.format(i).replace("BLUB", f"S{i}"), b"x" * 100)
+            path = cache._path(URL.format(i).replace("BLUB", f"S{i}"))
+            os.utime(path, (time.time() - 100 + i, time.time()))
+        # S0 was read least recently and has to go.
+        self.assertIsNone(cache.get(URL.format(0).replace("BLUB", "S0")))
+        self.assertIsNotNone(cache.get(URL.format(2).replace("BLUB", "S2")))
+        self.assertLessEqual(cache.size(), 250)
@@ -0,0 +1,41 @@
+import pathlib
+import tempfile
+import unittest
+
+import polars as pl
+import polars.testing as polt
+import fmp
+
+
+def _frame(symbol: str) -> pl.DataFrame:
+    return pl.DataFrame({"symbol": [symbol] * 2, "value": [1.0, 2.0]})
+
+
+class CollectorTest(unittest.TestCase):
+    def test_multithread_concat(self):
+        symbols = [f"S{i}" for i in range(10)]
+        result = fmp.common.multithread_concat([lambda s=s: _frame(s) for s in symbols] + [lambda: None], batch_size=3)
+        expected = pl.concat([_frame(s) for s in symbols])
+
+        polt.assert_frame_equal(result, expected, check_row_order=False)
+
+    def test_parquet_sink(self):
+        symbols = [f"S{i}" for i in range(10)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "frames.parquet"
+            result = fmp.common.multithread_concat(
+                [lambda s=s: _frame(s) for s in symbols], sink=fmp.parquet.sink.ParquetSink(path), batch_size=4)
+            self.assertIsNone(result)
+            self.assertFalse(path.with_name("frames.parquet.parts").exists())
+
+            polt.assert_frame_equal(pl.read_parquet(path), pl.concat([_frame(s) for s in symbols]), check_row_order=False)
+
+    def test_write_sorted(self):
+        frame = pl.DataFrame({"symbol": ["B", None, "A", "B", "A", "C"], "value": [4.0, 9.0, 2.0, 3.0, 1.0, 5.0]})
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "frames.parquet"
+            fmp.parquet.sink.write_sorted(frame.lazy(), path, ["symbol", "value"])
+
+            # Rows without a symbol are kept, after all others.
+            polt.assert_frame_equal(pl.read_parquet(path), frame.sort("symbol", "value", nulls_last=True))
+            polt.assert_frame_equal(fmp.parquet.sink.scan_indexed(path, ["B"]).collect(), frame.filter(symbol="B").sort("value"))
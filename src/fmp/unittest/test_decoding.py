@@ -0,0 +1,91 @@
+import json
+import unittest
+from datetime import date
+from unittest import mock
+
+import polars as pl
+import fmp
+
+
+class DecodingTest(unittest.TestCase):
+    def setUp(self):
+        fmp.global_vars.provide_api_key("test")
+
+    def test_historical_prices(self):
+        bar = {field: 1 for field in fmp.parquet.pricing.HISORICAL_PRICES_SCHEMA}
+        body = json.dumps({"symbol": "BLUB", "historical": [{**bar, "date": "2024-01-02"}, {**bar, "date": "2024-01-03", "label": "x"}]})
+        with mock.patch.object(fmp.session, "get", return_value=body.encode()):
+            prices = fmp.parquet.pricing.historical_prices("BLUB")
+
+        self.assertEqual(prices.columns[:3], ["symbol", "date", "open"])
+        self.assertEqual(prices.get_column("symbol").to_list(), ["BLUB", "BLUB"])
+        self.assertEqual(prices.get_column("date").to_list(), [date(2024, 1, 2), date(2024, 1, 3)])
+        self.assertEqual(prices.schema["volume"], pl.Int64)
+        self.assertEqual(prices.schema["adjClose"], pl.Float64)
+
+    def test_historical_prices_empty(self):
+        with mock.patch.object(fmp.session, "get", return_value=b"{}"):
+            prices = fmp.parquet.pricing.historical_prices("BLUB")
+        self.assertEqual(len(prices), 0)
+
+    def test_error_response(self):
+        body = b'{"Error Message": "Limit Reach . Please upgrade your plan."}'
+        for decode in [fmp.parquet.financials.decode_income_statement, fmp.parquet.company.decode_company_profiles,
+                       fmp.parquet.pricing.decode_historical_prices, fmp.parquet.pricing.decode_historical_stock_list]:
+            with self.subTest(decode.__name__), self.assertRaises(ValueError):
+                decode(body)
+
+    def test_key_metrics(self):
+        entry = {field: 0.5 for field in fmp.parquet.financials.KEY_METRICS_SCHEMA}
+        entry.update({"symbol": "BLUB", "date": "2023-12-31", "calendarYear": "2023", "period": "FY", "inventoryTurnover": "Infinity"})
+        with mock.patch.object(fmp.session, "get", return_value=json.dumps([entry]).encode()):
+            metrics = fmp.parquet.financials.key_metrics("BLUB")
+
+        self.assertNotIn("inventoryTurnover", metrics.columns)
+        self.assertEqual(metrics.schema["calendarYear"], pl.Int32)
+        self.assertEqual(metrics.get_column("pbRatio").to_list(), [0.5])
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        fmp.global_vars.provide_api_key("test")
+        self.requests = []
+
+    def _get(self, url: str) -> bytes:
+        self.requests.append(url)
+        symbols = url.split("?")[0].split("/")[-1].split(",")
+        if "/profile/" in url:
+            return json.dumps([{"symbol": s, "companyName": s.lower(), "fullTimeEmployees": "" if s == "S3" else "10"} for s in symbols]).encode()
+
+        def bars(symbol):
+            return [{"date": "2024-13-02" if symbol == "BAD" else "2024-01-02", "adjClose": 1.0}]
+        if len(symbols) == 1:
+            return json.dumps({"symbol": symbols[0], "historical": bars(symbols[0])}).encode()
+        return json.dumps({"historicalStockList": [{"symbol": s, "historical": bars(s)} for s in symbols]}).encode()
+
+    def test_batch_historical_prices(self):
+        symbols = [f"S{i}" for i in range(11)]
+        with mock.patch.object(fmp.session, "get", side_effect=self._get):
+            prices = fmp.parquet.pricing.multi_historical_prices(symbols)
+
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(sorted(prices.get_column("symbol").to_list()), sorted(symbols))
+
+    def test_batch_company_profiles(self):
+        symbols = [f"S{i}" for i in range(120)]
+        with mock.patch.object(fmp.session, "get", side_effect=self._get):
+            profiles = fmp.parquet.company.multi_company_profiles(symbols)
+
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(profiles.filter(symbol="S7").get_column("companyName").item(), "s7")
+        self.assertEqual(profiles.schema["fullTimeEmployees"], pl.Int64)
+        self.assertIsNone(profiles.filter(symbol="S3").get_column("fullTimeEmployees").item())
+
+    def test_batch_with_malformed_record(self):
+        symbols = ["S0", "BAD", "S2", "S3", "S4", "S5"]
+        with mock.patch.object(fmp.session, "get", side_effect=self._get):
+            prices = fmp.parquet.pricing.multi_historical_prices(symbols)
+
+        # The first batch fails to decode and is fetched again symbol by symbol.
+        self.assertEqual(len(self.requests), 2 + 5)
+        self.assertEqual(sorted(prices.get_column("symbol").to_list()), ["S0", "S2", "S3", "S4", "S5"])
@@ -0,0 +1,192 @@
+import json
+import pathlib
+import tempfile
+import os
+import unittest
+import urllib.request
+from concurrent import futures
+from unittest import mock
+from datetime import date
+
+import polars as pl
+import polars.testing as polt
+import fmp
+import fmp.cache
+import fmp.mockserver
+import timastock as tm
+
+
+class MockServerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = fmp.mockserver.MockFmpServer(years=3, throttle_rate=0.05, retry_after=0.01).start()
+        fmp.global_vars.provide_api_key("test")
+        fmp.global_vars.provide_base_url(self.server.url)
+
+    def tearDown(self):
+        fmp.global_vars.provide_base_url("https://financialmodelingprep.com")
+        self.server.stop()
+
+    def test_store_universe(self):
+        symbols = [f"S{i}" for i in range(12)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory)
+            fmp.parquet.universe.store_universe(symbols, path)
+            universe = fmp.parquet.universe.access_universe(path)
+
+            self.assertEqual(fmp.parquet.universe.ingestion_manifest(path).filter(status="failed").height, 0)
+            self.assertEqual(universe.income_statements.select(pl.len()).collect().item(), 36)
+            self.assertEqual(universe.company_profiles.select(pl.len()).collect().item(), 12)
+            prices = universe.prices.group_by("symbol").len().collect()
+            self.assertEqual(prices.height, 12)
+            self.assertGreater(prices.get_column("len").min(), 700)
+        # Four statement requests per symbol, prices in batches of 5 and one profile request.
+        self.assertEqual(self.server.requests - self.server.throttled, 4 * 12 + 3 + 1)
+
+    def test_store_universe_decoding_in_processes(self):
+        symbols = [f"S{i}" for i in range(12)]
+        with tempfile.TemporaryDirectory() as threaded, tempfile.TemporaryDirectory() as pooled:
+            fmp.parquet.universe.store_universe(symbols, pathlib.Path(threaded))
+            fmp.parquet.universe.store_universe(symbols, pathlib.Path(pooled), decode_processes=2)
+            expected = fmp.parquet.universe.access_universe(pathlib.Path(threaded))
+            result = fmp.parquet.universe.access_universe(pathlib.Path(pooled))
+
+            self.assertEqual(fmp.parquet.universe.ingestion_manifest(pathlib.Path(pooled)).filter(status="failed").height, 0)
+            for name, key in [("income_statements", ["symbol", "date"]), ("prices", ["symbol", "date"]), ("company_profiles", ["symbol"])]:
+                polt.assert_frame_equal(getattr(result, name).sort(key).collect(), getattr(expected, name).sort(key).collect())
+
+    def test_get_universe(self):
+        symbols = [f"S{i}" for i in range(7)]
+        universe = fmp.universe.get_universe(symbols)
+
+        self.assertEqual(list(universe), sorted(symbols))
+        self.assertEqual(universe.executives.height, 3 * 7)
+        self.assertEqual(universe.market_caps.get_column("symbol").n_unique(), 7)
+        statement = universe["S3"]["incomeStatement"]
+        print(statement)
+        self.assertEqual(statement.index.name, "calendarYear")
+        self.assertEqual(len(statement), 3)
+        self.assertTrue((statement["symbol"] == "S3").all())
+        self.assertEqual(set(universe["S3"]), {"incomeStatement", "balanceSheet", "cashflowStatement", "metrics", "prices", "marketCap", "profile", "executives"})
+        self.assertGreater(len(universe["S3"]["prices"]), 700)
+        with self.assertRaises(KeyError):
+            universe["NOPE"]
+
+    def test_recordings(self):
+        def profile(server, symbol):
+            with urllib.request.urlopen(f"{server.url}/api/v3/profile/{symbol}?apikey=test") as response:
+                return json.loads(response.read())[0]
+
+        with tempfile.TemporaryDirectory() as directory:
+            fmp.cache.ResponseCache(directory).put(
+                "https://financialmodelingprep.com/api/v3/profile/AAA?apikey=recorded",
+                b'[{"symbol": "AAA", "companyName": "Recorded"}]',
+            )
+            server = fmp.mockserver.MockFmpServer(recordings=pathlib.Path(directory)).start()
+            try:
+                self.assertEqual(profile(server, "AAA")["companyName"], "Recorded")
+                self.assertNotEqual(profile(server, "BBB")["companyName"], "Recorded")
+            finally:
+                server.stop()
+
+    def test_store_universe_compact(self):
+        symbols = [f"S{i}" for i in range(12)]
+        with tempfile.TemporaryDirectory() as plain, tempfile.TemporaryDirectory() as compact:
+            fmp.parquet.universe.store_universe(symbols, pathlib.Path(plain))
+            fmp.parquet.universe.store_universe(symbols, pathlib.Path(compact), compact=True)
+            expected = fmp.parquet.universe.access_universe(pathlib.Path(plain))
+            result = fmp.parquet.universe.access_universe(pathlib.Path(compact))
+
+            prices = result.prices.sort("symbol", "date").collect()
+            self.assertIsInstance(prices.schema["symbol"], pl.Enum)
+            self.assertEqual(prices.schema["adjClose"], pl.Float32)
+            self.assertEqual(result.income_statements.collect_schema()["calendarYear"], pl.Int16)
+            # Currency amounts keep their digits.
+            self.assertEqual(result.income_statements.collect_schema()["revenue"], pl.Float64)
+            self.assertEqual(result.key_metrics.collect_schema()["pbRatio"], pl.Float32)
+            self.assertIsInstance(result.company_profiles.collect_schema()["country"], pl.Enum)
+            plain_prices = expected.prices.sort("symbol", "date").collect()
+            polt.assert_frame_equal(prices, plain_prices, check_dtypes=False, rel_tol=1e-6)
+            print(f"Prices take {prices.estimated_size()} instead of {plain_prices.estimated_size()} bytes.")
+            self.assertLess(prices.estimated_size(), 0.65 * plain_prices.estimated_size())
+
+            # Both statements share the symbol Enum, so they join without casts.
+            profitability = tm.profitability.gross_profitability(result.income_statements, result.balance_sheets).collect()
+            self.assertEqual(profitability.height, 36)
+            # A store written with plain dtypes can still be read compact.
+            compacted = fmp.parquet.universe.access_universe(pathlib.Path(plain), compact=True)
+            self.assertIsInstance(compacted.prices.collect_schema()["symbol"], pl.Enum)
+            self.assertEqual(compacted.prices.select(pl.len()).collect().item(), prices.height)
+
+    def test_access_hot_universe(self):
+        symbols = [f"S{i}" for i in range(6)]
+        days = pl.date_range(date(1990, 1, 1), date.today(), eager=True)
+        rates = pl.concat([
+            pl.DataFrame({"date": days, "currency": "usd", "exchangeRate": 2.0}),
+            pl.DataFrame({"date": days, "currency": "eur", "exchangeRate": 1.0}),
+        ]).with_columns(pl.col("exchangeRate").cast(pl.Float32))
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory)
+            fmp.parquet.universe.store_universe(symbols, path)
+
+            hot = fmp.parquet.hotcache.access_hot_universe(path)
+            expected = fmp.parquet.universe.access_universe(path)
+            polt.assert_frame_equal(hot.prices.collect(), expected.prices.collect())
+            written = (path / "_hot" / "prices.arrow").stat().st_mtime_ns
+            fmp.parquet.hotcache.access_hot_universe(path)
+            self.assertEqual((path / "_hot" / "prices.arrow").stat().st_mtime_ns, written)
+
+            adjusted = fmp.parquet.hotcache.access_hot_universe(path, rates=rates)
+            polt.assert_frame_equal(
+                adjusted.prices.sort("symbol", "date").collect(),
+                fmp.parquet.universe.adjust_universe_by_rates(expected, rates).prices.sort("symbol", "date").collect())
+
+            # Every amount is in USD, so converting to USD gives the stored ones.
+            in_usd = fmp.parquet.hotcache.access_hot_universe(path, rates=rates, base="usd")
+            polt.assert_frame_equal(in_usd.prices.sort("symbol", "date").collect(), expected.prices.sort("symbol", "date").collect())
+            polt.assert_frame_equal(
+                fmp.parquet.universe.adjust_universe_by_rates(expected, rates, base="usd").income_statements.collect(),
+                expected.income_statements.collect())
+
+            # Changing the stored universe invalidates the cache, the frames mapped before stay readable.
+            fmp.parquet.universe.store_universe(symbols[:3], path)
+            hot = fmp.parquet.hotcache.access_hot_universe(path, rates=rates)
+            self.assertEqual(hot.prices.select(pl.col("symbol").n_unique()).collect().item(), 3)
+            self.assertEqual(adjusted.prices.select(pl.col("symbol").n_unique()).collect().item(), 6)
+
+            # Concurrent rebuilds each swap in a complete cache.
+            fmp.parquet.hotcache.clear_hot_universe(path)
+            with futures.ThreadPoolExecutor(4) as executor:
+                universes = list(executor.map(lambda _: fmp.parquet.hotcache.access_hot_universe(path), range(4)))
+            stored = fmp.parquet.universe.access_universe(path).prices.collect()
+            for universe in universes:
+                polt.assert_frame_equal(universe.prices.collect(), stored)
+            self.assertEqual([p.name for p in path.glob("_hot*")], ["_hot"])
+
+    def test_access_hot_universe_while_mapped(self):
+        replace = os.replace
+
+        def mapped(source, target):
+            # Like Windows, which refuses to move a directory while its files are mapped.
+            if pathlib.Path(source).name == "_hot":
+                raise PermissionError(source)
+            replace(source, target)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory)
+            fmp.parquet.universe.store_universe([f"S{i}" for i in range(6)], path)
+            before = fmp.parquet.hotcache.access_hot_universe(path)
+
+            fmp.parquet.universe.store_universe(["S0", "S1"], path)
+            with mock.patch("fmp.parquet.hotcache.os.replace", mapped):
+                kept = fmp.parquet.hotcache.access_hot_universe(path)
+                self.assertEqual(kept.prices.select(pl.col("symbol").n_unique()).collect().item(), 2)
+                self.assertEqual(before.prices.select(pl.col("symbol").n_unique()).collect().item(), 6)
+                self.assertEqual(len(list(path.glob("_hot.*.ready"))), 1)
+                # The kept build is read again rather than rebuilt.
+                fmp.parquet.hotcache.access_hot_universe(path)
+                self.assertEqual(len(list(path.glob("_hot.*"))), 1)
+
+            # Once the old cache can be moved, the kept build is swapped in.
+            hot = fmp.parquet.hotcache.access_hot_universe(path)
+            self.assertEqual(hot.prices.select(pl.col("symbol").n_unique()).collect().item(), 2)
+            self.assertEqual([p.name for p in path.glob("_hot*")], ["_hot"])
@@ -0,0 +1,278 @@
+import dataclasses
+import json
+import pathlib
+import tempfile
+import unittest
+from datetime import date, timedelta
+from functools import partial
+from unittest import mock
+
+import polars as pl
+import polars.testing as polt
+import pyarrow.parquet
+import fmp
+
+
+def _prices(symbol: str, start: date, days: int, adj_close: float = 1.0) -> pl.DataFrame:
+    return pl.DataFrame({
+        "symbol": [symbol] * days,
+        "date": [start + timedelta(days=i) for i in range(days)],
+        "adjClose": [adj_close] * days})
+
+
+class UpdateUniverseTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name)
+        self.today = date.today()
+        pl.DataFrame({"symbol": ["BLUB", "SPLT"]}).write_parquet(self.path / "company_profiles.parquet")
+        pl.concat([
+            _prices("BLUB", self.today - timedelta(days=9), 8),
+            _prices("SPLT", self.today - timedelta(days=9), 8),
+        ]).write_parquet(self.path / "prices.parquet")
+        statements = pl.DataFrame({"symbol": ["BLUB", "SPLT"], "date": [self.today - timedelta(days=100)] * 2})
+        for name in ["income_statements", "balance_sheets", "cashflow_statements", "key_metrics"]:
+            statements.write_parquet(self.path / f"{name}.parquet")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_update_universe(self):
+        starts = {}
+
+        def historical_prices(symbol, start=None, end=None):
+            starts[symbol] = start
+            if symbol == "SPLT" and start is None:
+                return _prices(symbol, self.today - timedelta(days=9), 10, adj_close=0.5)
+            return _prices(symbol, date.fromisoformat(start), 3, adj_close=1.0 if symbol == "BLUB" else 0.5)
+
+        statement = mock.Mock(return_value=None)
+        with mock.patch.multiple(fmp.parquet.pricing, historical_prices=historical_prices), \
+                mock.patch.multiple(fmp.parquet.financials, income_statement=statement, balance_sheet=statement,
+                                    cashflow_statement=statement, key_metrics=statement), \
+                mock.patch.object(fmp.parquet.company, "multi_company_profiles", return_value=None):
+            fmp.parquet.universe.update_universe(self.path)
+
+        prices = pl.read_parquet(self.path / "prices.parquet")
+        # BLUB is extended by two new bars, SPLT was adjusted and fetched again in full.
+        self.assertEqual(starts["BLUB"], (self.today - timedelta(days=2)).isoformat())
+        polt.assert_frame_equal(prices.filter(symbol="BLUB"), _prices("BLUB", self.today - timedelta(days=9), 10))
+        polt.assert_frame_equal(prices.filter(symbol="SPLT"), _prices("SPLT", self.today - timedelta(days=9), 10, 0.5))
+        # Statements younger than a year are not due yet.
+        statement.assert_not_called()
+
+
+def _dataset(fields: list[str], symbols: list[str], years: list[int]) -> pl.DataFrame:
+    rows = [(s, y) for s in symbols for y in years]
+    columns = {}
+    for field in fields:
+        if field == "symbol":
+            columns[field] = [s for s, _ in rows]
+        elif field == "date":
+            columns[field] = [date(y, 12, 31) for _, y in rows]
+        elif field == "fillingDate":
+            columns[field] = [date(y + 1, 3, 1) for _, y in rows]
+        elif field == "calendarYear":
+            columns[field] = [y for _, y in rows]
+        else:
+            columns[field] = [1.0] * len(rows)
+    return pl.DataFrame(columns)
+
+
+class StoreUniverseTest(unittest.TestCase):
+    def test_store_universe(self):
+        symbols = [f"S{i}" for i in range(30)]
+        fetchers = {
+            name: (lambda symbol, name=name: None if symbol == "S0" else _dataset(["symbol", "date", name], [symbol], [2020, 2021]))
+            for name in fmp.parquet.universe.DATASET_FETCHERS}
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(fmp.parquet.universe.DATASET_FETCHERS, fetchers), \
+                mock.patch.dict(fmp.parquet.universe.DATASET_BATCH_FETCHERS, clear=True):
+            path = pathlib.Path(directory)
+            fmp.parquet.universe.store_universe(symbols, path)
+            for name in fetchers:
+                stored = pl.read_parquet(path / f"{name}.parquet")
+                self.assertEqual(stored.columns, ["symbol", "date", name])
+                self.assertEqual(stored.get_column("symbol").n_unique(), 29)
+                self.assertEqual(len(stored), 58)
+
+    def test_resume_and_retry_failed(self):
+        symbols = [f"S{i}" for i in range(10)]
+        calls = []
+        failing = {"S1"}
+
+        def fetch(symbol, name):
+            calls.append((symbol, name))
+            if symbol in failing and name == "prices":
+                raise RuntimeError("connection reset")
+            return _dataset(["symbol", "date", name], [symbol], [2020])
+
+        fetchers = {name: partial(fetch, name=name) for name in fmp.parquet.universe.DATASET_FETCHERS}
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(fmp.parquet.universe.DATASET_FETCHERS, fetchers), \
+                mock.patch.dict(fmp.parquet.universe.DATASET_BATCH_FETCHERS, clear=True):
+            path = pathlib.Path(directory)
+            fmp.parquet.universe.store_universe(symbols[:5], path)
+            self.assertEqual(len(calls), 30)
+            # A restart only fetches what was not attempted yet.
+            fmp.parquet.universe.store_universe(symbols, path, resume=True)
+            self.assertEqual(len(calls), 60)
+            with self.assertRaises(ValueError):
+                fmp.parquet.universe.store_universe(symbols, path, partitioned=True, resume=True)
+            self.assertEqual(len(calls), 60)
+            manifest = fmp.parquet.universe.ingestion_manifest(path)
+            self.assertEqual(manifest.filter(status="failed").select("symbol", "dataset").rows(), [("S1", "prices")])
+
+            failing.clear()
+            fmp.parquet.universe.retry_failed(path)
+            self.assertEqual(calls[-1], ("S1", "prices"))
+            self.assertEqual(len(calls), 61)
+            self.assertEqual(fmp.parquet.universe.ingestion_manifest(path).filter(status="failed").height, 0)
+            self.assertEqual(pl.read_parquet(path / "prices.parquet").get_column("symbol").sort().to_list(), symbols)
+
+    def test_switch_layout(self):
+        fetchers = {
+            name: (lambda symbol, fields=fields: _dataset(fields, [symbol], [2020, 2021]))
+            for name, fields in fmp.parquet.universe.VALIDATED_FIELDS.items()}
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(fmp.parquet.universe.DATASET_FETCHERS, fetchers), \
+                mock.patch.dict(fmp.parquet.universe.DATASET_BATCH_FETCHERS, clear=True):
+            path = pathlib.Path(directory)
+            fmp.parquet.universe.store_universe(["A", "B", "C"], path, partitioned=True)
+            fmp.parquet.universe.store_universe(["A"], path)
+
+            self.assertFalse((path / "prices").exists())
+            universe = fmp.parquet.universe.access_universe(path)
+            self.assertEqual(universe.prices.select(pl.col("symbol").unique()).collect().get_column("symbol").to_list(), ["A"])
+            self.assertEqual(universe.company_profiles.collect().get_column("symbol").unique().to_list(), ["A"])
+
+    def test_error_response(self):
+        fmp.global_vars.provide_api_key("test")
+        def get(url: str) -> bytes:
+            if "BAD" in url:
+                return b'{"Error Message": "Limit Reach . Please upgrade your plan."}'
+            return b"[]" if "historical-price-full" not in url else b"{}"
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(fmp.session, "get", side_effect=get):
+            path = pathlib.Path(directory)
+            fmp.parquet.universe.store_universe(["BAD", "GOOD"], path)
+            manifest = fmp.parquet.universe.ingestion_manifest(path)
+        failed = manifest.filter(status="failed", symbol="BAD")
+        self.assertEqual(sorted(failed.get_column("dataset").to_list()), sorted(fmp.parquet.universe.DATASET_FETCHERS))
+        self.assertEqual(manifest.filter(status="done", symbol="BAD").height, 0)
+
+    def test_malformed_record_in_batch(self):
+        fmp.global_vars.provide_api_key("test")
+        def get(url: str) -> bytes:
+            symbols = url.split("?")[0].split("/")[-1].split(",")
+            if "historical-price-full" not in url:
+                return b"[]"
+            stocks = [{"symbol": s, "historical": [{"date": "2024-13-02" if s == "BAD" else "2024-01-02"}]} for s in symbols]
+            return json.dumps(stocks[0] if len(stocks) == 1 else {"historicalStockList": stocks}).encode()
+
+        symbols = ["S0", "BAD", "S2"]
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(fmp.session, "get", side_effect=get):
+            path = pathlib.Path(directory)
+            fmp.parquet.universe.store_universe(symbols, path)
+            manifest = fmp.parquet.universe.ingestion_manifest(path).filter(dataset="prices")
+            prices = pl.read_parquet(path / "prices.parquet")
+        # Only the symbol with the malformed record fails, the rest of its batch is stored.
+        self.assertEqual(manifest.filter(status="failed").get_column("symbol").to_list(), ["BAD"])
+        self.assertEqual(prices.get_column("symbol").to_list(), ["S0", "S2"])
+
+    def test_for_symbols(self):
+        symbols = [f"S{i}" for i in reversed(range(30))]
+        fetchers = {
+            name: (lambda symbol, fields=fields: _dataset(fields, [symbol], [2019, 2021, 2020]))
+            for name, fields in fmp.parquet.universe.VALIDATED_FIELDS.items()}
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(fmp.parquet.universe.DATASET_FETCHERS, fetchers), \
+                mock.patch.dict(fmp.parquet.universe.DATASET_BATCH_FETCHERS, clear=True), \
+                mock.patch.multiple(fmp.parquet.sink, ROW_GROUP_ROWS=5, SORTED_BATCH_ROWS=7):
+            path = pathlib.Path(directory)
+            fmp.parquet.universe.store_universe(symbols, path)
+
+            stored = pl.read_parquet(path / "prices.parquet")
+            polt.assert_frame_equal(stored, stored.sort("symbol", "date"))
+            # Every symbol lies in a single row group.
+            file = pyarrow.parquet.ParquetFile(path / "prices.parquet")
+            groups = [set(file.read_row_group(g).column("symbol").to_pylist()) for g in range(file.num_row_groups)]
+            self.assertEqual(sum(len(g) for g in groups), 30)
+            self.assertEqual(len(set().union(*groups)), 30)
+
+            self.assertEqual(fmp.parquet.sink.stored_order(path / "prices.parquet"), ["symbol", "date"])
+            universe = fmp.parquet.universe.access_universe(path)
+            self.assertTrue(universe.prices.collect().flags["symbol"]["SORTED_ASC"])
+            selected = universe.for_symbols(["S7", "S12", "S29", "NOPE"])
+            expected = fmp.parquet.universe.filter_symbols(universe, ["S7", "S12", "S29"])
+            polt.assert_frame_equal(selected.prices.collect(), expected.prices.sort("symbol", "date").collect())
+            polt.assert_frame_equal(selected.key_metrics.collect(), expected.key_metrics.sort("symbol", "date").collect())
+            self.assertEqual(selected.company_profiles.collect().height, 9)
+
+            # Replacing a dataset keeps the stored files to read the others through.
+            replaced = dataclasses.replace(universe, company_profiles=expected.company_profiles)
+            self.assertEqual((replaced._path, replaced._compact), (path, False))
+            self.assertEqual(replaced, dataclasses.replace(replaced, _path=None))
+            self.assertNotIn("_path", repr(universe))
+
+
+class PartitionedUniverseTest(unittest.TestCase):
+    def test_partitioned_layout(self):
+        symbols = [f"S{i}" for i in range(20)]
+        years = [2020, 2021, 2022]
+        datasets = {
+            "income_statements": fmp.parquet.financials.INCOME_STATEMENT_VALIDATED_FIELDS,
+            "balance_sheets": fmp.parquet.financials.BALANCE_SHEET_VALIDATED_FIELDS,
+            "cashflow_statements": fmp.parquet.financials.CASHFLOW_STATEMENT_VALIDATED_FIELDS,
+            "key_metrics": fmp.parquet.financials.KEY_METRICS_VALIDATED_FIELDS,
+            "prices": fmp.parquet.pricing.HISORICAL_PRICES_VALIDATED_FIELDS,
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory)
+            for name, fields in datasets.items():
+                sink = fmp.parquet.universe._sink(path, name, partitioned=True)
+                sink.write(_dataset(fields, symbols, years))
+                sink.close()
+            pl.DataFrame({f: symbols if f == "symbol" else ["x"] * 20 for f in fmp.parquet.company.COMPANY_PROFILE_VALIDATED_FIELDS}) \
+                .write_parquet(path / "company_profiles.parquet")
+
+            self.assertTrue((path / "prices" / "year=2021" / f"bucket={fmp.parquet.universe.symbol_bucket('S3')}").is_dir())
+            universe = fmp.parquet.universe.access_universe(path)
+            past, future = fmp.parquet.universe.split_universe(universe, date(2021, 6, 30))
+            self.assertEqual(past.prices.select(pl.len()).collect().item(), 20)
+            self.assertEqual(future.income_statements.select(pl.len()).collect().item(), 40)
+
+            selected = fmp.parquet.universe.filter_symbols(universe, ["S3", "S7"])
+            prices = selected.prices.collect()
+            self.assertEqual(sorted(prices.get_column("symbol").unique().to_list()), ["S3", "S7"])
+            self.assertEqual(len(prices), 6)
+
+            cuts = [date(2022, 6, 30), date(2021, 6, 30), date(2021, 12, 31)]
+            splits = list(fmp.parquet.universe.walk_forward(universe, cuts, lookback=timedelta(days=365), horizon=timedelta(days=365)))
+            self.assertEqual([cut for cut, _, _ in splits], sorted(cuts))
+            for cut, past, future in splits:
+                expected_past, expected_future = fmp.parquet.universe.split_universe(universe, cut)
+                for name in fmp.parquet.universe.DATED_DATASETS:
+                    polt.assert_frame_equal(
+                        getattr(past, name).collect(),
+                        getattr(expected_past, name).filter(pl.col("date") > cut - timedelta(days=365)).sort("date").collect(),
+                        check_row_order=False)
+                    polt.assert_frame_equal(
+                        getattr(future, name).collect(),
+                        getattr(expected_future, name).filter(pl.col("date") <= cut + timedelta(days=365)).sort("date").collect(),
+                        check_row_order=False)
+                # The splits are in symbol order, so functions sorting by symbol only check it.
+                prices = past.prices.collect()
+                self.assertTrue(prices.get_column("symbol").flags["SORTED_ASC"])
+                polt.assert_frame_equal(prices, prices.sort("symbol", "date"))
+            for cut, past, future in fmp.parquet.universe.walk_forward(universe, cuts):
+                expected_past, expected_future = fmp.parquet.universe.split_universe(universe, cut)
+                polt.assert_frame_equal(past.prices.collect(), expected_past.prices.collect(), check_row_order=False)
+                polt.assert_frame_equal(future.key_metrics.collect(), expected_future.key_metrics.collect(), check_row_order=False)
+                self.assertTrue(future.key_metrics.collect().get_column("symbol").flags["SORTED_ASC"])
+
+            # Appending skips rows that are already stored.
+            fmp.parquet.universe._merge_into(
+                path, "prices", _dataset(datasets["prices"], ["S3"], [2022, 2023]), key=["symbol", "date"])
+            universe = fmp.parquet.universe.access_universe(path)
+            self.assertEqual(universe.prices.filter(symbol="S3").select(pl.len()).collect().item(), 4)
@@ -0,0 +1,55 @@
+import unittest
+from datetime import date, timedelta
+
+import polars as pl
+import polars.testing as polt
+import fmp
+
+
+class PointInTimeTest(unittest.TestCase):
+    def setUp(self):
+        statements = pl.LazyFrame({
+            "symbol": ["A", "A", "B", "A", "B"],
+            "date": [date(2020, 12, 31), date(2021, 12, 31), date(2020, 12, 31), date(2019, 12, 31), date(2021, 12, 31)],
+            "fillingDate": [date(2021, 3, 1), date(2022, 3, 1), None, date(2020, 3, 1), date(2022, 8, 1)],
+            "revenue": [2.0, 3.0, 5.0, 1.0, 6.0],
+        })
+        key_metrics = statements.select("symbol", "date", pl.col("revenue").alias("peRatio"))
+        days = [date(2019, 6, 1) + timedelta(days=d) for d in range(0, 1200, 7)]
+        prices = pl.LazyFrame({"symbol": ["B", "A"] * len(days), "date": [d for d in days for _ in range(2)], "close": 1.0})
+        self.universe = fmp.parquet.universe.FmpUniverse(
+            statements, statements, statements, key_metrics, prices, pl.LazyFrame({"symbol": ["A", "B"]}))
+
+    def test_as_of(self):
+        known = fmp.parquet.pointintime.as_of(self.universe, date(2022, 6, 30))
+        statements = known.income_statements.collect().sort("symbol")
+        print(statements)
+        # B filed its 2021 statement after the cut, its 2020 one has no filling date and is left out.
+        self.assertEqual(statements.get_column("revenue").to_list(), [3.0])
+        self.assertEqual(known.key_metrics.collect().get_column("peRatio").to_list(), [3.0])
+
+        # With a reporting lag, it counts as filed that long after its period end.
+        known = fmp.parquet.pointintime.as_of(self.universe, date(2022, 6, 30), reporting_lag=timedelta(days=90))
+        statements = known.income_statements.collect().sort("symbol")
+        self.assertEqual(statements.get_column("revenue").to_list(), [3.0, 5.0])
+        self.assertEqual(statements.get_column("fillingDate").to_list(), [date(2022, 3, 1), date(2021, 3, 31)])
+        self.assertEqual(known.key_metrics.collect().sort("symbol").get_column("peRatio").to_list(), [3.0, 5.0])
+        self.assertEqual(known.prices.select(pl.max("date")).collect().item(), date(2022, 6, 25))
+
+        index = fmp.parquet.pointintime.StatementIndex.from_universe(self.universe)
+        self.assertEqual(fmp.parquet.pointintime.as_of(self.universe, date(2020, 1, 1), index).income_statements.collect().height, 0)
+
+    def test_attach(self):
+        index = fmp.parquet.pointintime.StatementIndex.from_universe(self.universe)
+        attached = index.attach(self.universe.prices).collect()
+        # The statement of every day is the latest one filed on or before it.
+        statements = index.income_statements
+        expected = self.universe.prices.collect().sort("symbol", "date").with_columns(
+            pl.struct("symbol", "date").map_elements(
+                lambda row: statements.filter(pl.col("symbol") == row["symbol"], pl.col("fillingDate") <= row["date"])
+                .get_column("revenue").last(), return_dtype=pl.Float64).alias("revenue"))
+        polt.assert_series_equal(attached.get_column("revenue"), expected.get_column("revenue"))
+        self.assertEqual(attached.columns, ["symbol", "date", "close", "date_statement", "fillingDate", "revenue"])
+        # Prices flagged as sorted by symbol, like those of `access_universe`, are taken in their order.
+        flagged = self.universe.prices.collect().sort("symbol", "date").set_sorted("symbol")
+        polt.assert_frame_equal(index.attach(flagged), attached)
@@ -0,0 +1,54 @@
+import time
+import unittest
+from urllib.error import HTTPError
+
+import fmp
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_token_bucket(self):
+        limiter = fmp.ratelimit.RateLimiter(calls_per_minute=600)
+        start = time.monotonic()
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release()
+        # 10 calls per second with a burst of 10 calls.
+        self.assertGreater(time.monotonic() - start, 0.9)
+        self.assertGreater(limiter.stats().slept_seconds, 0.9)
+
+    def test_aimd(self):
+        limiter = fmp.ratelimit.RateLimiter(max_concurrency=8, default_backoff=0.0)
+        limiter.acquire()
+        limiter.release(throttled=True)
+        self.assertEqual(limiter.stats().concurrency, 4)
+        limiter.acquire()
+        limiter.release(throttled=True)
+        self.assertEqual(limiter.stats().concurrency, 2)
+        # One more slot per window of successful requests.
+        for _ in range(40):
+            limiter.acquire()
+            limiter.release()
+        self.assertEqual(limiter.stats().concurrency, 8)
+        self.assertEqual(limiter.stats().throttled, 2)
+
+    def test_retry_after(self):
+        limiter = fmp.ratelimit.RateLimiter()
+        limiter.acquire()
+        limiter.release(throttled=True, retry_after=fmp.ratelimit.parse_retry_after("0.5"))
+        start = time.monotonic()
+        limiter.acquire()
+        limiter.release()
+        self.assertGreater(time.monotonic() - start, 0.4)
+
+    def test_ignore_rate_limit_without_limiter(self):
+        calls = []
+        @fmp.common.ignore_rate_limit
+        def throttled_once():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise HTTPError("http://localhost", 429, "Too Many Requests", {"Retry-After": "0.3"}, None)
+            return "done"
+
+        self.assertEqual(throttled_once(), "done")
+        # Nothing paused for the 429, so the retry waits for the Retry-After itself.
+        self.assertGreater(calls[1] - calls[0], 0.25)
@@ -0,0 +1,71 @@
+import http.server
+import tempfile
+import threading
+import unittest
+from concurrent import futures
+from urllib.error import HTTPError
+
+import fmp
+
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        self.server.requests += 1
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            body = b"[]"
+        else:
+            self.send_response(200)
+            body = b'[{"symbol": "BLUB"}]'
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SessionTest(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self.server.connections = set()
+        self.server.requests = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.session = fmp.session.HttpSession(pool_size=4)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keep_alive(self):
+        for _ in range(10):
+            self.assertEqual(self.session.get(f"{self.url}/api/v3/profile/BLUB"), b'[{"symbol": "BLUB"}]')
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_pool_shared_between_threads(self):
+        with futures.ThreadPoolExecutor(4) as executor:
+            bodies = list(executor.map(lambda _: self.session.get(f"{self.url}/api/v3/profile/BLUB"), range(100)))
+        self.assertEqual(len(bodies), 100)
+        self.assertLessEqual(len(self.server.connections), 8)
+
+    def test_http_error(self):
+        with self.assertRaises(HTTPError) as context:
+            self.session.get(f"{self.url}/missing")
+        self.assertEqual(context.exception.code, 404)
+        # The connection stays usable after an error response.
+        self.session.get(f"{self.url}/api/v3/profile/BLUB")
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.session.cache = fmp.cache.ResponseCache(directory)
+            first = self.session.get(f"{self.url}/api/v3/profile/BLUB?apikey=a")
+            second = self.session.get(f"{self.url}/api/v3/profile/BLUB?apikey=b")
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.requests, 1)
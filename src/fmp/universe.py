@@ -1,45 +1,108 @@
-from concurrent import futures
-import random
-import time
-from urllib.error import HTTPError
+import collections.abc
+import itertools
+from dataclasses import dataclass, fields
+from functools import partial
+import typing as t
 import pandas as pd
-import tqdm
-from . import financials, pricing, company, global_vars
-
-def _get_universe_entry(symbol: str) -> dict:
-    symbol_info = {}
-    retry = True
-    while retry:
-        try:
-            if "incomeStatement"    not in symbol_info:
-                symbol_info["incomeStatement"] = financials.income_statement(symbol)
-            if "balanceSheet"       not in symbol_info:
-                symbol_info["balanceSheet"] = financials.balance_sheet(symbol)
-            if "cashflowStatement"  not in symbol_info:
-                symbol_info["cashflowStatement"] = financials.cashflow_statement(symbol)
-            if "metrics"            not in symbol_info:
-                symbol_info["metrics"] = financials.key_metrics(symbol)
-            if "prices"             not in symbol_info:
-                symbol_info["prices"] = pricing.full_historical_prices(symbol)
-            if "marketCap"          not in symbol_info:
-                symbol_info["marketCap"] = pricing.market_cap(symbol)
-            if "profile"            not in symbol_info:
-                symbol_info["profile"] = company.company_profile(symbol)
-            if "executives"         not in symbol_info:
-                symbol_info["executives"] = company.executives(symbol)
-            return {symbol: symbol_info}
-        except HTTPError as err:
-            time.sleep(random.randrange(60))
-            retry = True
-        except Exception as err:
-            print(f"Error on symbol {symbol}: {err}")
-            return None
-
-def get_universe(symbols: list) -> list[dict]:
-    universe = {}
-    with futures.ThreadPoolExecutor(8) as executor:
-        runner = executor.map(lambda s: _get_universe_entry(s), symbols)
-        for stat in tqdm.tqdm(runner, "Constructing Universe", len(symbols)):
-            if stat is not None: universe.update(stat)
+import polars as pl
+from .common import FrameCollector, convert_exceptions_to_none, multithread_collect
+from .parquet import company, pricing, universe as stored_universe
+
+# Single symbol fetcher of every dataset, those of `fmp.parquet.universe.store_universe` and two more.
+DATASET_FETCHERS = {
+    **stored_universe.DATASET_FETCHERS,
+    "market_caps": pricing.market_cap,
+    "executives": company.executives,
+}
+# Key of every dataset in the dicts of the old `get_universe`, with the column its frames were indexed by.
+LEGACY_KEYS = {
+    "income_statements": ("incomeStatement", "calendarYear"),
+    "balance_sheets": ("balanceSheet", "calendarYear"),
+    "cashflow_statements": ("cashflowStatement", "calendarYear"),
+    "key_metrics": ("metrics", "calendarYear"),
+    "prices": ("prices", "date"),
+    "market_caps": ("marketCap", "date"),
+    "company_profiles": ("profile", None),
+    "executives": ("executives", None),
+}
+
+
+@dataclass
+class ColumnarUniverse(collections.abc.Mapping):
+    """One polars frame per dataset holding the rows of all symbols.
+
+    Indexing by symbol gives the per-symbol dict of pandas frames of the old `get_universe`,
+    e.g. `universe["AAPL"]["incomeStatement"]`, for code written against it.
+    """
+    income_statements: pl.DataFrame
+    balance_sheets: pl.DataFrame
+    cashflow_statements: pl.DataFrame
+    key_metrics: pl.DataFrame
+    prices: pl.DataFrame
+    market_caps: pl.DataFrame
+    company_profiles: pl.DataFrame
+    executives: pl.DataFrame
+
+    def __post_init__(self):
+        # Grouping the rows by symbol once makes the rows of a symbol a zero-copy slice.
+        self._slices = {}
+        for field in fields(self):
+            frame = getattr(self, field.name).sort("symbol", maintain_order=True)
+            setattr(self, field.name, frame)
+            lengths = frame.group_by("symbol", maintain_order=True).len()
+            starts = itertools.accumulate(lengths.get_column("len"), initial=0)
+            self._slices[field.name] = dict(zip(lengths.get_column("symbol"), zip(starts, lengths.get_column("len"))))
+        self._symbols = sorted(set(itertools.chain.from_iterable(self._slices.values())))
+
+    def of_symbol(self, name: str, symbol: str) -> pl.DataFrame:
+        start, length = self._slices[name].get(symbol, (0, 0))
+        return getattr(self, name).slice(start, length)
+
+    def __getitem__(self, symbol: str) -> "SymbolView":
+        if not any(symbol in slices for slices in self._slices.values()):
+            raise KeyError(symbol)
+        return SymbolView(self, symbol)
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self._symbols)
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+
+class SymbolView(collections.abc.Mapping):
+    """The datasets of one symbol under their legacy keys, converted to pandas on access."""
+
+    def __init__(self, universe: ColumnarUniverse, symbol: str):
+        self.universe = universe
+        self.symbol = symbol
+        self._names = {key: (name, index) for name, (key, index) in LEGACY_KEYS.items()}
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        name, index = self._names[key]
+        frame = self.universe.of_symbol(name, self.symbol).to_pandas()
+        return frame if index is None else frame.set_index(index)
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+def get_universe(symbols: list, max_workers: int = 8) -> ColumnarUniverse:
+    workers_of = {}
+    for name in DATASET_FETCHERS:
+        fetch, batch_size = stored_universe.dataset_fetcher(name, DATASET_FETCHERS)
+        fetch = convert_exceptions_to_none(fetch)
+        workers_of[name] = [(name, partial(fetch, symbols[i:i + batch_size])) for i in range(0, len(symbols), batch_size)]
+    workers = stored_universe.interleave_workers(workers_of)
+    collectors = {name: FrameCollector() for name in DATASET_FETCHERS}
+    multithread_collect(workers, collectors, caller_name="Constructing Universe", max_workers=max_workers)
+
+    frames = {name: collector.finish() for name, collector in collectors.items()}
+    universe = ColumnarUniverse(**{
+        name: pl.DataFrame(schema={"symbol": pl.String}) if frame is None else frame
+        for name, frame in frames.items()})
     print(f"Successfully exported {len(universe)} of {len(symbols)} data sets.")
     return universe
@@ -1,8 +1,10 @@
 from . import analysis
 from . import profitability
 from . import executives
+from . import factors
 from . import forex
 from . import growth
+from . import metrics
 from . import portfolio
 from . import pricing
 from . import returns
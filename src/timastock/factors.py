@@ -0,0 +1,88 @@
+import polars as pl
+
+from .misc import AnyPolarsFrame, sort_by_symbol
+
+# Suffix of the columns holding the value of the year before, see `previous`.
+PREVIOUS_SUFFIX = "Previous"
+# Columns of the yearly aggregate of the prices.
+PRICE_COLUMNS = ["firstClose", "lastClose", "firstDate", "lastDate"]
+
+
+def previous(column: str) -> pl.Expr:
+    """The value of `column` in the year before, null if the symbol has no row for that year."""
+    return pl.col(column + PREVIOUS_SUFFIX)
+
+def _two_year_mean(column: str) -> pl.Expr:
+    # Like the "2i" rolling windows of `timastock.profitability`, a missing year before is skipped.
+    return pl.mean_horizontal(previous(column), column)
+
+CAPITAL_EMPLOYED = (_two_year_mean("totalAssets") - _two_year_mean("totalCurrentLiabilities")).alias("capitalEmployed")
+RETURN_ON_CAPITAL_EMPLOYED = (pl.col("operatingIncome") / CAPITAL_EMPLOYED).alias("returnOnCapitalEmployed")
+GROSS_PROFITABILITY = (pl.col("grossProfit") / _two_year_mean("totalAssets")).alias("grossProfitability")
+UPKEEP_RATIO = (pl.col("costAndExpenses") / pl.col("revenue")).alias("upkeepRatio")
+ANNUAL_RETURN = (
+    (pl.col("lastClose") / pl.col("firstClose")).pow(365 / (pl.col("lastDate") - pl.col("firstDate")).dt.total_days()) - 1
+).alias("annualReturn")
+
+def growth(column: str) -> pl.Expr:
+    """Growth of `column` over the year before, like `timastock.growth.yoy_growth`."""
+    return (pl.col(column) / previous(column) - 1).alias(f"{column}Growth")
+
+def ebit_volatility(interval: int = 2) -> pl.Expr:
+    """Deviation of the yearly changes of the operating income in the last `interval` years, like `timastock.risk.ebit_volatility`."""
+    changes = pl.col("operatingIncome").pct_change()
+    return changes.rolling_std_by("calendarYear", window_size=f"{interval}i").over("symbol").alias("ebitVolatility")
+
+
+def _yearly_prices(prices: AnyPolarsFrame) -> pl.LazyFrame:
+    prices = sort_by_symbol(prices.lazy(), "date")
+    return prices.group_by("symbol", pl.col("date").dt.year().cast(pl.Int32).alias("calendarYear")).agg(
+        pl.col("adjClose").first().alias("firstClose"),
+        pl.col("adjClose").last().alias("lastClose"),
+        pl.col("date").first().alias("firstDate"),
+        pl.col("date").last().alias("lastDate"),
+    )
+
+def factor_table(
+    factors: list[pl.Expr],
+    income_statements: AnyPolarsFrame | None = None,
+    balance_sheets: AnyPolarsFrame | None = None,
+    cashflow_statements: AnyPolarsFrame | None = None,
+    prices: AnyPolarsFrame | None = None,
+) -> pl.LazyFrame:
+    """One row per symbol and calendar year of the statements with a column for every expression of `factors`.
+
+    All factors are computed in a single plan. Only the columns they refer to are read, the
+    statements holding them are joined once, and the values of the year before are added once for
+    all factors using `previous`. Prices are aggregated per calendar year for `ANNUAL_RETURN`.
+    """
+    roots = {c for factor in factors for c in factor.meta.root_names()}
+    lagged = {c.removesuffix(PREVIOUS_SUFFIX) for c in roots if c.endswith(PREVIOUS_SUFFIX)}
+    needed = {c.removesuffix(PREVIOUS_SUFFIX) for c in roots} - {"symbol", "calendarYear"}
+
+    frames = []
+    for statements in (income_statements, balance_sheets, cashflow_statements):
+        if statements is None:
+            continue
+        columns = [c for c in statements.lazy().collect_schema().names() if c in needed]
+        needed -= set(columns)
+        if len(columns) > 0:
+            frames.append(statements.lazy().select("symbol", pl.col("calendarYear").cast(pl.Int32), *columns))
+    yearly_prices = None
+    if prices is not None and not needed.isdisjoint(PRICE_COLUMNS):
+        yearly_prices = _yearly_prices(prices)
+        needed -= set(PRICE_COLUMNS)
+    if len(needed) > 0 or (len(frames) == 0 and yearly_prices is None):
+        raise ValueError(f"None of the given frames has the columns {sorted(needed)}.")
+
+    table = yearly_prices if len(frames) == 0 else frames[0]
+    for frame in frames[1:]:
+        table = table.join(frame, on=["symbol", "calendarYear"], how="full", coalesce=True)
+    if len(frames) > 0 and yearly_prices is not None:
+        # Years with prices but no statements would break the windows over the statement rows.
+        table = table.join(yearly_prices, on=["symbol", "calendarYear"], how="left")
+    table = sort_by_symbol(table, "calendarYear")
+    adjacent = pl.col("calendarYear").shift().over("symbol") == pl.col("calendarYear") - 1
+    table = table.with_columns(
+        pl.when(adjacent).then(pl.col(c).shift().over("symbol")).alias(c + PREVIOUS_SUFFIX) for c in sorted(lagged))
+    return table.select("symbol", "calendarYear", *factors)
@@ -1,56 +1,151 @@
+import io
+import os
 import pathlib
+import dataclasses
+from dataclasses import dataclass
+from datetime import date, timedelta
 import polars as pl
 from .misc import AnyPolarsFrame
 import typing as t
 
-def load_ecb_csv(path: pathlib.Path | str) -> pl.DataFrame:
-    input = pl.read_csv(path, ignore_errors=True)
-    input = input.rename({c: c.lower() for c in input.columns})
-    input = input.unpivot(on=pl.selectors.exclude("date"), index="date", variable_name="currency", value_name="exchangeRate")
-    input = input.filter(pl.col("exchangeRate") != "N/A")
-    # input = input.drop_nulls()
-    input = input.with_columns(
-        pl.col("date").str.strptime(pl.Date), pl.col("exchangeRate").cast(pl.Float32))
-    input = input.sort("date")
-
-    tautology = pl.date_range(
-        input.get_column("date").min(),
-        input.get_column("date").max(),
-        interval="1d", eager=True
-        ).alias("date")
+def _parse_ecb_csv(source: pathlib.Path | str | t.IO) -> pl.DataFrame:
+    input = pl.read_csv(source, null_values="N/A", infer_schema=False)
+    # The rows of the ECB files end with a comma, which reads as an unnamed column.
+    input = input.select(pl.col("Date").alias("date"), pl.exclude("Date", "").name.to_lowercase())
+    input = input.unpivot(index="date", variable_name="currency", value_name="exchangeRate")
+    input = input.drop_nulls()
+    return input.with_columns(pl.col("date").str.strptime(pl.Date), pl.col("exchangeRate").cast(pl.Float32))
+
+def _with_euro(input: pl.DataFrame, start: date) -> pl.DataFrame:
+    tautology = pl.date_range(start, input.get_column("date").max(), interval="1d", eager=True).alias("date")
     tautology = pl.DataFrame(tautology)
     tautology = tautology.with_columns(pl.lit("eur").alias("currency"), pl.lit(1.0, dtype=pl.Float32).alias("exchangeRate"))
 
-    return input.extend(tautology)
+    return input.sort("date").extend(tautology)
+
+def load_ecb_csv(path: pathlib.Path | str) -> pl.DataFrame:
+    input = _parse_ecb_csv(path)
+    return _with_euro(input, input.get_column("date").min())
+
+def _ecb_rows_after(path: pathlib.Path, last: date) -> pl.DataFrame | None:
+    # Dates are ISO formatted, so the new rows are found by comparing the first field as text
+    # and only those are parsed.
+    header, *lines = path.read_text().splitlines(keepends=True)
+    lines = [line for line in lines if line.split(",", 1)[0] > last.isoformat()]
+    if len(lines) == 0:
+        return None
+    input = _parse_ecb_csv(io.StringIO(header + "".join(lines)))
+    return _with_euro(input, last + timedelta(days=1))
+
+def load_ecb_rates(path: pathlib.Path | str, cache: pathlib.Path | str | None = None) -> pl.LazyFrame:
+    """The rates of `load_ecb_csv`, scanned from a parquet cache of the ECB history file in `path`.
+
+    The cache, by default `path` with a `.parquet` suffix, is written on the first call. When
+    `path` has been replaced by a newer download, only its rows after the last cached date are
+    parsed and appended.
+    """
+    path = pathlib.Path(path)
+    cache = path.with_suffix(".parquet") if cache is None else pathlib.Path(cache)
+    rates = None
+    if not cache.exists():
+        rates = load_ecb_csv(path)
+    elif cache.stat().st_mtime_ns < path.stat().st_mtime_ns:
+        cached = pl.read_parquet(cache)
+        new = _ecb_rows_after(path, cached.get_column("date").max())
+        if new is None:
+            cache.touch()
+        else:
+            rates = cached.extend(new)
+    if rates is not None:
+        temporary = cache.with_name(cache.name + ".tmp")
+        rates.write_parquet(temporary)
+        os.replace(temporary, cache)
+    return pl.scan_parquet(cache)
+
+@dataclass
+class RateTable:
+    """Exchange rates of every currency on every day from `start`, as one flat column.
+
+    The rate of the currency with index `i` on day `start + d` is at `i * days + d`, so looking up
+    rates is a gather instead of a join. Days without a quote carry the previous rate forward.
+    Rates are units of the currency per unit of `base`.
+    """
+    currencies: list[str]
+    start: date
+    days: int
+    values: pl.Series
+    base: str = "eur"
+
+    @staticmethod
+    def from_rates(rates: AnyPolarsFrame, base: str = "eur") -> "RateTable":
+        """Builds the table of rates with the columns of `load_ecb_csv`, which are quoted in euro."""
+        rates = rates.lazy().select("date", pl.col("currency").cast(pl.String).str.to_lowercase(), "exchangeRate").collect()
+        start, end = rates.get_column("date").min(), rates.get_column("date").max()
+        currencies = rates.get_column("currency").unique().sort().to_list()
+        grid = pl.DataFrame({"currency": currencies}).join(
+            pl.DataFrame(pl.date_range(start, end, interval="1d", eager=True).alias("date")), how="cross")
+        grid = grid.join(rates.unique(["currency", "date"], keep="last"), on=["currency", "date"], how="left")
+        # Days before the first quote of a currency take its first rate.
+        values = grid.select(pl.col("exchangeRate").forward_fill().backward_fill().over("currency")).to_series()
+        return RateTable(currencies, start, (end - start).days + 1, values).rebase(base)
+
+    def rebase(self, base: str) -> "RateTable":
+        """The table with every rate converted to units per unit of `base`."""
+        base = base.lower()
+        if base == self.base:
+            return self
+        if base not in self.currencies:
+            raise ValueError(f"There are no rates of {base} to convert to.")
+        # Cross rates are triangulated through the current base once for all days.
+        index = self.currencies.index(base)
+        base_rates = self.values.slice(index * self.days, self.days)
+        values = self.values / pl.concat([base_rates] * len(self.currencies))
+        return dataclasses.replace(self, values=values, base=base)
+
+    def _currency_id(self, curr: str) -> pl.Expr:
+        # Upper case codes are mapped as well, so the codes of the data need not be lowered first.
+        ids = {c: i for i, c in enumerate(self.currencies)} | {c.upper(): i for i, c in enumerate(self.currencies)}
+        return pl.col(curr).cast(pl.String).replace_strict(ids, default=None, return_dtype=pl.Int64)
+
+    def rate(self, curr: str, on: str = "date") -> pl.Expr:
+        """Rate of the currency in column `curr` on the day in column `on`, null for unknown currencies."""
+        # Days outside the table take the rate of its first or last day.
+        day = (pl.col(on) - pl.lit(self.start)).dt.total_days().clip(0, self.days - 1)
+        return pl.lit(self.values).gather(self._currency_id(curr) * self.days + day)
+
+    def latest_rate(self, curr: str) -> pl.Expr:
+        """Rate of the currency in column `curr` on the last day of the table."""
+        return pl.lit(self.values).gather(self._currency_id(curr) * self.days + self.days - 1)
+
+
+def _rate_table(rates: AnyPolarsFrame | RateTable, base: str) -> RateTable:
+    return rates.rebase(base) if isinstance(rates, RateTable) else RateTable.from_rates(rates, base)
 
 @t.overload
-def adjust_by_rates(data: pl.DataFrame, rates: pl.DataFrame, curr: str, columns: t.Iterable[str]) -> pl.DataFrame: ...
+def adjust_by_rates(data: pl.DataFrame, rates: pl.DataFrame | RateTable, curr: str, columns: t.Iterable[str], base: str = "eur") -> pl.DataFrame: ...
 @t.overload
-def adjust_by_rates(data: pl.LazyFrame, rates: pl.DataFrame, curr: str, columns: t.Iterable[str]) -> pl.LazyFrame: ...
-
-def adjust_by_rates(data: AnyPolarsFrame, rates: pl.DataFrame, curr: str, columns: t.Iterable[str]) -> AnyPolarsFrame:
-    if isinstance(data, pl.LazyFrame) and isinstance(rates, pl.DataFrame):
-        rates = rates.lazy()
-    if isinstance(data, pl.DataFrame) and isinstance(rates, pl.LazyFrame):
-        rates = rates.collect()
-    data = data.sort("date")
-    rates = rates.sort("date")
-    data = data.with_columns(pl.col(curr).str.to_lowercase().alias("currLowercase"))
-    data = data.join_asof(rates, on="date", by_left="currLowercase", by_right="currency", strategy="nearest")
+def adjust_by_rates(data: pl.LazyFrame, rates: pl.DataFrame | RateTable, curr: str, columns: t.Iterable[str], base: str = "eur") -> pl.LazyFrame: ...
+
+def adjust_by_rates(data: AnyPolarsFrame, rates: pl.DataFrame | RateTable, curr: str, columns: t.Iterable[str], base: str = "eur") -> AnyPolarsFrame:
+    """Converts `columns` from the currency in `curr` to `base` at the rate of each row's date.
+
+    Pass a `RateTable` in `base` to reuse it across calls, rows keep their order.
+    """
+    rates = _rate_table(rates, base)
+    data = data.with_columns(rates.rate(curr).alias("exchangeRate"))
     data = data.with_columns([pl.col(c) / pl.col("exchangeRate") for c in columns])
 
-    return data.select(pl.exclude("currLowercase", "exchangeRate"))
+    return data.select(pl.exclude("exchangeRate"))
 
 @t.overload
-def adjust_by_latest_rate(data: pl.DataFrame, rates: pl.DataFrame, curr: str, columns: t.Iterable[str]) -> pl.DataFrame: ...
+def adjust_by_latest_rate(data: pl.DataFrame, rates: pl.DataFrame | RateTable, curr: str, columns: t.Iterable[str], base: str = "eur") -> pl.DataFrame: ...
 @t.overload
-def adjust_by_latest_rate(data: pl.LazyFrame, rates: pl.DataFrame, curr: str, columns: t.Iterable[str]) -> pl.LazyFrame: ...
+def adjust_by_latest_rate(data: pl.LazyFrame, rates: pl.DataFrame | RateTable, curr: str, columns: t.Iterable[str], base: str = "eur") -> pl.LazyFrame: ...
 
-def adjust_by_latest_rate(data: AnyPolarsFrame, rates: pl.DataFrame, curr: str, columns: t.Iterable[str]) -> AnyPolarsFrame:
-    rates = rates.lazy()
-    rates = rates.sort("date").group_by("currency").agg(pl.last("exchangeRate"))
-    data = data.with_columns(pl.col(curr).str.to_lowercase().alias("currLowercase"))
-    data = data.join(rates, left_on="currLowercase", right_on="currency")
+def adjust_by_latest_rate(data: AnyPolarsFrame, rates: pl.DataFrame | RateTable, curr: str, columns: t.Iterable[str], base: str = "eur") -> AnyPolarsFrame:
+    """Converts `columns` from the currency in `curr` to `base` at the latest rate, dropping rows of unknown currencies."""
+    rates = _rate_table(rates, base)
+    data = data.with_columns(rates.latest_rate(curr).alias("exchangeRate")).filter(pl.col("exchangeRate").is_not_null())
     data = data.with_columns([pl.col(c) / pl.col("exchangeRate") for c in columns])
 
-    return data.select(pl.exclude("currLowercase", "exchangeRate"))
\ No newline at end of file
+    return data.select(pl.exclude("exchangeRate"))
@@ -0,0 +1,112 @@
+import polars as pl
+
+from .misc import AnyPolarsFrame
+
+# Universe-wide versions of the pandas metrics of `analysis`, `growth`, `valuation` and `risk`, with
+# one row per symbol. Rows are taken newest first within a symbol, the order FMP serves them in and
+# the pandas versions were written for.
+
+
+def _newest_first(column: str, by: str = "calendarYear") -> pl.Expr:
+    # Sorting within the groups is cheaper than sorting the whole frame by symbol first.
+    return pl.col(column).sort_by(by, descending=True)
+
+def _averaged_with_year_before(column: str) -> pl.Expr:
+    # The oldest year has no year before, its null is skipped by sums.
+    values = _newest_first(column)
+    return (values.shift(-1) + values) / 2
+
+def _without_oldest(column: str) -> pl.Expr:
+    return _newest_first(column).head(pl.len() - 1)
+
+
+def return_on_capital_employed(income_statements: AnyPolarsFrame, balance_sheets: AnyPolarsFrame) -> AnyPolarsFrame:
+    """Universe-wide `analysis.return_on_capital_employed`."""
+    ebit = income_statements.group_by("symbol").agg(
+        _without_oldest("operatingIncome").sum().alias("ebit"))
+    assets = balance_sheets.group_by("symbol").agg(
+        (_averaged_with_year_before("totalAssets") - _averaged_with_year_before("totalCurrentLiabilities")).sum().alias("assets"))
+    return ebit.join(assets, on="symbol").select("symbol", (pl.col("ebit") / pl.col("assets")).alias("returnOnCapitalEmployed"))
+
+def return_on_equity(income_statements: AnyPolarsFrame, balance_sheets: AnyPolarsFrame) -> AnyPolarsFrame:
+    """Universe-wide `analysis.return_on_equity`."""
+    net_income = income_statements.group_by("symbol").agg(
+        _without_oldest("netIncome").sum().alias("netIncome"))
+    equity = balance_sheets.group_by("symbol").agg(
+        _averaged_with_year_before("totalEquity").sum().alias("equity"))
+    return net_income.join(equity, on="symbol").select("symbol", (pl.col("netIncome") / pl.col("equity")).alias("returnOnEquity"))
+
+
+def _annualized(latest: pl.Expr, oldest: pl.Expr, years: pl.Expr) -> pl.Expr:
+    return (latest / oldest).pow(1 / years) - 1
+
+def annual_revenue_growth(income_statements: AnyPolarsFrame) -> AnyPolarsFrame:
+    """Universe-wide `growth.annual_revenue_growth`."""
+    # Leading years without revenue are skipped, up to the latest year.
+    revenue_start = pl.col("calendarYear").filter((pl.col("revenue") != 0).fill_null(True)).min()
+    years = income_statements.group_by("symbol").agg(
+        pl.col("calendarYear").max().alias("latest"),
+        pl.min_horizontal(revenue_start, pl.col("calendarYear").max()).alias("oldest"))
+    revenue = income_statements.select("symbol", "calendarYear", "revenue")
+    years = years.join(revenue, left_on=["symbol", "latest"], right_on=["symbol", "calendarYear"], how="left") \
+        .join(revenue, left_on=["symbol", "oldest"], right_on=["symbol", "calendarYear"], how="left", suffix="Oldest")
+    span = pl.col("latest") - pl.col("oldest")
+    return years.select(
+        "symbol",
+        pl.when(span < 1).then(0.0).otherwise(_annualized(pl.col("revenue"), pl.col("revenueOldest"), span)).alias("annualRevenueGrowth"))
+
+def annual_capital_employed_growth(balance_sheets: AnyPolarsFrame) -> AnyPolarsFrame:
+    """Universe-wide `growth.annual_capital_employed_growth`."""
+    capital_employed = pl.col("totalAssets") - pl.col("totalCurrentLiabilities")
+    latest = capital_employed.get(pl.col("calendarYear").arg_max())
+    oldest = capital_employed.get(pl.col("calendarYear").arg_min())
+    span = pl.col("calendarYear").max() - pl.col("calendarYear").min()
+    return balance_sheets.group_by("symbol").agg(_annualized(latest, oldest, span).alias("annualCapitalEmployedGrowth"))
+
+
+def _pb_ratios(market_caps: AnyPolarsFrame, balance_sheets: AnyPolarsFrame) -> AnyPolarsFrame:
+    # Market caps are divided by the equity of the year before theirs, or of the latest year if older.
+    caps = market_caps.group_by("symbol").agg(
+        pl.col("date").max().alias("latestDate"),
+        pl.col("marketCap").get(pl.col("date").arg_max()).alias("latestCap"),
+        pl.col("date").min().alias("oldestDate"),
+        pl.col("marketCap").get(pl.col("date").arg_min()).alias("oldestCap"))
+    caps = caps.join(balance_sheets.group_by("symbol").agg(pl.col("calendarYear").max().alias("latestYear")), on="symbol")
+    equity = balance_sheets.select("symbol", "calendarYear", "totalEquity")
+    for which in ["latest", "oldest"]:
+        year = pl.min_horizontal(pl.col(f"{which}Date").dt.year().cast(pl.Int32) - 1, "latestYear")
+        caps = caps.with_columns(year.alias("relevantYear")) \
+            .join(equity, left_on=["symbol", "relevantYear"], right_on=["symbol", "calendarYear"], how="left") \
+            .with_columns((pl.col(f"{which}Cap") / pl.col("totalEquity")).alias(f"{which}PbRatio")) \
+            .drop("relevantYear", "totalEquity")
+    return caps
+
+def pb_ratio(market_caps: AnyPolarsFrame, balance_sheets: AnyPolarsFrame) -> AnyPolarsFrame:
+    """Universe-wide `valuation.pb_ratio`."""
+    return _pb_ratios(market_caps, balance_sheets).select("symbol", pl.col("latestPbRatio").alias("pbRatio"))
+
+def annual_pb_ratio_growth(market_caps: AnyPolarsFrame, balance_sheets: AnyPolarsFrame) -> AnyPolarsFrame:
+    """Universe-wide `valuation.annual_pb_ratio_growth`."""
+    days = (pl.col("latestDate") - pl.col("oldestDate")).dt.total_days()
+    return _pb_ratios(market_caps, balance_sheets).select(
+        "symbol", ((pl.col("latestPbRatio") / pl.col("oldestPbRatio")).pow(365 / days) - 1).alias("annualPbRatioGrowth"))
+
+
+def volatility(prices: AnyPolarsFrame) -> AnyPolarsFrame:
+    """Universe-wide `risk.volatility`."""
+    years = (pl.col("date").max() - pl.col("date").min()).dt.total_days() / 365
+    return prices.group_by("symbol").agg(
+        (_newest_first("adjClose", "date").pct_change().std() * (pl.len() / years).sqrt()).alias("volatility"))
+
+def max_drawdown(prices: AnyPolarsFrame, window: int = 30) -> AnyPolarsFrame:
+    """Universe-wide `risk.max_drawdown`."""
+    prices_newest_first = _newest_first("adjClose", "date")
+    moving_average = prices_newest_first.rolling_mean(window)
+    return prices.group_by("symbol").agg(
+        ((prices_newest_first - moving_average) / moving_average).min().alias("maxDrawdown"))
+
+def debt_to_equity(balance_sheets: AnyPolarsFrame) -> AnyPolarsFrame:
+    """Universe-wide `risk.debt_to_equity`."""
+    latest = pl.col("calendarYear").arg_max()
+    return balance_sheets.group_by("symbol").agg(
+        (pl.col("totalDebt").get(latest) / pl.col("totalEquity").get(latest)).alias("debtToEquity"))
@@ -3,6 +3,25 @@ import polars as pl
 
 AnyPolarsFrame = pl.DataFrame | pl.LazyFrame
 
+def _is_sorted_by_symbol(frame: pl.DataFrame, column: str, by: str) -> bool:
+    if not frame.get_column(by).flags["SORTED_ASC"]:
+        return False
+    # Checking the order is linear, sorting would copy the whole frame.
+    in_order = pl.col(by).ne_missing(pl.col(by).shift()) | (pl.col(column) >= pl.col(column).shift())
+    return frame.select(in_order.all(ignore_nulls=False)).item() is True
+
+def sort_by_symbol(frame: AnyPolarsFrame, column: str, by: str = "symbol") -> AnyPolarsFrame:
+    """Sorts `frame` by `by` and `column`, unless it is flagged as sorted by `by` and already in order.
+
+    `fmp.parquet.universe.access_universe` flags the symbols of the stored datasets, which are sorted
+    by symbol and date.
+    """
+    if isinstance(frame, pl.LazyFrame):
+        return frame.map_batches(lambda batch: sort_by_symbol(batch, column, by))
+    if _is_sorted_by_symbol(frame, column, by):
+        return frame
+    return frame.sort(by, column)
+
 def interquartile_range(column: str | pl.Expr):
     if not isinstance(column, pl.Expr):
         column = pl.col(column)
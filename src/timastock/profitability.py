@@ -1,11 +1,11 @@
 import polars as pl
 
-from .misc import AnyPolarsFrame
+from .misc import AnyPolarsFrame, sort_by_symbol
 
 def capital_employed(balance_sheets: AnyPolarsFrame) -> AnyPolarsFrame:
     # Use Int32 for sorting and iteration
     balance_sheets = balance_sheets.with_columns(pl.col("calendarYear").cast(pl.Int32))
-    balance_sheets = balance_sheets.sort("calendarYear")
+    balance_sheets = sort_by_symbol(balance_sheets, "calendarYear")
     means = balance_sheets.rolling("calendarYear", group_by="symbol", period="2i").agg(
         pl.col("totalAssets").mean(),
         pl.col("totalCurrentLiabilities").mean()
@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 import polars as pl
-from .misc import AnyPolarsFrame
+from .misc import AnyPolarsFrame, sort_by_symbol
 
 def moving_average(prices: pd.DataFrame, window: int = 30) -> pd.Series:
     return prices["adjClose"].rolling(window=window).mean()
@@ -12,7 +12,7 @@ def max_drawdown(prices: pd.DataFrame) -> float:
     return drawdowns.dropna().min()
 
 def drawdown(prices: AnyPolarsFrame, period: str = "1mo"):
-    prices = prices.sort("date")
+    prices = sort_by_symbol(prices, "date")
     adj_close_means = prices.rolling("date", group_by="symbol", period=period, closed="left").agg(
         pl.col("adjClose").mean().alias("adjCloseMean")
     )
@@ -23,6 +23,41 @@ def drawdown(prices: AnyPolarsFrame, period: str = "1mo"):
     )
 
 
+def running_drawdown(prices: AnyPolarsFrame, window: str | None = None) -> AnyPolarsFrame:
+    """Drop of every price from the peak before it, with the days since and until the price was last and next at its peak.
+
+    With `window`, e.g. "1y", the peak is the highest price within that window instead of all prices
+    so far. Prices already sorted by symbol and date, like those of a stored universe, are not sorted again.
+    """
+    prices = sort_by_symbol(prices, "date")
+    if window is None:
+        peak = pl.col("adjClose").cum_max()
+    else:
+        peak = pl.col("adjClose").rolling_max_by("date", window_size=window)
+    prices = prices.with_columns((pl.col("adjClose") / peak.over("symbol") - 1).alias("drawdown"))
+    at_peak = pl.when(pl.col("drawdown") == 0).then(pl.col("date"))
+    return prices.select(
+        "symbol", "date", "drawdown",
+        (pl.col("date") - at_peak.forward_fill().over("symbol")).dt.total_days().alias("drawdownDuration"),
+        # Null while the price has not recovered yet.
+        (at_peak.backward_fill().over("symbol") - pl.col("date")).dt.total_days().alias("timeToRecovery"),
+    )
+
+def drawdown_statistics(prices: AnyPolarsFrame, window: str | None = None) -> AnyPolarsFrame:
+    """Current and maximum drawdown of every symbol, see `running_drawdown`.
+
+    Durations are in days, `maxDrawdownDuration` is the longest time below a peak and
+    `timeToRecovery` the time from the trough of the maximum drawdown back to the peak.
+    """
+    trough = pl.col("drawdown").arg_min()
+    return running_drawdown(prices, window).group_by("symbol").agg(
+        pl.col("drawdown").last().alias("currentDrawdown"),
+        pl.col("drawdown").min().alias("maxDrawdown"),
+        pl.col("drawdownDuration").max().alias("maxDrawdownDuration"),
+        pl.col("timeToRecovery").get(trough).alias("timeToRecovery"),
+    )
+
+
 def volatility(prices: pd.DataFrame):
     price_percentages = prices['adjClose'].pct_change()
     timediff: pd.Timedelta = prices.index.max() - prices.index.min()
@@ -36,7 +71,7 @@ def rolling_volatility(prices: pd.DataFrame, interval: int = 30):
     return left_volatilities
 
 def ebit_volatility(income_statement: AnyPolarsFrame, interval: int = 2):
-    income_statement = income_statement.sort("calendarYear")
+    income_statement = sort_by_symbol(income_statement, "calendarYear")
     result = income_statement.with_columns(pl.col("operatingIncome").pct_change().over("symbol").alias("pct_change"))
     result = result.rolling("calendarYear", group_by="symbol", period=f"{interval}i").agg(
         pl.col("pct_change").drop_nulls().std().alias("ebitVolatility") # / pl.col("operatingIncome").mean() # .std()
@@ -0,0 +1,66 @@
+import unittest
+from datetime import date, timedelta
+
+import polars as pl
+import polars.testing as polt
+import timastock as tm
+
+
+class FactorTableTest(unittest.TestCase):
+    def setUp(self):
+        # BLUB has no statements for 2018.
+        years = [2015, 2016, 2017, 2019, 2020, 2016, 2017, 2018]
+        symbols = ["BLUB"] * 5 + ["SPLT"] * 3
+        self.income_statements = pl.DataFrame({
+            "symbol": symbols,
+            "calendarYear": pl.Series(years, dtype=pl.Int32),
+            "revenue": [10.0, 12.0, 15.0, 11.0, 14.0, 5.0, 6.0, 4.0],
+            "grossProfit": [3.0, 4.0, 5.0, 2.0, 4.0, 1.0, 2.0, 1.0],
+            "costAndExpenses": [8.0, 9.0, 10.0, 10.0, 11.0, 4.0, 4.0, 5.0],
+            "operatingIncome": [2.0, 3.0, 5.0, 1.0, 3.0, 1.0, 2.0, -1.0],
+        })
+        self.balance_sheets = pl.DataFrame({
+            "symbol": symbols,
+            "calendarYear": pl.Series(years, dtype=pl.Int32),
+            "totalAssets": [20.0, 22.0, 25.0, 30.0, 28.0, 9.0, 10.0, 12.0],
+            "totalCurrentLiabilities": [5.0, 4.0, 6.0, 8.0, 7.0, 2.0, 3.0, 3.0],
+        })
+        days = [date(2016, 1, 4) + timedelta(days=d) for d in range(0, 900, 3)]
+        self.prices = pl.DataFrame({
+            "symbol": ["SPLT", "BLUB"] * len(days),
+            "date": [d for d in days for _ in range(2)],
+            "adjClose": [float(1 + i % 50) for i in range(2 * len(days))],
+        })
+
+    def test_factor_table(self):
+        factors = [
+            tm.factors.RETURN_ON_CAPITAL_EMPLOYED,
+            tm.factors.UPKEEP_RATIO,
+            tm.factors.growth("revenue"),
+            tm.factors.ebit_volatility(),
+            tm.factors.ANNUAL_RETURN,
+        ]
+        table = tm.factors.factor_table(
+            factors, income_statements=self.income_statements.sample(fraction=1.0, shuffle=True, seed=3),
+            balance_sheets=self.balance_sheets, prices=self.prices)
+        self.assertIsInstance(table, pl.LazyFrame)
+        table = table.collect()
+        print(table)
+        self.assertEqual(table.columns, [
+            "symbol", "calendarYear", "returnOnCapitalEmployed", "upkeepRatio", "revenueGrowth", "ebitVolatility", "annualReturn"])
+
+        def compare(expected: pl.DataFrame, column: str):
+            joined = expected.join(table, on=["symbol", "calendarYear"], how="left", suffix="Table")
+            polt.assert_series_equal(joined.get_column(f"{column}Table"), joined.get_column(column), check_names=False)
+
+        compare(tm.profitability.return_on_capital_employed(self.income_statements, self.balance_sheets), "returnOnCapitalEmployed")
+        compare(tm.profitability.upkeep_ratio(self.income_statements), "upkeepRatio")
+        compare(tm.growth.yoy_growth("revenue", self.income_statements), "revenueGrowth")
+        compare(tm.risk.ebit_volatility(self.income_statements), "ebitVolatility")
+        for year in [2016, 2017]:
+            yearly = tm.returns.annual_return(self.prices.filter(pl.col("date").dt.year() == year))
+            compare(yearly.with_columns(pl.lit(year, dtype=pl.Int32).alias("calendarYear")), "annualReturn")
+
+    def test_missing_columns(self):
+        with self.assertRaises(ValueError):
+            tm.factors.factor_table([tm.factors.GROSS_PROFITABILITY], income_statements=self.income_statements)
@@ -0,0 +1,94 @@
+import os
+import pathlib
+import tempfile
+import unittest
+from datetime import date
+
+import polars as pl
+import polars.testing as polt
+import timastock as tm
+
+
+class ForexTest(unittest.TestCase):
+    def setUp(self):
+        # No usd quote on the 3rd and the weekend, jpy starts on the 2nd.
+        self.rates = pl.DataFrame({
+            "date": [date(2024, 1, d) for d in [1, 2, 4, 5, 8, 2, 8]],
+            "currency": ["usd"] * 5 + ["jpy"] * 2,
+            "exchangeRate": [1.0, 2.0, 4.0, 5.0, 8.0, 100.0, 200.0],
+        }).with_columns(pl.col("exchangeRate").cast(pl.Float32))
+
+    def test_rate_table(self):
+        table = tm.forex.RateTable.from_rates(self.rates)
+        self.assertEqual(table.currencies, ["jpy", "usd"])
+        self.assertEqual(table.days, 8)
+        self.assertEqual(table.values.to_list(), [100.0] * 7 + [200.0] + [1.0, 2.0, 2.0, 4.0, 5.0, 5.0, 5.0, 8.0])
+
+    def test_adjust_by_rates(self):
+        data = pl.DataFrame({
+            "date": [date(2024, 1, d) for d in [7, 3, 1, 8, 9]] + [date(2023, 12, 1), date(2024, 1, 3)],
+            "currency": ["USD", "usd", "USD", "JPY", "USD", "USD", "CHF"],
+            "revenue": [10.0, 10.0, 10.0, 400.0, 16.0, 3.0, 1.0],
+        })
+        expected = data.with_columns(revenue=pl.Series([2.0, 5.0, 10.0, 2.0, 2.0, 3.0, None]))
+        result = tm.forex.adjust_by_rates(data, self.rates, curr="currency", columns=["revenue"])
+        print(result)
+
+        polt.assert_frame_equal(result, expected)
+        table = tm.forex.RateTable.from_rates(self.rates)
+        polt.assert_frame_equal(tm.forex.adjust_by_rates(data.lazy(), table, curr="currency", columns=["revenue"]).collect(), expected)
+        enum = data.with_columns(pl.col("currency").cast(pl.Enum(["CHF", "JPY", "USD", "usd"])))
+        polt.assert_frame_equal(
+            tm.forex.adjust_by_rates(enum, table, curr="currency", columns=["revenue"]).select("revenue"), expected.select("revenue"))
+
+    def test_base_currency(self):
+        data = pl.DataFrame({
+            "date": [date(2024, 1, 2), date(2024, 1, 8), date(2024, 1, 8), date(2024, 1, 8)],
+            "currency": ["JPY", "JPY", "usd", "EUR"],
+            "revenue": [200.0, 400.0, 16.0, 2.0],
+        })
+        rates = self.rates.extend(pl.DataFrame({
+            "date": [date(2024, 1, 1)], "currency": ["eur"], "exchangeRate": pl.Series([1.0], dtype=pl.Float32)}))
+        in_usd = tm.forex.adjust_by_rates(data, rates, curr="currency", columns=["revenue"], base="USD")
+        print(in_usd)
+        polt.assert_series_equal(in_usd.get_column("revenue"), pl.Series("revenue", [4.0, 16.0, 16.0, 16.0]))
+
+        table = tm.forex.RateTable.from_rates(rates)
+        polt.assert_frame_equal(table.rebase("usd").rebase("eur").values.to_frame(), table.values.to_frame(), check_exact=False)
+        latest = tm.forex.adjust_by_latest_rate(data.with_columns(pl.lit("chf").alias("currency")).vstack(data), table, curr="currency", columns=["revenue"], base="jpy")
+        polt.assert_series_equal(latest.get_column("revenue"), pl.Series("revenue", [200.0, 400.0, 400.0, 400.0]))
+        with self.assertRaises(ValueError):
+            table.rebase("chf")
+
+
+class EcbRatesTest(unittest.TestCase):
+    HEADER = "Date,USD,JPY,CYP,\n"
+    ROWS = [
+        "2024-01-05,1.05,155.0,N/A,\n",
+        "2024-01-04,1.04,,N/A,\n",
+        "2024-01-02,1.02,152.0,N/A,\n",
+    ]
+
+    def test_load_ecb_rates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "eurofxref-hist.csv"
+            path.write_text(self.HEADER + "".join(self.ROWS[1:]))
+            rates = tm.forex.load_ecb_rates(path)
+            self.assertIsInstance(rates, pl.LazyFrame)
+            polt.assert_frame_equal(rates.collect(), tm.forex.load_ecb_csv(path), check_row_order=False)
+            self.assertEqual(rates.filter(pl.col("currency") == "eur").collect().height, 3)
+            self.assertEqual(rates.filter(pl.col("currency") == "cyp").collect().height, 0)
+
+            # A newer download only adds its new rows to the cache.
+            cache = path.with_suffix(".parquet")
+            written = cache.stat().st_mtime_ns
+            path.write_text(self.HEADER + "".join(self.ROWS))
+            os.utime(path, ns=(written + 1, written + 1))
+            rates = tm.forex.load_ecb_rates(path).collect()
+            print(rates)
+            polt.assert_frame_equal(rates, tm.forex.load_ecb_csv(path), check_row_order=False)
+
+            os.utime(path, ns=(written, written))
+            rewritten = cache.stat().st_mtime_ns
+            tm.forex.load_ecb_rates(path)
+            self.assertEqual(cache.stat().st_mtime_ns, rewritten)
@@ -0,0 +1,75 @@
+import random
+import unittest
+from datetime import date, timedelta
+
+import pandas as pd
+import polars as pl
+import polars.testing as polt
+import timastock as tm
+
+
+def _universe(symbols: int, years: int, days: int) -> dict[str, pl.DataFrame]:
+    rng = random.Random(7)
+    rows = [(f"S{s}", 2000 + y) for s in range(symbols) for y in range(years - s % 3)]
+    income_statements = pl.DataFrame({
+        "symbol": [s for s, _ in rows],
+        "calendarYear": pl.Series([y for _, y in rows], dtype=pl.Int64),
+        # The first symbol starts without revenue.
+        "revenue": [0.0 if s == "S0" and y < 2003 else rng.uniform(50, 150) for s, y in rows],
+        "operatingIncome": [rng.uniform(-10, 30) for _ in rows],
+        "netIncome": [rng.uniform(-10, 20) for _ in rows],
+    })
+    balance_sheets = pl.DataFrame({
+        "symbol": [s for s, _ in rows],
+        "calendarYear": pl.Series([y for _, y in rows], dtype=pl.Int64),
+        "totalAssets": [rng.uniform(200, 400) for _ in rows],
+        "totalCurrentLiabilities": [rng.uniform(20, 100) for _ in rows],
+        "totalEquity": [rng.uniform(50, 150) for _ in rows],
+        "totalDebt": [rng.uniform(10, 80) for _ in rows],
+    })
+    price_rows = [(f"S{s}", date(2001, 1, 1) + timedelta(days=d)) for s in range(symbols) for d in range(days - 7 * s)]
+    prices = pl.DataFrame({
+        "symbol": [s for s, _ in price_rows],
+        "date": [d for _, d in price_rows],
+        "adjClose": [rng.uniform(10, 20) for _ in price_rows],
+    })
+    market_caps = prices.select("symbol", "date", (pl.col("adjClose") * 10).alias("marketCap"))
+    return {"income_statements": income_statements, "balance_sheets": balance_sheets, "prices": prices, "market_caps": market_caps}
+
+
+def _legacy(frame: pl.DataFrame, symbol: str, index: str) -> pd.DataFrame:
+    # The frames of the old `fmp.universe.get_universe`, newest first.
+    frame = frame.filter(symbol=symbol).sort(index, descending=True).to_pandas().set_index(index)
+    if index == "date":
+        frame.index = pd.to_datetime(frame.index)
+    return frame
+
+
+class MetricsTest(unittest.TestCase):
+    def test_against_pandas(self):
+        universe = _universe(symbols=6, years=12, days=400)
+        statements = {name: universe[name] for name in ["income_statements", "balance_sheets"]}
+        cases = [
+            ("returnOnCapitalEmployed", tm.metrics.return_on_capital_employed, tm.analysis.return_on_capital_employed, ["income_statements", "balance_sheets"]),
+            ("returnOnEquity", tm.metrics.return_on_equity, tm.analysis.return_on_equity, ["income_statements", "balance_sheets"]),
+            ("annualRevenueGrowth", tm.metrics.annual_revenue_growth, tm.growth.annual_revenue_growth, ["income_statements"]),
+            ("annualCapitalEmployedGrowth", tm.metrics.annual_capital_employed_growth, tm.growth.annual_capital_employed_growth, ["balance_sheets"]),
+            ("pbRatio", tm.metrics.pb_ratio, tm.valuation.pb_ratio, ["market_caps", "balance_sheets"]),
+            ("annualPbRatioGrowth", tm.metrics.annual_pb_ratio_growth, tm.valuation.annual_pb_ratio_growth, ["market_caps", "balance_sheets"]),
+            ("volatility", tm.metrics.volatility, tm.risk.volatility, ["prices"]),
+            ("maxDrawdown", tm.metrics.max_drawdown, tm.risk.max_drawdown, ["prices"]),
+            ("debtToEquity", tm.metrics.debt_to_equity, tm.risk.debt_to_equity, ["balance_sheets"]),
+        ]
+        symbols = universe["prices"].get_column("symbol").unique().sort().to_list()
+        for column, port, original, datasets in cases:
+            with self.subTest(column):
+                # Shuffled and lazy inputs give the same result.
+                frames = [universe[name].sample(fraction=1.0, shuffle=True, seed=1).lazy() for name in datasets]
+                result = port(*frames).collect().sort("symbol")
+                expected = [
+                    original(*[_legacy(universe[name], s, "date" if name in ("prices", "market_caps") else "calendarYear") for name in datasets])
+                    for s in symbols]
+                print(result)
+                self.assertEqual(result.columns, ["symbol", column])
+                self.assertEqual(result.get_column("symbol").to_list(), symbols)
+                polt.assert_series_equal(result.get_column(column), pl.Series(column, expected, dtype=pl.Float64), rel_tol=1e-9)
@@ -6,5 +6,16 @@ import timastock as tm
 
 
 class MiscTest(unittest.TestCase):
-    pass
+    def test_sort_by_symbol(self):
+        frame = pl.DataFrame({"symbol": ["A", "A", "B", "B"], "date": [1, 2, 1, 3]})
+        flagged = frame.set_sorted("symbol")
+        self.assertIs(tm.misc.sort_by_symbol(flagged, "date"), flagged)
+
+        shuffled = frame.reverse()
+        polt.assert_frame_equal(tm.misc.sort_by_symbol(shuffled, "date"), frame)
+        # The flag alone is not trusted for the order within a symbol.
+        unordered = pl.DataFrame({"symbol": ["A", "A", "B", "B"], "date": [2, 1, 1, None]}).set_sorted("symbol")
+        result = tm.misc.sort_by_symbol(unordered.lazy(), "date").collect()
+        print(result)
+        polt.assert_frame_equal(result, unordered.sort("symbol", "date"))
         
\ No newline at end of file
@@ -38,3 +38,33 @@ class RiskTest(unittest.TestCase):
         print(result)
 
         polt.assert_frame_equal(result, expected)
+
+    def test_running_drawdown(self):
+        dates = pl.date_range(pl.date(2024, 1, 1), pl.date(2024, 1, 8), eager=True)
+        prices = pl.DataFrame({
+            "symbol": ["BLUB"] * 8 + ["SPLT"] * 3,
+            "date": pl.concat([dates, dates.head(3)]),
+            "adjClose": [10.0, 12.0, 9.0, 6.0, 12.0, 13.0, 12.0, 12.5, 5.0, 4.0, 3.0]})
+        expected = pl.DataFrame({
+            "symbol": ["BLUB"] * 8 + ["SPLT"] * 3,
+            "date": pl.concat([dates, dates.head(3)]),
+            "drawdown": [0.0, 0.0, -0.25, -0.5, 0.0, 0.0, -1 / 13, -0.5 / 13, 0.0, -0.2, -0.4],
+            "drawdownDuration": [0, 0, 1, 2, 0, 0, 1, 2, 0, 1, 2],
+            # Neither recovers from its last drawdown.
+            "timeToRecovery": [0, 0, 2, 1, 0, 0, None, None, 0, None, None]})
+        result = tm.risk.running_drawdown(prices.reverse())
+        print(result)
+
+        polt.assert_frame_equal(result, expected)
+        # The peak of a window forgets older prices.
+        result = tm.risk.running_drawdown(prices.lazy(), window="2d").collect()
+        polt.assert_series_equal(result.get_column("drawdown").head(5), pl.Series("drawdown", [0.0, 0.0, -0.25, -1 / 3, 0.0]))
+
+        statistics = tm.risk.drawdown_statistics(prices).sort("symbol")
+        print(statistics)
+        polt.assert_frame_equal(statistics, pl.DataFrame({
+            "symbol": ["BLUB", "SPLT"],
+            "currentDrawdown": [-0.5 / 13, -0.4],
+            "maxDrawdown": [-0.5, -0.4],
+            "maxDrawdownDuration": [2, 2],
+            "timeToRecovery": [1, None]}))